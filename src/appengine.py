@@ -285,7 +285,7 @@ def combine_table(table_name: str = None) -> Response:
         # Get a list of the intermediate files used by this data pipeline
         intermediate_file_names = []
         for data_source in data_pipeline.data_sources:
-            intermediate_file_names.append(f"{data_source.uuid(data_pipeline.table)}.csv")
+            intermediate_file_names.append(f"{data_source.uuid(data_pipeline.table)}.parquet")
 
         # Download only the necessary intermediate files
         download_folder(
@@ -295,9 +295,9 @@ def combine_table(table_name: str = None) -> Response:
             lambda x: x.name in intermediate_file_names,
         )
 
-        # Re-load all intermediate results
+        # Read all intermediate results directly from the binary files
         intermediate_results = data_pipeline._load_intermediate_results(
-            output_folder / "intermediate"
+            output_folder / "intermediate", file_format="parquet"
         )
 
         # Combine all intermediate results into a single dataframe
@@ -16,7 +16,7 @@ import warnings
 from typing import Dict, List
 from pandas import DataFrame
 from pandas.api.types import is_numeric_dtype
-from .cast import safe_float_cast
+from .cast import safe_float_cast_series
 
 
 def _detect_perform_action(msg: str, tags: List[str], action: str):
@@ -58,7 +58,7 @@ def detect_zero_columns(
         if sum(~data[column].isnull()) == 0:
             # Already flagged by detect_null_columns
             continue
-        if sum(data[column].apply(safe_float_cast).fillna(0).apply(abs)) < 1:
+        if safe_float_cast_series(data[column]).fillna(0).abs().sum() < 1:
             _detect_perform_action("All-zeroes column detected: " + column, tags, action)
 
 
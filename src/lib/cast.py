@@ -16,7 +16,9 @@ import datetime
 import warnings
 from typing import Any, Dict, Callable, Optional
 
+import numpy
 import pandas
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
 
 def _clean_numeric(value: Any) -> str:
@@ -80,6 +82,126 @@ def safe_str_cast(value: Any, skip_pandas_nan: bool = False) -> Optional[str]:
         return None
 
 
+def _numeric_strings_to_float(values: numpy.ndarray) -> numpy.ndarray:
+    """ Vectorized version of `safe_float_cast` for an array which contains only strings """
+    # Strings without commas or a leading minus sign are parsed by float() as-is, so most arrays
+    # can be parsed in a single pass and only those with some invalid values need cleaning up
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        pass
+
+    strings = pandas.Series(values, dtype=object).str.replace(",", "", regex=False)
+    minus_mask = strings.str.startswith("−").values
+    if minus_mask.any():
+        strings[minus_mask] = strings[minus_mask].str.replace("−", "-", regex=False)
+
+    # Use pandas to find which values can be parsed, but rely on Python's float() for parsing
+    strings = strings.values
+    parsed = numpy.full(len(strings), numpy.nan)
+    parsed_mask = ~pandas.isna(pandas.to_numeric(strings, errors="coerce"))
+    try:
+        parsed[parsed_mask] = strings[parsed_mask].astype(float)
+    except (TypeError, ValueError):
+        parsed_mask[:] = False
+
+    # Values which could not be parsed by pandas go through the slow path
+    fallback_mask = ~parsed_mask
+    parsed[fallback_mask] = [safe_float_cast(value) for value in values[fallback_mask]]
+    return parsed
+
+
+def _object_kinds(values: numpy.ndarray) -> Dict[str, numpy.ndarray]:
+    """ Masks of the elements in an object array which are null, strings or Python numbers """
+    types = numpy.fromiter(map(type, values), dtype=object, count=len(values))
+    null_mask = pandas.isna(values)
+    str_mask = types == str
+    num_mask = ((types == float) | (types == int) | (types == bool)) & ~null_mask
+    return {"null": null_mask, "str": str_mask, "num": num_mask}
+
+
+def safe_float_cast_series(values: pandas.Series) -> pandas.Series:
+    """
+    Vectorized equivalent of applying `safe_float_cast` to every element of `values`.
+
+    Arguments:
+        values: Series to convert.
+    Returns:
+        Series: float64 series with the same index as `values`, using NaN for null values.
+    """
+    if is_numeric_dtype(values.dtype) or is_bool_dtype(values.dtype):
+        return values.astype(float)
+
+    array = values.to_numpy(dtype=object)
+    kinds = _object_kinds(array)
+    result = numpy.full(len(array), numpy.nan)
+    result[kinds["num"]] = array[kinds["num"]].astype(float)
+    result[kinds["str"]] = _numeric_strings_to_float(array[kinds["str"]])
+
+    # Anything else goes through the slow path
+    other_mask = ~(kinds["null"] | kinds["str"] | kinds["num"])
+    result[other_mask] = [safe_float_cast(value) for value in array[other_mask]]
+    return pandas.Series(result, index=values.index, name=values.name, dtype=float)
+
+
+def safe_int_cast_series(values: pandas.Series) -> pandas.Series:
+    """
+    Vectorized equivalent of applying `safe_int_cast` to every element of `values`.
+
+    Arguments:
+        values: Series to convert.
+    Returns:
+        Series: Int64 series with the same index as `values`, using NA for null values. If any of
+            the values is out of the range of a 64-bit integer, an object series is returned
+            instead.
+    """
+    if is_bool_dtype(values.dtype) or str(values.dtype) in ("int64", "Int64"):
+        return values.astype(pandas.Int64Dtype())
+
+    array = values.to_numpy(dtype=object)
+    floats = safe_float_cast_series(values).values
+    finite_mask = numpy.isfinite(floats)
+
+    # Integers which do not fit in 64 bits can only be represented as Python objects
+    if (numpy.abs(floats[finite_mask]) >= 2 ** 63).any():
+        return pandas.Series(
+            [safe_int_cast(value, skip_pandas_nan=True) for value in array],
+            index=values.index,
+            name=values.name,
+            dtype=object,
+        )
+
+    # Python integers are not converted from float to avoid losing precision
+    int_mask = numpy.fromiter(map(type, array), dtype=object, count=len(array)) == int
+
+    result = numpy.zeros(len(array), dtype=numpy.int64)
+    result[finite_mask] = numpy.trunc(floats[finite_mask]).astype(numpy.int64)
+    result[int_mask] = array[int_mask].astype(numpy.int64)
+    return pandas.Series(
+        pandas.arrays.IntegerArray(result, ~finite_mask), index=values.index, name=values.name
+    )
+
+
+def safe_str_cast_series(values: pandas.Series) -> pandas.Series:
+    """
+    Vectorized equivalent of applying `safe_str_cast` to every element of `values`.
+
+    Arguments:
+        values: Series to convert.
+    Returns:
+        Series: object series with the same index as `values`, using `None` for null values.
+    """
+    array = values.to_numpy(dtype=object)
+    null_mask = pandas.isna(array)
+    str_mask = numpy.fromiter(map(type, array), dtype=object, count=len(array)) == str
+
+    result = array.copy()
+    result[null_mask] = None
+    other_mask = ~(null_mask | str_mask)
+    result[other_mask] = array[other_mask].astype(str)
+    return pandas.Series(result, index=values.index, name=values.name, dtype=object)
+
+
 def safe_datetime_parse(
     value: str, date_format: str = None, warn: bool = False
 ) -> Optional[datetime.datetime]:
@@ -109,6 +231,39 @@ def column_converters(schema: Dict[str, Any]) -> Dict[str, Callable]:
     return converters
 
 
+def column_series_converters(schema: Dict[str, Any]) -> Dict[str, Callable]:
+    """ Same as `column_converters` but using the vectorized converters which operate on Series """
+    converters = {
+        safe_int_cast: safe_int_cast_series,
+        safe_float_cast: safe_float_cast_series,
+        safe_str_cast: safe_str_cast_series,
+    }
+    return {column: converters[func] for column, func in column_converters(schema).items()}
+
+
+def cast_table(data: pandas.DataFrame, schema: Dict[str, Any]) -> pandas.DataFrame:
+    """
+    Converts the columns of a table to the types declared in the schema: str columns are object
+    columns, int columns are nullable Int64 and float columns are float64. Columns not in the schema
+    are dropped. Same as `read_table`, str columns have no null values: null values are converted
+    to empty strings, which are kept as values when tables are combined.
+
+    Arguments:
+        data: The table to convert.
+        schema: Dictionary of <column, dtype>.
+    Returns:
+        DataFrame: New table with the same index and only the columns present in `schema`.
+    """
+    data_out = pandas.DataFrame(index=data.index)
+    for column, converter in column_series_converters(schema).items():
+        if column in data.columns:
+            values = converter(data[column])
+            if converter == safe_str_cast_series:
+                values[values.isna()] = ""
+            data_out[column] = values
+    return data_out
+
+
 def age_group(age: int, bin_count: int = 10, age_cutoff: int = 90) -> str:
     """
     Categorical age group given a specific age, codified into a function to enforce consistency.
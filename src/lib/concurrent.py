@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from contextlib import contextmanager
 from functools import partial
 from multiprocessing.pool import Pool, ThreadPool
 from os import getenv
-from typing import Any, Callable, Dict, Iterable, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, Union
 
 from pandas import DataFrame, Series
 from tqdm.contrib import concurrent
@@ -23,14 +24,60 @@ from tqdm.contrib import concurrent
 from .constants import GLOBAL_DISABLE_PROGRESS
 
 
+# Read-only objects made available to all worker processes, see `shared_objects`
+_SHARED_OBJECTS: Dict[str, Any] = {}
+
+
+def _init_shared_objects(
+    objects: Dict[str, Any], initializer: Callable = None, initargs: Iterable[Any] = ()
+) -> None:
+    _SHARED_OBJECTS.clear()
+    _SHARED_OBJECTS.update(objects)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+@contextmanager
+def shared_objects(**objects) -> Iterator[None]:
+    """
+    Makes the given objects available to any process pool created within this context, which can
+    be retrieved with `get_shared_object`. The objects are handed to each worker process once when
+    the pool starts, rather than being pickled as part of every task. When processes are forked,
+    which is the default on Linux, the objects are inherited without any copying or pickling at all.
+    Objects must be treated as read-only, since changes will not be seen by other processes.
+    """
+    previous = dict(_SHARED_OBJECTS)
+    _SHARED_OBJECTS.update(objects)
+    try:
+        yield
+    finally:
+        _SHARED_OBJECTS.clear()
+        _SHARED_OBJECTS.update(previous)
+
+
+def get_shared_object(name: str) -> Any:
+    """ Retrieves an object previously provided to `shared_objects` """
+    return _SHARED_OBJECTS[name]
+
+
 class _ProcessExecutor(Pool):
-    def __init__(self, max_workers: int = None, **kwargs):
-        super().__init__(processes=max_workers, **kwargs)
+    def __init__(self, max_workers: int = None, initializer=None, initargs=(), **kwargs):
+        # Chain the shared objects initializer with the one provided by the caller
+        initargs = (dict(_SHARED_OBJECTS), initializer, initargs)
+        initializer = _init_shared_objects
+        super().__init__(
+            processes=max_workers, initializer=initializer, initargs=initargs, **kwargs
+        )
 
     def map(self, func, iterable, chunksize=None):
         return self.imap(func, iterable)
 
 
+def process_pool(max_workers: int = None) -> Pool:
+    """ Creates a pool of worker processes which have access to the current `shared_objects` """
+    return _ProcessExecutor(max_workers=max_workers)
+
+
 class _ThreadExecutor(ThreadPool):
     def __init__(self, max_workers: int = None, **kwargs):
         super().__init__(processes=max_workers, **kwargs)
@@ -29,6 +29,42 @@ ISSUES_API_URL = "https://api.github.com/repos/GoogleCloudPlatform/covid-19-open
 # different processes.
 GLOBAL_DISABLE_PROGRESS = "TQDM_DISABLE"
 
+# Intermediate results are held in memory up to this size before they are combined and spilled to
+# disk by the combine step
+INTERMEDIATE_COMBINE_THRESHOLD_BYTES = 4 * 1000 * 1000 * 1000
+
+# Fetching data sources is bound by network I/O, so many more can run concurrently than processes
+FETCH_THREAD_COUNT = 32
+
+# Data sources from at most this many pipelines are queued at the same time, so the results of the
+# pipelines waiting to be combined do not pile up in memory
+PARSE_PIPELINES_IN_FLIGHT = 4
+
+# Name of the file in the output folder where the duration and memory usage of each data source is
+# recorded, which is used to decide the order in which data sources are run
+DATA_SOURCE_STATS_FILE_NAME = "data_source_stats.json"
+
+# Name of the file in the output folder where the keys resolved during the merge step are cached
+MERGE_KEY_CACHE_FILE_NAME = "merge_key_cache.sqlite"
+
+# Records left to be merged one by one are split into chunks of this size and merged in parallel
+# if there are at least `MERGE_PARALLEL_THRESHOLD` of them, otherwise they are merged serially
+MERGE_CHUNK_SIZE = 10_000
+MERGE_PARALLEL_THRESHOLD = 50_000
+
+# Columns of the report written for each pipeline with the metrics of each stage of its data sources
+STAGE_REPORT_COLUMNS = (
+    "pipeline",
+    "data_source",
+    "uuid",
+    "stage",
+    "wall_time",
+    "cpu_time",
+    "rows_in",
+    "rows_out",
+    "peak_memory",
+)
+
 # Some tables are not included into the main table
 EXCLUDE_FROM_MAIN_TABLE = (
     "main",
@@ -12,19 +12,30 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import re
+import time
+import tracemalloc
 import uuid
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain
+from multiprocessing import cpu_count, current_process
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterator, List, Optional, Set
 
 import numpy
-from pandas import DataFrame
+from pandas import DataFrame, Series, factorize
 
 from .error_logger import ErrorLogger
 from .cast import isna
-from .io import read_file, fuzzy_text
+from .concurrent import get_shared_object, process_pool, shared_objects
+from .constants import MERGE_CHUNK_SIZE, MERGE_KEY_CACHE_FILE_NAME, MERGE_PARALLEL_THRESHOLD
+from .io import read_file, fuzzy_text, fuzzy_text_series
+from .key_cache import MergeKeyCache, merge_signatures
+from .metadata_index import MetadataIndex
 from .net import download_snapshot
-from .time import datetime_isoformat
+from .time import ISO_DATE_FORMAT, datetime_isoformat, datetime_isoformat_series
 from .utils import (
     derive_localities,
     infer_new_and_total,
@@ -33,6 +44,53 @@ from .utils import (
 )
 
 
+class _CopyOnAccessTables(Mapping):
+    """
+    Read-only view of the auxiliary tables which makes a copy of each table the first time it is
+    accessed, so data sources are free to modify them without affecting the shared tables and
+    without having to pay for copying the tables which are never used.
+    """
+
+    def __init__(self, tables: Dict[str, DataFrame]):
+        self._tables = tables
+        self._copies: Dict[str, DataFrame] = {}
+
+    def __getitem__(self, name: str) -> DataFrame:
+        if name not in self._copies:
+            self._copies[name] = self._tables[name].copy()
+        return self._copies[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+# Name of the shared object holding the auxiliary tables while records are merged in parallel
+_MERGE_AUX_NAME = "data_source_merge_aux"
+
+
+def _merge_chunk(data_source: "DataSource", records: DataFrame) -> List[Optional[str]]:
+    """ Merges a chunk of records one by one, using the auxiliary tables shared with the pool """
+    aux = get_shared_object(_MERGE_AUX_NAME)
+    keys = MetadataIndex.for_table(aux["metadata"]).keys
+    return records.apply(lambda x: data_source.merge(x, aux, keys), axis=1).tolist()
+
+
+def _group_codes(data: DataFrame, columns: List[str]) -> numpy.ndarray:
+    """
+    Labels each record with a number from 0 to the count of distinct combinations of values of the
+    given columns, in order of first appearance. Null values are equal to each other.
+    """
+    codes = numpy.zeros(len(data), dtype=numpy.int64)
+    for col in columns:
+        col_codes, uniques = factorize(data[col])
+        # Null values are given their own code, since factorize labels them as -1
+        codes, _ = factorize(codes * (len(uniques) + 1) + col_codes + 1)
+    return codes
+
+
 class DataSource(ErrorLogger):
     """
     Interface for data sources. A data source consists of a series of steps performed in the
@@ -52,9 +110,53 @@ class DataSource(ErrorLogger):
 
     config: Dict[str, Any]
 
+    stage_metrics: List[Dict[str, Any]]
+    """ Wall time, CPU time, row counts and peak memory of each stage of the last run """
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__()
         self.config = config or {}
+        self.stage_metrics = []
+        self._stage_stack: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def measure_stage(self, stage: str, rows_in: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Measures the wall time and CPU time of a stage of this data source, as well as its peak
+        memory if tracemalloc is tracing. The yielded record can be used to set `rows_out`. Stages
+        can be nested, in which case the peak memory of the outer stage includes the inner ones.
+        Records are appended to `stage_metrics` and logged at the debug level.
+
+        Arguments:
+            stage: Name of the stage.
+            rows_in: Number of records fed into the stage.
+        Returns:
+            Iterator[Dict[str, Any]]: Record with the metrics of the stage.
+        """
+        record = {"stage": stage, "rows_in": rows_in, "rows_out": None}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # Keep the peak of the enclosing stage before resetting it
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            for parent in self._stage_stack:
+                parent["peak_memory"] = max(parent["peak_memory"], peak_memory)
+            tracemalloc.reset_peak()
+        record["peak_memory"] = 0 if tracing else None
+
+        self._stage_stack.append(record)
+        wall_time = time.perf_counter()
+        cpu_time = time.thread_time()
+        try:
+            yield record
+        finally:
+            record["wall_time"] = time.perf_counter() - wall_time
+            record["cpu_time"] = time.thread_time() - cpu_time
+            if tracing:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                record["peak_memory"] = max(record["peak_memory"], peak_memory)
+            self._stage_stack.pop()
+            self.stage_metrics.append(record)
+            self.log_debug("Data source stage", source_name=self.__class__.__name__, **record)
 
     def fetch(
         self, output_folder: Path, cache: Dict[str, str], fetch_opts: List[Dict[str, Any]]
@@ -101,7 +203,13 @@ class DataSource(ErrorLogger):
                 "usecols",
             )
         }
-        return self.parse_dataframes(self._read(sources, **read_opts), aux, **parse_opts)
+        with self.measure_stage("read") as stage:
+            dataframes = self._read(sources, **read_opts)
+            stage["rows_out"] = sum(len(df) for df in dataframes.values())
+        with self.measure_stage("parse_dataframes", rows_in=stage["rows_out"]) as stage:
+            data = self.parse_dataframes(dataframes, aux, **parse_opts)
+            stage["rows_out"] = len(data)
+        return data
 
     def parse_dataframes(
         self, dataframes: Dict[str, DataFrame], aux: Dict[str, DataFrame], **parse_opts
@@ -116,8 +224,8 @@ class DataSource(ErrorLogger):
         Outputs a key used to merge this record with the datasets.
         The key must be present in the `aux` DataFrame index.
         """
-        # Merge only needs the metadata auxiliary data table
-        metadata = aux["metadata"]
+        # Merge only needs the metadata auxiliary data table, which is indexed only once
+        index = MetadataIndex.for_table(aux["metadata"])
 
         # If date is provided, make sure it follows ISO format
         if "date" in record:
@@ -131,26 +239,18 @@ class DataSource(ErrorLogger):
 
         # Exact key match might be possible and it's the fastest option
         if "key" in record and not isna(record["key"]):
-            if record["key"] in metadata["key"].values:
+            if record["key"] in index.keys:
                 return record["key"]
             else:
                 self.log_error(f"Key provided but not found in metadata", record=record)
                 return None
 
         # Start by filtering the auxiliary dataset as much as possible
-        for column_prefix in ("country", "subregion1", "subregion2", "locality"):
-            for column_suffix in ("code", "name"):
-                column = "{}_{}".format(column_prefix, column_suffix)
-                if column not in record:
-                    continue
-                elif isna(record[column]):
-                    metadata = metadata[metadata[column].isna()]
-                elif record[column]:
-                    metadata = metadata[metadata[column] == record[column]]
+        candidates = index.filter(record)
 
         # Auxiliary dataset might have a single record left, then we are done
-        if len(metadata) == 1:
-            return metadata.iloc[0]["key"]
+        if len(candidates) == 1:
+            return index.key(next(iter(candidates)))
 
         # Compute a fuzzy version of the record's match string for comparison
         match_string = fuzzy_text(record["match_string"]) if "match_string" in record else None
@@ -160,44 +260,134 @@ class DataSource(ErrorLogger):
             for column_prefix in ("subregion1", "subregion2", "locality"):
                 for column_suffix in ("code", "name"):
                     column = "{}_{}".format(column_prefix, column_suffix)
-                    aux_match = metadata[column + "_fuzzy"] == match_string
-                    if sum(aux_match) == 1:
-                        return metadata[aux_match].iloc[0]["key"]
+                    aux_match = candidates & index.rows(column + "_fuzzy", match_string)
+                    if len(aux_match) == 1:
+                        return index.key(next(iter(aux_match)))
 
         # Provided match string could be identical to `match_string` (or with simple fuzzy match)
         if match_string is not None:
-            aux_match_1 = metadata["match_string_fuzzy"] == match_string
-            if sum(aux_match_1) == 1:
-                return metadata[aux_match_1].iloc[0]["key"]
-            aux_match_2 = metadata["match_string"] == record["match_string"]
-            if sum(aux_match_2) == 1:
-                return metadata[aux_match_2].iloc[0]["key"]
+            aux_match_1 = candidates & index.rows("match_string_fuzzy", match_string)
+            if len(aux_match_1) == 1:
+                return index.key(next(iter(aux_match_1)))
+            aux_match_2 = candidates & index.rows("match_string", record["match_string"])
+            if len(aux_match_2) == 1:
+                return index.key(next(iter(aux_match_2)))
 
         # Last resort is to match the `match_string` column with a regex from aux
         if match_string is not None:
-            aux_mask = ~metadata["match_string"].isna()
-            aux_regex = metadata["match_string"][aux_mask].apply(
-                lambda x: re.compile(x, re.IGNORECASE)
-            )
             for search_string in (match_string, record["match_string"]):
-                # pylint: disable=cell-var-from-loop
-                aux_match = aux_regex.apply(lambda x: bool(x.match(search_string)))
-                if sum(aux_match) == 1:
-                    metadata = metadata[aux_mask]
-                    return metadata[aux_match].iloc[0]["key"]
+                aux_match = index.regex_rows(search_string, candidates)
+                if len(aux_match) == 1:
+                    return index.key(next(iter(aux_match)))
 
             # Log debug info
             self.log_debug(
                 "Match info",
-                aux_regex=aux_regex,
                 match_string=match_string,
                 record=record,
-                metadata=metadata,
+                candidates=[index.key(row) for row in sorted(candidates)],
             )
 
         self.log_error(f"No key match found", record=record)
         return None
 
+    def merge_table(
+        self,
+        data: DataFrame,
+        aux: Dict[str, DataFrame],
+        key_cache: MergeKeyCache = None,
+        iso_dates: bool = False,
+    ) -> Series:
+        """
+        Outputs the keys used to merge all the records in `data` with the datasets, which is the
+        same as calling `merge` for each record. Most records are resolved at once using joins
+        against the metadata table, and only the rest go through `merge` one by one. If a cache is
+        given, the keys resolved in previous runs are reused and the new ones are added to it. If
+        `iso_dates` is set, all the dates are known to be valid dates in ISO format already, so they
+        are not parsed again.
+        """
+        keys = Series(None, index=data.index, dtype=object)
+        index = MetadataIndex.for_table(aux["metadata"])
+        merge_func = lambda x: self.merge(x, aux, index.keys)
+
+        # Data sources which override the merge function are merged one record at a time
+        unresolved = numpy.ones(len(data), dtype=bool)
+        if type(self).merge is DataSource.merge:
+
+            # Records with an invalid date are left for the fallback, which logs them
+            valid = numpy.ones(len(data), dtype=bool)
+            if "date" in data.columns and not iso_dates:
+                valid = datetime_isoformat_series(data["date"], ISO_DATE_FORMAT).notna().values
+
+            # Records with the same signature as records from previous runs get the same key
+            signatures = None
+            cached = numpy.zeros(len(data), dtype=bool)
+            source_name = f"{self.__class__.__module__}.{self.__class__.__name__}"
+            if key_cache is not None:
+                signatures = merge_signatures(data[valid])
+            if signatures is not None:
+                cached_keys, found = key_cache.get(source_name, index.content_hash, signatures)
+                keys[valid] = cached_keys.values
+                cached[valid] = found
+                self.log_info("Merge key cache", hits=int(found.sum()), misses=int((~found).sum()))
+                cached_misses = int((found & cached_keys.isna().values).sum())
+                if cached_misses:
+                    self.log_error(f"No key match found", cached_records=cached_misses)
+            pending = valid & ~cached
+
+            match_strings = None
+            if "match_string" in data.columns:
+                match_strings = fuzzy_text_series(data.loc[pending, "match_string"])
+
+            keys[pending] = index.resolve(data[pending], match_strings=match_strings).values
+            unresolved = keys.isna().values & ~cached
+
+        unresolved_count = unresolved.sum()
+        threshold = self.config.get("merge", {}).get("parallel_threshold", MERGE_PARALLEL_THRESHOLD)
+        if unresolved_count >= threshold:
+            keys[unresolved] = self.merge_parallel(data[unresolved], aux)
+        elif unresolved_count > 0:
+            keys[unresolved] = data[unresolved].apply(merge_func, axis=1).values
+
+        if signatures is not None:
+            key_cache.put(source_name, index.content_hash, signatures[~found], keys[pending])
+        return keys
+
+    def merge_parallel(
+        self,
+        data: DataFrame,
+        aux: Dict[str, DataFrame],
+        process_count: int = None,
+        chunk_size: int = MERGE_CHUNK_SIZE,
+    ) -> List[Optional[str]]:
+        """
+        Same as calling `merge` for each record, but the records are split into chunks which are
+        merged in a pool of worker processes. The auxiliary tables, along with the index of the
+        metadata table, are inherited by the workers instead of being copied for each chunk. When
+        called from within a pool worker, which cannot start processes of its own, the chunks are
+        merged in a pool of threads instead.
+
+        Arguments:
+            data: Records to be merged.
+            aux: Map of auxiliary DataFrames used as part of the processing of this DataSource.
+            process_count: Maximum number of processes to run in parallel, defaults to the
+                number of CPUs.
+            chunk_size: Number of records merged by each task.
+        Returns:
+            List[Optional[str]]: Key of each record, or None if it could not be merged.
+        """
+        MetadataIndex.for_table(aux["metadata"])
+        chunks = [data.iloc[idx : idx + chunk_size] for idx in range(0, len(data), chunk_size)]
+        worker_count = min(process_count or cpu_count(), len(chunks))
+        with shared_objects(**{_MERGE_AUX_NAME: aux}):
+            # Pool workers are daemonic and cannot start processes of their own, so they use threads
+            if current_process().daemon:
+                pool = ThreadPool(worker_count)
+            else:
+                pool = process_pool(worker_count)
+            with pool:
+                return list(chain.from_iterable(pool.map(partial(_merge_chunk, self), chunks)))
+
     def run(
         self,
         output_folder: Path,
@@ -218,8 +408,25 @@ class DataSource(ErrorLogger):
             DataFrame: Processed data, with columns defined in config.yaml corresponding to the
                 DataPipeline that this DataSource is part of.
         """
-        data: DataFrame = None
+        sources = self.run_fetch(output_folder, cache, skip_existing=skip_existing)
+        key_cache = MergeKeyCache(output_folder / MERGE_KEY_CACHE_FILE_NAME)
+        return self.run_parse(sources, aux, key_cache=key_cache)
+
+    def run_fetch(
+        self, output_folder: Path, cache: Dict[str, str], skip_existing: bool = False
+    ) -> Dict[str, str]:
+        """
+        Executes the fetch step for this data source using the options from its config. This step
+        is bound by network I/O, so it is run separately from the rest of the steps.
+
+        Args:
+            output_folder: Root folder where snapshot, intermediate and tables will be placed.
+            cache: Map of data sources that are stored in the cache layer (used for daily-only).
+            skip_existing: Flag indicating whether to use the locally stored snapshots if possible.
 
+        Returns:
+            Dict[str, str]: Same as the output of `fetch()`.
+        """
         # Insert skip_existing flag to fetch options if requested
         fetch_opts = self.config.get("fetch", [])
         if skip_existing:
@@ -227,65 +434,112 @@ class DataSource(ErrorLogger):
                 opt["opts"] = {**opt.get("opts", {}), "skip_existing": True}
 
         # Fetch the data, feeding the cached resources to the fetch step
-        data = self.fetch(output_folder, cache, fetch_opts)
+        self.stage_metrics = []
+        with self.measure_stage("fetch") as stage:
+            sources = self.fetch(output_folder, cache, fetch_opts)
+            stage["rows_out"] = len(sources)
+        return sources
+
+    def run_parse(
+        self, sources: Dict[str, str], aux: Dict[str, DataFrame], key_cache: MergeKeyCache = None
+    ) -> DataFrame:
+        """
+        Executes the parse and merge steps for this data source, using the already fetched sources.
 
-        # Make yet another copy of the auxiliary table to avoid affecting future steps in `parse`
+        Args:
+            sources: Output of `run_fetch()`.
+            aux: Map of auxiliary DataFrames used as part of the processing of this DataSource.
+            key_cache: Cache of the keys resolved during the merge step in previous runs.
+
+        Returns:
+            DataFrame: Processed data, with columns defined in config.yaml corresponding to the
+                DataPipeline that this DataSource is part of.
+        """
+        data: DataFrame = None
+
+        # Make yet another copy of the auxiliary tables used to avoid affecting future steps
         parse_opts = self.config.get("parse", {})
-        data = self.parse(data, {name: df.copy() for name, df in aux.items()}, **parse_opts)
+        with self.measure_stage("parse") as stage:
+            data = self.parse(sources, _CopyOnAccessTables(aux), **parse_opts)
+            stage["rows_out"] = len(data)
 
         # Merge expects for null values to be NaN (otherwise grouping does not work as expected)
         data.replace([None], numpy.nan, inplace=True)
 
-        # Get a set with all the known keys so we can use the information during the merge step
-        known_keys = set(aux["metadata"]["key"].values)
-        merge_func = lambda x: self.merge(x, aux, known_keys)
-
-        # Merging is done record by record, but can be sped up if we build a map first aggregating
-        # by the non-temporal fields and only matching the aggregated records with keys
+        # Merging is done for all records at once, but can be sped up if we build a map first
+        # aggregating by the non-temporal fields and only matching the aggregated records with keys
         merge_opts = self.config.get("merge", {})
-        key_merge_columns = [
-            col for col in data if col in aux["metadata"].columns and len(data[col].unique()) > 1
-        ]
-        if not key_merge_columns or (merge_opts and merge_opts.get("serial")):
-            data["key"] = data.apply(merge_func, axis=1)
-
-        else:
-            # Build a _vec column used to merge the key back from the groups into data
-            make_key_vec = lambda x: "|".join([str(x[col]) for col in key_merge_columns])
-            data["_vec"] = data[key_merge_columns].apply(make_key_vec, axis=1)
-
-            # Iterate only over the grouped data to merge with the metadata key
-            grouped_data = data.groupby("_vec").first().reset_index()
-            grouped_data["key"] = grouped_data.apply(merge_func, axis=1)
-
-            # Merge the grouped data which has key back with the original data
-            if "key" in data.columns:
-                data = data.drop(columns=["key"])
-            data = data.merge(grouped_data[["key", "_vec"]], on="_vec").drop(columns=["_vec"])
-
-        # Drop records which have no key merged
-        # TODO: log records with missing key somewhere on disk
-        data = data.dropna(subset=["key"])
+        with self.measure_stage("merge", rows_in=len(data)) as stage:
+
+            # Dates are converted to ISO format at once, dropping the records with invalid dates, so
+            # they don't need to be checked again when merging
+            if "date" in data.columns:
+                dates = datetime_isoformat_series(data["date"], ISO_DATE_FORMAT)
+                invalid = dates.isna().values
+                if invalid.any():
+                    invalid_dates = data.loc[invalid, "date"].drop_duplicates().head(10)
+                    self.log_error(
+                        f"Invalid date",
+                        invalid_records=int(invalid.sum()),
+                        invalid_dates=invalid_dates.tolist(),
+                    )
+                    data = data[~invalid].copy()
+                data["date"] = dates.values[~invalid]
+
+            key_merge_columns = [
+                col
+                for col in data
+                if col in aux["metadata"].columns and data[col].nunique(dropna=False) > 1
+            ]
+            if not key_merge_columns or (merge_opts and merge_opts.get("serial")):
+                data["key"] = self.merge_table(data, aux, key_cache=key_cache, iso_dates=True)
+
+            else:
+                # Label each record with the group of records sharing its key merge columns
+                group_codes = _group_codes(data, key_merge_columns)
+
+                # Merge only the grouped data with the metadata key
+                grouped_data = data.groupby(group_codes, sort=False).first().reset_index(drop=True)
+                grouped_keys = self.merge_table(
+                    grouped_data, aux, key_cache=key_cache, iso_dates=True
+                )
+
+                # Map the key of each group back to the records of the original data
+                data = data.reset_index(drop=True)
+                data["key"] = grouped_keys.values[group_codes]
+
+            # Drop records which have no key merged
+            # TODO: log records with missing key somewhere on disk
+            data = data.dropna(subset=["key"])
+            stage["rows_out"] = len(data)
 
         # Filter out data according to the user-provided filter function
         if "query" in self.config:
             data = data.query(self.config["query"]).copy()
 
         # Derive localities from all regions
-        localities = derive_localities(aux["localities"], data)
-        if len(localities) > 0:
-            data = data.append(localities)
+        with self.measure_stage("derive_localities", rows_in=len(data)) as stage:
+            localities = derive_localities(aux["localities"], data)
+            if len(localities) > 0:
+                data = data.append(localities)
+            stage["rows_out"] = len(data)
 
         # Provide a stratified view of certain key variables
         if any(stratify_column in data.columns for stratify_column in ("age", "sex")):
-            data = stratify_age_sex_ethnicity(data)
+            with self.measure_stage("stratify", rows_in=len(data)) as stage:
+                data = stratify_age_sex_ethnicity(data)
+                stage["rows_out"] = len(data)
 
         # Process each record to add missing cumsum or daily diffs
-        data = infer_new_and_total(data)
+        with self.measure_stage("infer_new_and_total", rows_in=len(data)) as stage:
+            data = infer_new_and_total(data)
+            stage["rows_out"] = len(data)
 
         if parse_opts.get("backfill"):
             # Backfill cumulative fields with previous entries.
-            backfill_cumulative_fields_inplace(data)
+            with self.measure_stage("backfill", rows_in=len(data)) as stage:
+                backfill_cumulative_fields_inplace(data)
+                stage["rows_out"] = len(data)
 
         # Return the final dataframe
         return data
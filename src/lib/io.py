@@ -15,7 +15,7 @@
 import os
 import re
 from contextlib import contextmanager
-from functools import partial
+from functools import lru_cache, partial
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import Any, Callable, Dict, Iterator, List, Optional, Union
@@ -28,33 +28,104 @@ from pandas import DataFrame, Int64Dtype
 from tqdm import tqdm
 from unidecode import unidecode
 
-from .cast import column_converters, isna, safe_int_cast
+from .cast import (
+    cast_table,
+    column_converters,
+    column_series_converters,
+    safe_float_cast,
+    safe_int_cast,
+    safe_str_cast,
+)
 from .constants import GLOBAL_DISABLE_PROGRESS
 
 
-def fuzzy_text(text: str, remove_regex: str = r"[^a-z\s]", remove_spaces: bool = True):
+# Values parsed as null by `read_file`, instead of the many defaults from pandas
+_DEFAULT_NA_VALUES = ["", "N/A"]
+
+# Options of `read_table` which need the converters to be called for each value
+_READ_TABLE_SCALAR_OPTS = (
+    "converters",
+    "dtype",
+    "na_values",
+    "keep_default_na",
+    "index_col",
+    "chunksize",
+    "iterator",
+)
+
+# Connecting words removed from the middle of the text by `fuzzy_text`, in order
+_FUZZY_CONNECTORS = [re.compile(f" {token} ") for token in ("y", "and", "of")]
+_FUZZY_CONNECTORS_ANY = re.compile(r" (?:y|and|of) ")
+
+# Words stripped from the start and the end of the text by `fuzzy_text`, in order
+_FUZZY_AFFIX_WORDS = ("county", "region", "borough", "province", "department", "district")
+_FUZZY_AFFIXES = [
+    pattern
+    for word in _FUZZY_AFFIX_WORDS
+    for pattern in (re.compile(f"^{word} "), re.compile(f" {word}$"))
+]
+_FUZZY_AFFIXES_ANY = re.compile("|".join(_FUZZY_AFFIX_WORDS))
+_FUZZY_SPACES = re.compile(r"\s+")
+
+
+def _fuzzy_text(text: Any, remove_regex: str, remove_spaces: bool) -> str:
     # TODO: handle bad inputs (like empty text)
     text = unidecode(str(text)).lower()
-    for token in ("y", "and", "of"):
-        text = re.sub(f" {token} ", " ", text)
+
+    # The substitutions are only done if there is anything to replace, since most strings have
+    # none of the tokens, but they are done one at a time because their order matters
+    if _FUZZY_CONNECTORS_ANY.search(text):
+        for pattern in _FUZZY_CONNECTORS:
+            text = pattern.sub(" ", text)
     if remove_regex:
         text = re.sub(remove_regex, "", text)
-    text = re.sub(r"^county ", "", text)
-    text = re.sub(r" county$", "", text)
-    text = re.sub(r"^region ", "", text)
-    text = re.sub(r" region$", "", text)
-    text = re.sub(r"^borough ", "", text)
-    text = re.sub(r" borough$", "", text)
-    text = re.sub(r"^province ", "", text)
-    text = re.sub(r" province$", "", text)
-    text = re.sub(r"^department ", "", text)
-    text = re.sub(r" department$", "", text)
-    text = re.sub(r"^district ", "", text)
-    text = re.sub(r" district$", "", text)
-    text = re.sub(r"\s+", "" if remove_spaces else " ", text)
+    if _FUZZY_AFFIXES_ANY.search(text):
+        for pattern in _FUZZY_AFFIXES:
+            text = pattern.sub("", text)
+
+    text = _FUZZY_SPACES.sub("" if remove_spaces else " ", text)
     return text.strip()
 
 
+@lru_cache(maxsize=2 ** 16)
+def _fuzzy_text_cached(text: str, remove_regex: str, remove_spaces: bool) -> str:
+    return _fuzzy_text(text, remove_regex, remove_spaces)
+
+
+def fuzzy_text(text: str, remove_regex: str = r"[^a-z\s]", remove_spaces: bool = True) -> str:
+    # Only strings are memoized, since other values which compare equal may not print the same
+    if type(text) is str:
+        return _fuzzy_text_cached(text, remove_regex, remove_spaces)
+    return _fuzzy_text(text, remove_regex, remove_spaces)
+
+
+def fuzzy_text_series(
+    values: pandas.Series, remove_regex: str = r"[^a-z\s]", remove_spaces: bool = True
+) -> pandas.Series:
+    """
+    Same as applying `fuzzy_text` to each of the values, but computed only once for each distinct
+    value when the values are strings.
+
+    Arguments:
+        values: Values to be converted.
+        remove_regex: Same as the argument of `fuzzy_text`.
+        remove_spaces: Same as the argument of `fuzzy_text`.
+    Returns:
+        Series: Fuzzy version of each of the values, with the same index.
+    """
+    fuzzy_func = partial(fuzzy_text, remove_regex=remove_regex, remove_spaces=remove_spaces)
+    if pandas.api.types.infer_dtype(values, skipna=True) != "string":
+        return values.apply(fuzzy_func).astype(object)
+
+    # Null values are converted one by one, since None and NaN do not print the same
+    result = numpy.empty(len(values), dtype=object)
+    null_mask = values.isna().values
+    codes, uniques = pandas.factorize(values.values[~null_mask])
+    result[~null_mask] = numpy.array([fuzzy_func(value) for value in uniques], dtype=object)[codes]
+    result[null_mask] = [fuzzy_func(value) for value in values.values[null_mask]]
+    return pandas.Series(result, index=values.index, dtype=object)
+
+
 def parse_dtype(dtype_name: str) -> Any:
     """
     Parse a dtype name into its pandas name. Only the following dtypes are supported in
@@ -84,10 +155,10 @@ def read_file(path: Union[Path, str], file_type: str = None, **read_opts) -> Dat
     ext = file_type or str(path).split(".")[-1]
 
     # Keep a list of known extensions here so we don't forget to update it
-    known_extensions = ("csv", "json", "html", "xls", "xlsx", "zip")
+    known_extensions = ("csv", "json", "html", "parquet", "xls", "xlsx", "zip")
 
     # Hard-code a set of sensible defaults to reduce the amount of magic Pandas provides
-    default_read_opts = {"keep_default_na": False, "na_values": ["", "N/A"]}
+    default_read_opts = {"keep_default_na": False, "na_values": _DEFAULT_NA_VALUES}
 
     if ext == "csv":
         return pandas.read_csv(path, **{**default_read_opts, **read_opts})
@@ -96,6 +167,8 @@ def read_file(path: Union[Path, str], file_type: str = None, **read_opts) -> Dat
     if ext == "html":
         with open(path, "r") as fd:
             return read_html(fd.read(), **read_opts)
+    if ext == "parquet":
+        return pandas.read_parquet(path, **read_opts)
     if ext == "xls" or ext == "xlsx":
         return pandas.read_excel(path, **{**default_read_opts, **read_opts})
     if ext == "zip":
@@ -132,6 +205,29 @@ def read_lines(path: Path, mode: str = "r", skip_empty: bool = False) -> Iterato
             yield line
 
 
+def _infer_converted_dtype(values: pandas.Series, raw_values: pandas.Series) -> pandas.Series:
+    """
+    Converts the output of the vectorized int and float converters to the dtype that the values
+    would get when `read_file` calls the scalar converters for each of the `raw_values`.
+    """
+    if values.dtype == object:
+        return values.infer_objects()
+
+    # Columns where all the converters return None are left as objects, but a float converter
+    # can also return NaN for strings like "nan" which are not null values for `read_file`
+    null_mask = values.isna().values
+    if null_mask.all() and (
+        values.dtype.kind != "f"
+        or all(safe_float_cast(value) is None for value in raw_values[raw_values.notna()])
+    ):
+        return pandas.Series(
+            [None] * len(values), index=values.index, name=values.name, dtype=object
+        )
+    if null_mask.any() or values.dtype.kind == "f":
+        return values.astype(float)
+    return values.astype(numpy.int64)
+
+
 def read_table(path: Union[Path, str], schema: Dict[str, Any] = None, **read_opts) -> DataFrame:
     """
     Schema-aware version of `read_file` which converts the columns to the appropriate type
@@ -142,7 +238,35 @@ def read_table(path: Union[Path, str], schema: Dict[str, Any] = None, **read_opt
     Returns:
         Callable[[Union[Path, str]], DataFrame]: Function like `read_file`
     """
-    return read_file(path, converters=column_converters(schema or {}), **read_opts)
+    # Parquet files embed the type of each column, so they need no conversion
+    ext = read_opts.get("file_type") or str(path).split(".")[-1]
+    if ext == "parquet":
+        return read_file(path, **read_opts)
+
+    schema = schema or {}
+    converters = column_converters(schema)
+    if ext != "csv" or any(opt in read_opts for opt in _READ_TABLE_SCALAR_OPTS):
+        return read_file(path, converters=converters, **read_opts)
+
+    # Columns are read as strings and converted all at once, which is much faster than calling the
+    # converter for each value. The str converter keeps all values as-is, so str columns have no
+    # null values, and other columns parse the usual null values which their converters turn into
+    # null values as well. Columns outside of the schema only get the usual null values if they are
+    # listed, so only the header is read first to list them all before reading the table once.
+    str_columns = [col for col, func in converters.items() if func == safe_str_cast]
+    na_values = _DEFAULT_NA_VALUES
+    if str_columns:
+        header = read_file(path, **{**read_opts, "nrows": 0}).columns
+        na_values = {col: [] if col in str_columns else _DEFAULT_NA_VALUES for col in header}
+    dtype = {col: str for col in converters}
+    data = read_file(path, na_values=na_values, dtype=dtype, **read_opts)
+
+    series_converters = column_series_converters(schema)
+    for column in converters:
+        if column in data.columns and column not in str_columns:
+            values = series_converters[column](data[column])
+            data[column] = _infer_converted_dtype(values, data[column])
+    return data
 
 
 def _get_html_columns(row: Tag) -> List[Tag]:
@@ -203,35 +327,74 @@ def read_html(
     return data
 
 
-def _dtype_formatter(dtype: Any) -> Callable[[Any], str]:
+def _format_float_series(values: pandas.Series) -> pandas.Series:
+    """
+    Formats floating point values rounded to 6 decimals, exactly as `str(round(val, 6))` would. The
+    rounding is done by numpy, which differs from Python's correctly rounded `round()` only for
+    values which are too large or very close to a tie, so those go through the slow path.
     """
-    Parse a dtype name and output the formatter used for printing it as a string.
+    array = values.to_numpy(dtype=float)
+    with numpy.errstate(invalid="ignore", over="ignore"):
+        scaled = array * 1e6
+        scaled_frac = numpy.abs(scaled - numpy.floor(scaled) - 0.5)
+        fallback_mask = ~numpy.isfinite(scaled) | (numpy.abs(scaled) >= 2 ** 52)
+        fallback_mask |= scaled_frac < 1e-3
+    fallback_mask &= ~numpy.isnan(array)
+
+    result = numpy.round(array, 6).astype(str).astype(object)
+    result[fallback_mask] = [str(round(val, 6)) for val in array[fallback_mask].tolist()]
+    return pandas.Series(result, index=values.index)
+
+
+def _format_int_series(values: pandas.Series) -> pandas.Series:
+    """ Formats integer values, falling back to the slow path for non-integer dtypes """
+    if values.dtype == object:
+        return values.map(lambda val: "%d" % val)
+    return values.astype(str)
+
+
+def _dtype_formatter(dtype: Any) -> Callable[[pandas.Series], pandas.Series]:
+    """
+    Parse a dtype name and output the formatter used for printing a column of values as strings.
+    The input values are expected to be already converted to the appropriate type.
 
     Arguments:
         dtype: dtype object.
     Returns:
-        str: formatting string.
+        Callable[[Series], Series]: formatting function.
     """
 
     if dtype == "str" or dtype == str:
-        return lambda val: str(val)
+        return lambda values: values.astype(str)
     if dtype == "float" or dtype == float:
-        return lambda val: round(val, 6)
+        return _format_float_series
     if dtype == "int" or isinstance(dtype, Int64Dtype):
-        return lambda val: "%d" % val
+        return _format_int_series
     raise TypeError(f"Unsupported dtype: {dtype}")
 
 
-def _format_call(format_func: Callable[[Any], str], val: Any) -> str:
+def _format_call(format_func: Callable[[pandas.Series], pandas.Series], values: pandas.Series):
     """
     Wrap the format function call to return empty string when value is null.
     Arguments:
         format_func: Formatting function.
-        val: Value to be formatted.
+        values: Values to be formatted.
     Returns:
-        str: Empty string if val is null, otherwise the result of `format_func(val)`.
+        Series: Empty string where values are null, otherwise the result of `format_func`.
     """
-    return "" if isna(val, skip_pandas_nan=True) else format_func(val)
+    null_mask = values.isna().values
+    result = numpy.full(len(values), "", dtype=object)
+    if not null_mask.all():
+        # Format only the unique values, since most columns have many repeated values
+        array = values.values[~null_mask]
+        if array.dtype == numpy.float64:
+            # Compare the underlying bits to tell apart values like 0.0 and -0.0
+            codes, uniques = pandas.factorize(array.view(numpy.int64))
+            uniques = uniques.view(numpy.float64)
+        else:
+            codes, uniques = pandas.factorize(array)
+        result[~null_mask] = format_func(pandas.Series(uniques)).values[codes]
+    return pandas.Series(result, index=values.index)
 
 
 def export_csv(
@@ -264,21 +427,45 @@ def export_csv(
         formatters = {col: _dtype_formatter(dtype) for col, dtype in schema.items()}
 
     # Convert all columns to appropriate type
-    for column, converter in column_converters(schema or {}).items():
+    for column, converter in column_series_converters(schema or {}).items():
         if column in header:
-            converter = partial(converter, skip_pandas_nan=True)
-            data[column] = data[column].fillna(numpy.nan).apply(converter)
+            data[column] = converter(data[column])
 
     # Format the data as a string one column at a time
-    data_fmt = DataFrame(columns=header, index=data.index)
+    columns_fmt = {}
     for column, format_func in formatters.items():
         if column in header:
-            map_func = partial(_format_call, format_func)
-            data_fmt[column] = data[column].apply(map_func)
+            columns_fmt[column] = _format_call(format_func, data[column])
 
+    data_fmt = DataFrame(columns_fmt, columns=header, index=data.index)
     return data_fmt.to_csv(path_or_buf=path, index=False, **csv_opts)
 
 
+def export_parquet(
+    data: DataFrame, path: Union[Path, str], schema: Dict[str, Any] = None, **parquet_opts
+) -> None:
+    """
+    Exports a DataFrame to Parquet, a binary columnar format which embeds the type of each column.
+    Unlike `export_csv`, values are not formatted as strings and can be read back with their type
+    and without any parsing using `read_table`. Same as CSV tables read with `read_table`, str
+    columns have no null values, see `cast_table`.
+
+    Arguments:
+        data: DataFrame to be output as Parquet.
+        path: Location on disk to write the Parquet file to.
+        schema: Dictionary of <column, dtype>.
+        parquet_opts: Additional options passed to the `DataFrame.to_parquet()` method.
+    """
+
+    # Without a schema, all columns are considered to be strings
+    if schema is None:
+        schema = {column: "str" for column in data.columns}
+
+    # Convert all columns to the appropriate type
+    data = cast_table(data, schema).reset_index(drop=True)
+    data.to_parquet(str(path), index=False, **parquet_opts)
+
+
 def pbar(*args, **kwargs) -> tqdm:
     """
     Helper function used to display a tqdm progress bar respecting global settings for whether all
@@ -0,0 +1,185 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy
+import pandas
+from pandas import DataFrame, Series
+
+from .metadata_index import MERGE_FILTER_COLUMNS
+
+# Columns of a record which are used to decide its key during the merge step
+MERGE_SIGNATURE_COLUMNS = ("key",) + MERGE_FILTER_COLUMNS + ("match_string",)
+
+# Seconds to wait for other processes writing to the cache before giving up
+_SQLITE_TIMEOUT = 60
+
+# Maximum number of signatures looked up with a single query
+_LOOKUP_CHUNK_SIZE = 900
+
+# Connections opened by this process, by database path, process ID and thread ID
+_CONNECTIONS: Dict[Tuple[str, int, int], sqlite3.Connection] = {}
+
+# Metadata hashes known to be the current one of each database, see `MergeKeyCache._purge_stale`
+_CURRENT_HASHES: Set[Tuple[str, str]] = set()
+
+
+def merge_signatures(data: DataFrame) -> Optional[Series]:
+    """
+    Computes a signature for each record from the values of the columns used to decide its key,
+    so records with the same signature are always merged with the same key.
+
+    Arguments:
+        data: Records to be merged.
+    Returns:
+        Series: Signature of each record, or None if the records cannot be given a signature
+            because some of the columns have values of mixed types.
+    """
+    columns = [col for col in MERGE_SIGNATURE_COLUMNS if col in data.columns]
+    signatures = Series(",".join(f"{col}:{data[col].dtype}" for col in columns), index=data.index)
+    for col in columns:
+        values = data[col]
+        if values.dtype == object and pandas.api.types.infer_dtype(values, skipna=True) not in (
+            "string",
+            "empty",
+        ):
+            return None
+
+        # Null values are told apart from strings which print the same
+        strings = values.astype(str)
+        null_mask = values.isna()
+        strings[null_mask] = "\x1e" + strings[null_mask]
+        signatures = signatures + "\x1f" + strings
+
+    return signatures
+
+
+class MergeKeyCache:
+    """
+    Persistent cache of the keys resolved during the merge step, stored in a SQLite database so it
+    can be shared by multiple processes. Keys are stored by data source and record signature, along
+    with the content hash of the metadata table used to resolve them; keys resolved using other
+    versions of the metadata table are never returned, and are purged the first time new keys are
+    stored after the metadata table changes. The database is only created once it is first used.
+    """
+
+    hits: int
+    """ Number of signatures found in the cache """
+
+    misses: int
+    """ Number of signatures not found in the cache """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """ Returns the connection of the current process and thread, opening it the first time """
+        conn_id = (str(self.path), os.getpid(), threading.get_ident())
+
+        # The database may have been deleted since it was opened, in which case it is created again
+        if conn_id in _CONNECTIONS and not self.path.exists():
+            _CONNECTIONS.pop(conn_id).close()
+            _CURRENT_HASHES.difference_update(
+                {h for h in _CURRENT_HASHES if h[0] == str(self.path)}
+            )
+
+        if conn_id not in _CONNECTIONS:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=_SQLITE_TIMEOUT)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS merge_keys ("
+                    "source TEXT, metadata_hash TEXT, signature TEXT, key TEXT, "
+                    "PRIMARY KEY (source, metadata_hash, signature))"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS merge_metadata (metadata_hash TEXT)")
+            _CONNECTIONS[conn_id] = conn
+        return _CONNECTIONS[conn_id]
+
+    def _purge_stale(self, conn: sqlite3.Connection, metadata_hash: str) -> None:
+        """ Removes all keys resolved using a different version of the metadata table """
+        if (str(self.path), metadata_hash) in _CURRENT_HASHES:
+            return
+
+        with conn:
+            stored = [row[0] for row in conn.execute("SELECT metadata_hash FROM merge_metadata")]
+            if stored != [metadata_hash]:
+                conn.execute("DELETE FROM merge_keys WHERE metadata_hash != ?", (metadata_hash,))
+                conn.execute("DELETE FROM merge_metadata")
+                conn.execute("INSERT INTO merge_metadata VALUES (?)", (metadata_hash,))
+        _CURRENT_HASHES.add((str(self.path), metadata_hash))
+
+    def get(
+        self, source: str, metadata_hash: str, signatures: Series
+    ) -> Tuple[Series, numpy.ndarray]:
+        """
+        Looks up the cached keys of the given signatures.
+
+        Arguments:
+            source: Name of the data source.
+            metadata_hash: Content hash of the metadata table, see `MetadataIndex.content_hash`.
+            signatures: Output of `merge_signatures`.
+        Returns:
+            Tuple[Series, numpy.ndarray]: Cached key for each signature, with the same index, and
+                a mask of the signatures which were found in the cache. Signatures which did not
+                match any key are cached too, so their key is None even if they were found.
+        """
+        cached: Dict[str, Optional[str]] = {}
+        unique_signatures = signatures.unique().tolist()
+        if unique_signatures:
+            conn = self._connect()
+            for idx in range(0, len(unique_signatures), _LOOKUP_CHUNK_SIZE):
+                chunk = unique_signatures[idx : idx + _LOOKUP_CHUNK_SIZE]
+                query = (
+                    "SELECT signature, key FROM merge_keys WHERE source = ? AND metadata_hash = ? "
+                    f"AND signature IN ({','.join('?' * len(chunk))})"
+                )
+                cached.update(conn.execute(query, (source, metadata_hash, *chunk)))
+
+        found = signatures.isin(list(cached)).values
+        keys = signatures.map(cached).astype(object)
+        keys[keys.isna()] = None
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        return keys, found
+
+    def put(self, source: str, metadata_hash: str, signatures: Series, keys: Series) -> None:
+        """
+        Stores the keys of the given signatures. If the metadata table changed since keys were last
+        stored, all keys resolved using a different version of it are removed first.
+
+        Arguments:
+            source: Name of the data source.
+            metadata_hash: Content hash of the metadata table, see `MetadataIndex.content_hash`.
+            signatures: Output of `merge_signatures`.
+            keys: Key of each signature, which is None if it did not match any key.
+        """
+        records: List[tuple] = [
+            (source, metadata_hash, signature, key)
+            for signature, key in zip(signatures.values, keys.values)
+        ]
+        if not records:
+            return
+
+        conn = self._connect()
+        self._purge_stale(conn, metadata_hash)
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO merge_keys VALUES (?, ?, ?, ?)", records)
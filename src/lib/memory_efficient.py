@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import csv
+import heapq
 import json
 import shutil
 import sys
@@ -20,7 +21,7 @@ import traceback
 import warnings
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Dict, Iterable, List, TextIO
+from typing import Any, Dict, Iterable, List, TextIO, Tuple
 
 from .io import read_lines, read_table
 
@@ -197,6 +198,88 @@ def table_merge(tables: List[Path], output: Path, on: List[str], how: str = "INN
         table_join(temp_input, tables[-1], output=output, on=on, how=how)
 
 
+def _read_indexed_records(
+    table: Path, index_columns: List[str], output_columns: List[str]
+) -> Iterable[Tuple[Tuple[str, ...], List[str]]]:
+    """ Yields <index, record> pairs from a table, using `None` for columns not in the table """
+    reader = csv.reader(read_lines(table, skip_empty=True))
+    columns = {name: idx for idx, name in enumerate(next(reader, []))}
+
+    # Records from tables without all the index columns would all have a null index
+    if not all(name in columns for name in index_columns):
+        return
+
+    index_indices = [columns[name] for name in index_columns]
+    output_indices = [columns.get(name) for name in output_columns]
+    for record in reader:
+        index = tuple(record[idx] for idx in index_indices)
+        yield index, [None if idx is None else record[idx] for idx in output_indices]
+
+
+def table_combine(
+    tables: List[Path],
+    output: Path,
+    index_columns: List[str],
+    columns: List[str] = None,
+    schema: Dict[str, Any] = None,
+) -> None:
+    """
+    Memory-efficient method used to combine tables which are sorted by `index_columns`, keeping the
+    last non-null value for every column. This is equivalent to concatenating all the tables and
+    grouping by the index columns, but a k-way merge of the tables is performed instead so only one
+    record per table is held in memory at any given time. Records with a null index, as well as
+    records without any value outside of the index columns, are dropped from the output.
+
+    Arguments:
+        tables: Tables to combine, sorted lexically by `index_columns`. Values from the later
+            tables take precedence over values from the earlier tables.
+        output: Path to write the combined table to.
+        index_columns: Columns used to identify each record.
+        columns: Columns of the output table, defaults to all columns from the input tables.
+        schema: Dictionary of <column, dtype>. If provided, empty values in string columns are not
+            considered null, which mirrors how `read_table` parses them.
+    """
+    if columns is None:
+        columns = []
+        for table in tables:
+            columns += [name for name in get_table_columns(table) if name not in columns]
+
+    # Values missing from a table are always null, empty values only if not a string column
+    str_columns = set(name for name, dtype in (schema or {}).items() if dtype == "str")
+    null_values = [(None,) if name in str_columns else (None, "") for name in columns]
+    index_indices = [idx for idx, name in enumerate(columns) if name in index_columns]
+    value_indices = [idx for idx, name in enumerate(columns) if name not in index_columns]
+
+    def write_record(writer, record: List[str]) -> None:
+        if record is None:
+            return
+        if any(record[idx] in null_values[idx] for idx in index_indices):
+            return
+        if all(record[idx] in null_values[idx] for idx in value_indices):
+            return
+        writer.writerow(record)
+
+    readers = [_read_indexed_records(table, index_columns, columns) for table in tables]
+
+    with open(output, "w") as fd_out:
+        writer = csv.writer(fd_out, lineterminator="\n")
+        writer.writerow(columns)
+
+        # Records with the same index are yielded in the same order as the input tables
+        current_index, current_record = None, None
+        for index, record in heapq.merge(*readers, key=lambda x: x[0]):
+            if index != current_index:
+                write_record(writer, current_record)
+                current_index, current_record = index, record
+            else:
+                for idx, value in enumerate(record):
+                    if value not in null_values[idx]:
+                        current_record[idx] = value
+
+        # Write the last record left in the buffer
+        write_record(writer, current_record)
+
+
 def table_cross_product(left: Path, right: Path, output: Path) -> None:
     """
     Memory efficient method to perform the cross product of all columns in two tables. Columns
@@ -0,0 +1,309 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import re
+import weakref
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Pattern, Set, Tuple
+
+import numpy
+from pandas import DataFrame, Series, concat
+from pandas.util import hash_pandas_object
+
+from .cast import isna
+
+# Indices of the metadata tables which have already been built, by the id of the table. Entries are
+# removed as soon as their table is garbage collected
+_INDEX_CACHE: Dict[int, Tuple[weakref.ref, "MetadataIndex"]] = {}
+
+# Columns used to narrow down the candidate records during the merge step, in order of priority
+MERGE_FILTER_COLUMNS = tuple(
+    f"{prefix}_{suffix}"
+    for prefix in ("country", "subregion1", "subregion2", "locality")
+    for suffix in ("code", "name")
+)
+
+# Columns compared against the fuzzy version of the record's match string, in order of priority
+MERGE_FUZZY_COLUMNS = tuple(
+    f"{prefix}_{suffix}_fuzzy"
+    for prefix in ("subregion1", "subregion2", "locality")
+    for suffix in ("code", "name")
+) + ("match_string_fuzzy",)
+
+# Regular expression constructs which refer to other groups, and cannot be combined into one
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+
+def _combine_regex(patterns: Iterable[Pattern]) -> Optional[Pattern]:
+    """
+    Combines the given patterns into a single alternation, which matches a string if and only if
+    any of the patterns matches it. Returns None if the patterns cannot be combined.
+    """
+    patterns = [pattern.pattern for pattern in patterns]
+    if not patterns or any(_GROUP_REFERENCE.search(pattern) for pattern in patterns):
+        return None
+    try:
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+    except re.error:
+        return None
+
+
+class MetadataIndex:
+    """
+    Hash maps from the values of each column of the metadata table to the positions of the records
+    which have that value, so records can be matched against the metadata table using set
+    intersections instead of scanning the whole table. The metadata table must not be modified
+    after it has been indexed. The index only keeps a weak reference to the metadata table, which
+    must be kept alive by the caller while the index is in use.
+    """
+
+    keys: Set[str]
+    """ All the keys in the metadata table """
+
+    content_hash: str
+    """ Hash of the contents of the metadata table """
+
+    def __init__(self, metadata: DataFrame):
+        self._metadata_ref = weakref.ref(metadata)
+        self.keys = set(metadata["key"].values)
+        content_hash = hashlib.sha256(",".join(metadata.columns).encode())
+        content_hash.update(hash_pandas_object(metadata, index=False).values.tobytes())
+        self.content_hash = content_hash.hexdigest()
+        self._key_values = metadata["key"].values
+        self._all_rows = frozenset(range(len(metadata)))
+        self._values: Dict[str, Dict[Any, FrozenSet[int]]] = {}
+        self._nulls: Dict[str, FrozenSet[int]] = {}
+        for column in metadata.columns:
+            if column == "key":
+                continue
+            groups = metadata.groupby(column, sort=False).indices
+            self._values[column] = {value: frozenset(rows) for value, rows in groups.items()}
+            self._nulls[column] = frozenset(numpy.flatnonzero(metadata[column].isna().values))
+
+        # The regular expressions in the match_string column are compiled only once
+        self._regex: Dict[int, Pattern] = {}
+        if "match_string" in metadata.columns:
+            for row, pattern in enumerate(metadata["match_string"].values):
+                if not isna(pattern):
+                    self._regex[row] = re.compile(pattern, re.IGNORECASE)
+        self._regex_rows = frozenset(self._regex.keys())
+        self._regex_any = _combine_regex(self._regex.values())
+
+    @property
+    def metadata(self) -> DataFrame:
+        """ The indexed metadata table """
+        return self._metadata_ref()
+
+    @staticmethod
+    def for_table(metadata: DataFrame) -> "MetadataIndex":
+        """
+        Returns the index of the given metadata table, building it only the first time that the
+        table is indexed. Indices built before forking worker processes are shared with them.
+
+        Arguments:
+            metadata: Metadata table to be indexed.
+        Returns:
+            MetadataIndex: The index of `metadata`.
+        """
+        table_id = id(metadata)
+        table_ref, index = _INDEX_CACHE.get(table_id, (None, None))
+        if table_ref is None or table_ref() is not metadata:
+
+            def evict(ref: weakref.ref) -> None:
+                if _INDEX_CACHE.get(table_id, (None,))[0] is ref:
+                    del _INDEX_CACHE[table_id]
+
+            index = MetadataIndex(metadata)
+            _INDEX_CACHE[table_id] = (weakref.ref(metadata, evict), index)
+        return index
+
+    def rows(self, column: str, value: Any) -> FrozenSet[int]:
+        """
+        Arguments:
+            column: Name of the column to match.
+            value: Value compared against the column, never matching null values.
+        Returns:
+            FrozenSet[int]: Positions of the records where `column` is equal to `value`.
+        """
+        if isna(value):
+            return frozenset()
+        return self._values[column].get(value, frozenset())
+
+    def filter(self, record: Dict[str, Any]) -> FrozenSet[int]:
+        """
+        Narrows down the records of the metadata table which could match the given record using the
+        columns from `MERGE_FILTER_COLUMNS` present in the record. Null values only match null
+        values, and empty values match anything.
+
+        Arguments:
+            record: Record to be matched.
+        Returns:
+            FrozenSet[int]: Positions of the candidate records.
+        """
+        candidates = self._all_rows
+        for column in MERGE_FILTER_COLUMNS:
+            if column not in record:
+                continue
+            elif isna(record[column]):
+                candidates = candidates & self._nulls[column]
+            elif record[column]:
+                candidates = candidates & self.rows(column, record[column])
+        return candidates
+
+    def regex_rows(self, search_string: str, rows: FrozenSet[int]) -> FrozenSet[int]:
+        """
+        Arguments:
+            search_string: String to match against the regular expressions of the metadata table.
+            rows: Positions of the candidate records.
+        Returns:
+            FrozenSet[int]: Positions of the candidate records with a `match_string` regular
+                expression which matches the start of `search_string`, ignoring case.
+        """
+        rows = rows & self._regex_rows
+        if not rows:
+            return rows
+
+        # Most strings don't match any expression, which is checked in a single pass
+        if self._regex_any is not None and self._regex_any.match(search_string) is None:
+            return frozenset()
+        return frozenset(row for row in rows if self._regex[row].match(search_string))
+
+    def key(self, row: int) -> str:
+        """ Returns the key of the record at the given position """
+        return self._key_values[row]
+
+    def _candidate_pairs(
+        self, data: DataFrame, pending: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, DataFrame]:
+        """
+        Joins each distinct combination of values from `MERGE_FILTER_COLUMNS` in the pending
+        records with the metadata table, which is the same as calling `filter` for each record.
+        Returns the combination of each record, which is -1 if no columns are compared, and the
+        <_combo, _pos> pairs of candidate metadata records for each combination.
+        """
+        combos = numpy.full(len(data), -1)
+        pairs = [DataFrame({"_combo": [], "_pos": []}, dtype=int)]
+        filter_columns = [col for col in MERGE_FILTER_COLUMNS if col in data.columns]
+        if not filter_columns:
+            return combos, pairs[0]
+
+        # Empty values are not compared, so records are split by the columns that are compared
+        values = {col: data[col].astype(object).values for col in filter_columns}
+        compared = numpy.stack(
+            [values[col].astype(bool) | data[col].isna().values for col in filter_columns], axis=1
+        )
+
+        combo_count = 0
+        for pattern in numpy.unique(compared[pending], axis=0):
+            pattern_mask = pending & (compared == pattern).all(axis=1)
+            join_columns = [col for col, flag in zip(filter_columns, pattern) if flag]
+            if not join_columns:
+                continue
+
+            # Null values are joined with null values, same as in `filter`
+            records = DataFrame({col: values[col][pattern_mask] for col in join_columns})
+            grouped = records.groupby(join_columns, dropna=False, sort=False)
+            records["_combo"] = combo_count + grouped.ngroup().values
+            combos[pattern_mask] = records["_combo"].values
+            combo_count = records["_combo"].max() + 1
+
+            metadata = self.metadata[join_columns].astype(object)
+            metadata["_pos"] = numpy.arange(len(metadata))
+            records = records.drop_duplicates("_combo")
+            pairs.append(records.merge(metadata, on=join_columns)[["_combo", "_pos"]])
+
+        return combos, concat(pairs, ignore_index=True)
+
+    def _column_matches(self, records: DataFrame, column: str, pairs: DataFrame) -> DataFrame:
+        """
+        Joins the `_value` of each record with the non-null values of a metadata column, keeping
+        only the matches which are candidates of the record according to `_candidate_pairs`.
+        """
+        values = self.metadata[column].astype(object)
+        mask = values.notna().values
+        metadata = DataFrame({"_value": values.values[mask], "_pos": numpy.flatnonzero(mask)})
+        matches = records.merge(metadata, on="_value")[["_row", "_combo", "_pos"]]
+
+        unfiltered = matches[matches["_combo"] < 0]
+        filtered = matches[matches["_combo"] >= 0].merge(pairs, on=["_combo", "_pos"])
+        return concat([unfiltered, filtered], ignore_index=True)
+
+    def resolve(self, data: DataFrame, match_strings: Series = None) -> Series:
+        """
+        Resolves the keys of all the records in `data` at once using joins against the metadata
+        table, which follow the same order of priority as `DataSource.merge`: exact key, code and
+        name columns, and the fuzzy match string compared against the fuzzy columns and the
+        `match_string` column. Records which cannot be resolved this way, including those which
+        don't match any key, are left null so they can go through `DataSource.merge` one by one.
+
+        Arguments:
+            data: Records to be matched.
+            match_strings: Fuzzy version of the `match_string` column of `data`, if present.
+        Returns:
+            Series: Key of each record in `data`, or None if it could not be resolved.
+        """
+        keys = numpy.full(len(data), None, dtype=object)
+        pending = numpy.ones(len(data), dtype=bool)
+
+        # Records with a key are decided right away, unknown keys are left for the fallback
+        if "key" in data.columns:
+            has_key = data["key"].notna().values
+            known_key = has_key & data["key"].isin(self.keys).values
+            keys[known_key] = data["key"].values[known_key]
+            pending &= ~has_key
+
+        # Columns which are missing from the metadata table cannot be resolved here
+        required_columns = [col for col in MERGE_FILTER_COLUMNS if col in data.columns]
+        if match_strings is not None:
+            required_columns += list(MERGE_FUZZY_COLUMNS) + ["match_string"]
+        if not pending.any() or any(col not in self.metadata for col in required_columns):
+            return Series(keys, index=data.index, dtype=object)
+
+        # Records with a single candidate are resolved, those with none are left for the fallback
+        combos, pairs = self._candidate_pairs(data, pending)
+        candidate_count = numpy.bincount(pairs["_combo"], minlength=combos.max() + 1)
+        candidate_pos = numpy.zeros(len(candidate_count), dtype=int)
+        candidate_pos[pairs["_combo"].values] = pairs["_pos"].values
+        record_count = numpy.full(len(data), len(self.metadata))
+        record_count[combos >= 0] = candidate_count[combos[combos >= 0]]
+        record_pos = numpy.zeros(len(data), dtype=int)
+        record_pos[combos >= 0] = candidate_pos[combos[combos >= 0]]
+        resolved = pending & (record_count == 1)
+        keys[resolved] = self._key_values[record_pos[resolved]]
+        pending &= record_count > 1
+
+        if match_strings is None:
+            return Series(keys, index=data.index, dtype=object)
+
+        # The match string is compared against each column in order until there is a single match
+        raw_match_strings = data["match_string"].astype(object).values
+        for column in MERGE_FUZZY_COLUMNS + ("match_string",):
+            records = DataFrame(
+                {
+                    "_row": numpy.flatnonzero(pending),
+                    "_combo": combos[pending],
+                    "_value": (
+                        raw_match_strings if column == "match_string" else match_strings.values
+                    )[pending],
+                }
+            )
+            matches = self._column_matches(records.dropna(subset=["_value"]), column, pairs)
+            match_count = numpy.bincount(matches["_row"], minlength=len(data))
+            match_pos = numpy.zeros(len(data), dtype=int)
+            match_pos[matches["_row"].values] = matches["_pos"].values
+            resolved = pending & (match_count == 1)
+            keys[resolved] = self._key_values[match_pos[resolved]]
+            pending &= ~resolved
+
+        return Series(keys, index=data.index, dtype=object)
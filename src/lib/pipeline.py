@@ -13,27 +13,59 @@
 # limitations under the License.
 
 import importlib
+import time
+import tracemalloc
 import traceback
 from pathlib import Path
 from functools import partial
 from multiprocessing import cpu_count
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from multiprocessing.pool import ThreadPool
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import yaml
 import requests
 from pandas import DataFrame
 
 from .anomaly import detect_anomaly_all, detect_stale_columns
-from .cast import column_converters
-from .constants import SRC, CACHE_URL
-from .concurrent import process_map
+from .cast import cast_table, column_series_converters
+from .constants import (
+    SRC,
+    CACHE_URL,
+    DATA_SOURCE_STATS_FILE_NAME,
+    FETCH_THREAD_COUNT,
+    INTERMEDIATE_COMBINE_THRESHOLD_BYTES,
+    MERGE_KEY_CACHE_FILE_NAME,
+    PARSE_PIPELINES_IN_FLIGHT,
+    STAGE_REPORT_COLUMNS,
+)
+from .concurrent import get_shared_object, process_map, process_pool, shared_objects
 from .data_source import DataSource
 from .error_logger import ErrorLogger
-from .io import read_file, read_table, fuzzy_text, export_csv, parse_dtype, pbar
+from .io import (
+    read_file,
+    read_table,
+    fuzzy_text_series,
+    export_csv,
+    export_parquet,
+    parse_dtype,
+    pbar,
+)
 from .lazy_property import lazy_property
+from .key_cache import MergeKeyCache
+from .metadata_index import MetadataIndex
+from .memory_efficient import get_table_columns, table_combine, table_sort
+from .scheduler import TaskScheduler, predict_schedule, read_task_stats, write_task_stats
 from .utils import combine_tables, drop_na_records, filter_output_columns
 
 
+def _drain(items: List[Any]) -> Iterator[Any]:
+    """ Yields the items of a list in order, removing each one so it can be freed once used """
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
 class DataPipeline(ErrorLogger):
     """
     A data pipeline is a collection of individual [DataSource]s which produce a full table ready
@@ -84,13 +116,12 @@ class DataPipeline(ErrorLogger):
         aux = {name: read_file(table) for name, table in auxiliary.items()}
 
         # Precompute some useful transformations in the auxiliary input files
-        aux["metadata"]["match_string_fuzzy"] = aux["metadata"].match_string.apply(fuzzy_text)
+        metadata = aux["metadata"]
+        metadata["match_string_fuzzy"] = fuzzy_text_series(metadata["match_string"])
         for category in ("subregion1", "subregion2", "locality"):
             for suffix in ("code", "name"):
                 column = "{}_{}".format(category, suffix)
-                aux["metadata"]["{}_fuzzy".format(column)] = aux["metadata"][column].apply(
-                    fuzzy_text
-                )
+                metadata["{}_fuzzy".format(column)] = fuzzy_text_series(metadata[column])
 
         return aux
 
@@ -143,10 +174,10 @@ class DataPipeline(ErrorLogger):
         output_columns = list(self.schema.keys())
 
         # Make sure all columns are present and have the appropriate type
-        for column, converter in column_converters(self.schema).items():
+        for column, converter in column_series_converters(self.schema).items():
             if column not in data:
                 data[column] = None
-            data[column] = data[column].apply(converter)
+            data[column] = converter(data[column])
 
         # Filter only output columns and output the sorted data
         return drop_na_records(data[output_columns], ["date", "key"]).sort_values(output_columns)
@@ -155,12 +186,12 @@ class DataPipeline(ErrorLogger):
     def _run_wrapper(
         output_folder: Path,
         cache: Dict[str, str],
-        aux: Dict[str, DataFrame],
+        aux_name: str,
         data_source: DataSource,
     ) -> Optional[DataFrame]:
         """ Workaround necessary for multiprocess pool, which does not accept lambda functions """
         try:
-            return data_source.run(output_folder, cache, aux)
+            return data_source.run(output_folder, cache, get_shared_object(aux_name))
         except Exception:
             data_source_name = data_source.__class__.__name__
             data_source.log_error(
@@ -171,6 +202,85 @@ class DataPipeline(ErrorLogger):
             )
         return None
 
+    @staticmethod
+    def _fetch_wrapper(
+        output_folder: Path, cache: Dict[str, str], data_source: DataSource
+    ) -> Optional[Dict[str, str]]:
+        """ Runs the fetch step of a data source, logging any errors """
+        try:
+            return data_source.run_fetch(output_folder, cache)
+        except Exception:
+            data_source_name = data_source.__class__.__name__
+            data_source.log_error(
+                "Error fetching data source.",
+                source_name=data_source_name,
+                config=data_source.config,
+                traceback=traceback.format_exc(),
+            )
+        return None
+
+    @staticmethod
+    def _parse_wrapper(
+        output_folder: Path,
+        aux_name: str,
+        data_source: DataSource,
+        sources: Optional[Dict[str, str]],
+        trace_memory: bool = False,
+    ) -> Tuple[Optional[DataFrame], Dict[str, float]]:
+        """
+        Runs the parse step of a data source using the output of `_fetch_wrapper`, and returns the
+        result along with the duration of the parse step, as well as the metrics of each of the
+        stages of the data source. Tracing memory allocations slows down the parse step, so the
+        peak memory is only measured when `trace_memory` is set.
+        """
+        if sources is None:
+            return None, {}
+
+        result = None
+        if trace_memory:
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        try:
+            key_cache = MergeKeyCache(output_folder / MERGE_KEY_CACHE_FILE_NAME)
+            result = data_source.run_parse(sources, get_shared_object(aux_name), key_cache)
+        except Exception:
+            data_source_name = data_source.__class__.__name__
+            data_source.log_error(
+                "Error running data source.",
+                source_name=data_source_name,
+                config=data_source.config,
+                traceback=traceback.format_exc(),
+            )
+        finally:
+            duration = time.perf_counter() - start_time
+            if trace_memory:
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+        stats = {"duration": duration, "stages": data_source.stage_metrics}
+        if trace_memory:
+            # Each stage resets the peak memory, so the overall peak is the largest of all of them
+            for stage in stats["stages"]:
+                peak_memory = max(peak_memory, stage["peak_memory"] or 0)
+            stats["peak_memory"] = peak_memory
+
+        return result, stats
+
+    def _write_stage_report(self, output_folder: Path, records: List[Dict[str, Any]]) -> None:
+        """ Writes the metrics of each stage of the data sources of this pipeline to a CSV file """
+        report_path = output_folder / "reports" / f"{self.table}.csv"
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report = DataFrame.from_records(records, columns=STAGE_REPORT_COLUMNS)
+        report.to_csv(report_path, index=False)
+
+    def _read_cache(self) -> Dict[str, str]:
+        """ Read the cache directory from our cloud storage """
+        try:
+            return requests.get("{}/sitemap.json".format(CACHE_URL)).json()
+        except:
+            self.log_error("Cache unavailable")
+            return {}
+
     def parse(
         self, output_folder: Path, process_count: int = cpu_count()
     ) -> Iterable[Tuple[DataSource, DataFrame]]:
@@ -186,12 +296,13 @@ class DataPipeline(ErrorLogger):
                 source, where the results are the output of `DataSource.parse()`.
         """
 
-        # Read the cache directory from our cloud storage
-        try:
-            cache = requests.get("{}/sitemap.json".format(CACHE_URL)).json()
-        except:
-            cache = {}
-            self.log_error("Cache unavailable")
+        # If the process count is less than one, run in series (useful to evaluate performance)
+        if process_count > 1 and len(self.data_sources) > 1:
+            pipeline_results = DataPipeline.parse_all([self], output_folder, process_count)
+            return list(pipeline_results)[0][1]
+
+        cache = self._read_cache()
+        aux_name = f"{self.name}_aux"
 
         # Make a copy of the auxiliary table to prevent modifying it for everyone, but this way
         # we allow for local modification (which might be wanted for optimization purposes)
@@ -200,48 +311,304 @@ class DataPipeline(ErrorLogger):
         # Create a function to be used during mapping. The nestedness is an unfortunate outcome of
         # the multiprocessing module's limitations when dealing with lambda functions, coupled with
         # the "sandboxing" we implement to ensure resiliency.
-        map_func = partial(DataPipeline._run_wrapper, output_folder, cache, aux_copy)
+        map_func = partial(DataPipeline._run_wrapper, output_folder, cache, aux_name)
 
-        # If the process count is less than one, run in series (useful to evaluate performance)
         data_sources_count = len(self.data_sources)
         progress_label = f"Run {self.name} pipeline"
-        if process_count <= 1 or data_sources_count <= 1:
+        with shared_objects(**{aux_name: aux_copy}):
             map_iter = map(map_func, self.data_sources)
-            map_result = pbar(map_iter, total=data_sources_count, desc=progress_label)
-        else:
-            map_result = process_map(map_func, self.data_sources, desc=progress_label)
+            map_result = list(pbar(map_iter, total=data_sources_count, desc=progress_label))
+
+        # Get all the pipeline outputs, which are released as they are consumed
+        return _drain(list(zip(self.data_sources, map_result)))
+
+    @staticmethod
+    def parse_all(
+        data_pipelines: List["DataPipeline"],
+        output_folder: Path,
+        process_count: int = cpu_count(),
+        fetch_thread_count: int = FETCH_THREAD_COUNT,
+        memory_budget: int = None,
+        pipelines_in_flight: int = PARSE_PIPELINES_IN_FLIGHT,
+        trace_memory: bool = False,
+    ) -> Iterator[Tuple["DataPipeline", Iterable[Tuple[DataSource, DataFrame]]]]:
+        """
+        Same as calling `parse` for each of the data pipelines, but the data sources from all the
+        pipelines are fed into a single pool of worker processes which is reused for all of them.
+        This way, slow data sources from one pipeline overlap with the data sources of the others
+        instead of having to wait for each pipeline to finish before starting the next one.
+
+        The fetch step, which is bound by network I/O, runs separately in a pool of threads. Each
+        data source is queued for parsing in the pool of worker processes as soon as its fetch step
+        is done, so the processes never sit idle waiting on slow servers.
+
+        The duration of each data source is recorded in the output folder, and used in subsequent
+        runs to parse the longest data sources first. The peak memory of each data source is only
+        recorded when `trace_memory` is set, otherwise the one recorded by previous runs is kept.
+        See `TaskScheduler`. The metrics of each stage of the data sources are written to a report
+        for each pipeline, under the "reports" folder. See `DataSource.measure_stage`.
+
+        Arguments:
+            data_pipelines: Data pipelines to parse.
+            output_folder: Root path of the outputs where "snapshot", "intermediate" and "tables"
+                will be created and populated with CSV files.
+            process_count: Maximum number of processes to run in parallel.
+            fetch_thread_count: Maximum number of data sources fetched concurrently.
+            memory_budget: Maximum predicted memory in bytes used by the data sources being
+                parsed at the same time. By default, memory usage is not taken into account.
+            pipelines_in_flight: Maximum number of pipelines with data sources queued at the same
+                time. The data sources of the next pipeline are queued once all the data sources
+                of the first pipeline in flight are done.
+            trace_memory: Trace the memory allocations of the data sources to measure their peak
+                memory, which slows down the parse step.
+        Returns:
+            Iterator[Tuple[DataPipeline, Iterable[Tuple[DataSource, DataFrame]]]]: Pairs of
+                <data pipeline, results> in the same order as `data_pipelines`, where the results
+                are the same as the output of `parse()`. The pool remains busy with the remaining
+                pipelines while the results of each pipeline are consumed.
+        """
+        if not data_pipelines:
+            return
+        cache = data_pipelines[0]._read_cache()
+        stats_path = output_folder / DATA_SOURCE_STATS_FILE_NAME
+        source_stats = read_task_stats(stats_path)
+
+        # The auxiliary tables of each pipeline are shared with all workers, and data sources make
+        # their own copy of the tables they access so the shared tables are never modified
+        aux = {f"{pipeline.name}_aux": pipeline.auxiliary_tables for pipeline in data_pipelines}
+
+        # Index the metadata tables before starting the workers, so the indices are shared too
+        for tables in aux.values():
+            MetadataIndex.for_table(tables["metadata"])
+
+        # Waits for all the data sources of a pipeline, and records their stats
+        def collect_results(
+            pipeline_idx: int, get_result: Callable[[Tuple[int, int]], Tuple]
+        ) -> List[Tuple[DataSource, DataFrame]]:
+            pipeline = data_pipelines[pipeline_idx]
+            map_result = []
+            progress_label = f"Run {pipeline.name} pipeline"
+            new_stats = {}
+            stage_records = []
+            for source_idx, data_source in enumerate(
+                pbar(pipeline.data_sources, desc=progress_label)
+            ):
+                result, stats = get_result((pipeline_idx, source_idx))
+                map_result.append((data_source, result))
+                if stats:
+                    source_uuid = str(data_source.uuid(pipeline.table))
+                    for stage in stats.pop("stages"):
+                        stage_records.append(
+                            {
+                                "pipeline": pipeline.name,
+                                "data_source": data_source.__class__.__name__,
+                                "uuid": source_uuid,
+                                **stage,
+                            }
+                        )
+                    new_stats[source_uuid] = {**source_stats.get(source_uuid, {}), **stats}
+
+            write_task_stats(stats_path, new_stats)
+            pipeline._write_stage_report(output_folder, stage_records)
+            return map_result
+
+        # With a single process, data sources are run one at a time in this process which makes it
+        # possible to profile and debug them
+        if process_count <= 1:
+
+            def run_serial(task_id: Tuple[int, int]) -> Tuple:
+                pipeline = data_pipelines[task_id[0]]
+                data_source = pipeline.data_sources[task_id[1]]
+                sources = DataPipeline._fetch_wrapper(output_folder, cache, data_source)
+                with shared_objects(**aux):
+                    aux_name = f"{pipeline.name}_aux"
+                    return DataPipeline._parse_wrapper(
+                        output_folder, aux_name, data_source, sources, trace_memory
+                    )
+
+            for pipeline_idx, pipeline in enumerate(data_pipelines):
+                # The results are released as they are consumed, since none are kept in this scope
+                yield pipeline, _drain(collect_results(pipeline_idx, run_serial))
+            return
+
+        with shared_objects(**aux):
+            pool = process_pool(process_count)
+        fetch_pool = ThreadPool(max(1, fetch_thread_count))
+        scheduler = TaskScheduler(pool, process_count, memory_budget=memory_budget)
+
+        # The parse step is queued from the fetch callback, ordered by the stats from previous runs
+        def queue_parse(task_id: Tuple[int, int], sources: Optional[Dict[str, str]]) -> None:
+            pipeline = data_pipelines[task_id[0]]
+            data_source = pipeline.data_sources[task_id[1]]
+            aux_name = f"{pipeline.name}_aux"
+            parse_func = partial(
+                DataPipeline._parse_wrapper, output_folder, aux_name, trace_memory=trace_memory
+            )
+            stats = source_stats.get(str(data_source.uuid(pipeline.table)), {})
+            scheduler.submit(task_id, parse_func, (data_source, sources), **stats)
+
+        # All the data sources of a pipeline are queued for fetching at once
+        fetch_func = partial(DataPipeline._fetch_wrapper, output_folder, cache)
+
+        def queue_fetch(pipeline_idx: int) -> None:
+            for source_idx, data_source in enumerate(data_pipelines[pipeline_idx].data_sources):
+                callback = partial(queue_parse, (pipeline_idx, source_idx))
+                fetch_pool.apply_async(fetch_func, (data_source,), callback=callback)
+
+        try:
+            # Only a few pipelines are in flight at any given time, in the same order as given
+            for pipeline_idx in range(min(pipelines_in_flight, len(data_pipelines))):
+                queue_fetch(pipeline_idx)
+
+            for pipeline_idx, pipeline in enumerate(data_pipelines):
+                results = collect_results(pipeline_idx, scheduler.result)
+                if pipeline_idx + pipelines_in_flight < len(data_pipelines):
+                    queue_fetch(pipeline_idx + pipelines_in_flight)
+
+                # The results are released as they are consumed, since none are kept in this scope
+                yield pipeline, _drain(results)
+
+            for executor in (fetch_pool, pool):
+                executor.close()
+                executor.join()
 
-        # Get all the pipeline outputs
-        # This operation is parallelized but output order is preserved
-        return zip(self.data_sources, map_result)
+        finally:
+            fetch_pool.terminate()
+            pool.terminate()
 
-    def combine(self, intermediate_results: Iterable[Tuple[DataSource, DataFrame]]) -> DataFrame:
+    @staticmethod
+    def predict_schedule(
+        data_pipelines: List["DataPipeline"],
+        output_folder: Path,
+        process_count: int = cpu_count(),
+        memory_budget: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Predicts the order in which `parse_all` would parse the data sources of the given pipelines
+        using the stats recorded from previous runs, without running any of them.
+
+        Arguments:
+            data_pipelines: Data pipelines to parse.
+            output_folder: Root path of the outputs, where the stats from previous runs are kept.
+            process_count: Maximum number of processes to run in parallel.
+            memory_budget: Same as the argument of `parse_all`.
+        Returns:
+            List[Dict[str, Any]]: Records with the `pipeline`, `data_source`, predicted
+                `peak_memory` and the `worker`, `start` and `end` time of each data source.
+        """
+        source_stats = read_task_stats(output_folder / DATA_SOURCE_STATS_FILE_NAME)
+        tasks = {}
+        for pipeline in data_pipelines:
+            for data_source in pipeline.data_sources:
+                task_id = (pipeline, data_source)
+                tasks[task_id] = source_stats.get(str(data_source.uuid(pipeline.table)), {})
+
+        schedule = predict_schedule(tasks, max(1, process_count), memory_budget=memory_budget)
+        for record in schedule:
+            pipeline, data_source = record.pop("task")
+            record["pipeline"] = pipeline.name
+            record["data_source"] = data_source.__class__.__name__
+            record["peak_memory"] = tasks[(pipeline, data_source)].get("peak_memory")
+        return schedule
+
+    def combine(
+        self,
+        intermediate_results: Iterable[Tuple[DataSource, DataFrame]],
+        combine_threshold: int = INTERMEDIATE_COMBINE_THRESHOLD_BYTES,
+    ) -> DataFrame:
         """
         Combine all the provided intermediate results into a single DataFrame, giving preference to
-        values coming from the latter results.
+        values coming from the latter results. The results are consumed one at a time, and whenever
+        the ones held in memory exceed `combine_threshold` bytes they are combined into a batch that
+        is spilled to disk. The batches are then read back one at a time and folded into the output.
 
         Arguments:
             intermediate_results: collection of results from individual data sources.
+            combine_threshold: Maximum size in bytes of the intermediate results held in memory
+                before they are combined and spilled to disk.
         """
-
-        # Get rid of all columns which are not part of the output to speed up data combination
-        intermediate_tables = [
-            result[filter_output_columns(result.columns, self.schema)]
-            for data_source, result in intermediate_results
-        ]
+        pipeline_output = None
+        pending_tables = []
+        pending_memory = 0
+        with TemporaryDirectory() as workdir:
+            spilled_paths = []
+            for data_source, result in intermediate_results:
+                # Get rid of all columns which are not part of the output to speed up combination
+                table = result[filter_output_columns(result.columns, self.schema)]
+                pending_tables.append(table)
+                pending_memory += table.memory_usage(deep=True).sum()
+
+                if pending_memory > combine_threshold:
+                    batch_path = Path(workdir) / f"{len(spilled_paths)}.parquet"
+                    batch = self._combine_batch(None, pending_tables)
+                    export_parquet(batch, batch_path, schema=self.schema)
+                    spilled_paths.append(batch_path)
+                    pending_tables, pending_memory = [], 0
+
+            # Keeping the last non-null value is associative, so the batches can be folded in order
+            for batch_path in spilled_paths:
+                batch = read_table(batch_path, schema=self.schema)
+                pipeline_output = self._combine_batch(pipeline_output, [batch])
 
         # Combine all intermediate outputs into a single DataFrame
-        if not intermediate_tables:
+        if pipeline_output is None and not pending_tables:
             self.log_error("Empty result for data pipeline {}".format(self.name))
             pipeline_output = DataFrame(columns=self.schema.keys())
-        else:
-            pipeline_output = combine_tables(
-                intermediate_tables, ["date", "key"], progress_label=self.name
-            )
+        elif pending_tables:
+            pipeline_output = self._combine_batch(pipeline_output, pending_tables)
 
         # Return data using the pipeline's output parameters
         return self.output_table(pipeline_output)
 
+    def _combine_batch(
+        self, pipeline_output: Optional[DataFrame], tables: List[DataFrame]
+    ) -> DataFrame:
+        """ Combines the given tables into the output combined so far, if any """
+        tables = tables if pipeline_output is None else [pipeline_output] + tables
+        return combine_tables(tables, ["date", "key"], progress_label=self.name)
+
+    def combine_streaming(self, intermediate_folder: Path, output_path: Path) -> None:
+        """
+        Memory-efficient version of `combine` which reads the intermediate results from CSV files
+        on disk, sorts each of them by their index columns and then performs a k-way merge of all of
+        them, writing the combined records directly to `output_path`. Memory usage is bounded by the
+        largest intermediate result instead of the sum of all of them.
+
+        Arguments:
+            intermediate_folder: Folder where the intermediate results were saved.
+            output_path: Path where the combined table will be written to.
+        """
+        index_columns = [col for col in self.schema.keys() if col in ("date", "key")]
+
+        with TemporaryDirectory() as workdir:
+            workdir = Path(workdir)
+
+            # Sort all the intermediate results, preserving the order of the data sources
+            sorted_tables = []
+            for data_source in self.data_sources:
+                intermediate_path = intermediate_folder / f"{data_source.uuid(self.table)}.csv"
+                if not intermediate_path.exists():
+                    data_source_name = data_source.__class__.__name__
+                    self.log_error(
+                        "Failed to load intermediate output",
+                        source_name=data_source_name,
+                        source_config=data_source.config,
+                    )
+                    continue
+
+                # Tables missing any of the index columns are not sorted, since they are dropped
+                sorted_path = workdir / intermediate_path.name
+                if all(col in get_table_columns(intermediate_path) for col in index_columns):
+                    table_sort(intermediate_path, sorted_path, sort_columns=index_columns)
+                    sorted_tables.append(sorted_path)
+
+            if not sorted_tables:
+                self.log_error("Empty result for data pipeline {}".format(self.name))
+
+            # Merge all the sorted tables into the output
+            columns = list(self.schema.keys())
+            table_combine(sorted_tables, output_path, index_columns, columns, self.schema)
+
     def verify(
         self, pipeline_output: DataFrame, level: str = "simple", process_count: int = cpu_count()
     ) -> DataFrame:
@@ -287,11 +654,15 @@ class DataPipeline(ErrorLogger):
         self,
         intermediate_folder: Path,
         intermediate_results: Iterable[Tuple[DataSource, DataFrame]],
+        file_format: str = "parquet",
     ) -> None:
         for data_source, result in intermediate_results:
             if result is not None:
-                file_name = f"{data_source.uuid(self.table)}.csv"
-                export_csv(result, intermediate_folder / file_name, schema=self.schema)
+                file_path = intermediate_folder / f"{data_source.uuid(self.table)}.{file_format}"
+                if file_format == "csv":
+                    export_csv(result, file_path, schema=self.schema)
+                else:
+                    export_parquet(result, file_path, schema=self.schema)
             else:
                 data_source_name = data_source.__class__.__name__
                 self.log_error(
@@ -301,13 +672,14 @@ class DataPipeline(ErrorLogger):
                 )
 
     def _load_intermediate_results(
-        self, intermediate_folder: Path
+        self, intermediate_folder: Path, file_format: str = "parquet", **read_opts
     ) -> Iterable[Tuple[DataSource, DataFrame]]:
 
         for data_source in self.data_sources:
-            intermediate_path = intermediate_folder / f"{data_source.uuid(self.table)}.csv"
+            file_name = f"{data_source.uuid(self.table)}.{file_format}"
+            intermediate_path = intermediate_folder / file_name
             try:
-                yield (data_source, read_table(intermediate_path, schema=self.schema))
+                yield (data_source, read_table(intermediate_path, schema=self.schema, **read_opts))
             except Exception as exc:
                 data_source_name = data_source.__class__.__name__
                 self.log_error(
@@ -317,8 +689,63 @@ class DataPipeline(ErrorLogger):
                     exception=exc,
                 )
 
+    def _save_intermediate_result(self, file_path: Path, result: DataFrame) -> None:
+        """ Saves an intermediate result, logging errors since it may run in the background """
+        try:
+            export_parquet(result, file_path, schema=self.schema)
+        except Exception as exc:
+            self.log_error(
+                "Failed to save intermediate output", file_path=str(file_path), exception=exc
+            )
+
+    def _handoff_intermediate_results(
+        self,
+        intermediate_folder: Path,
+        intermediate_results: Iterable[Tuple[DataSource, DataFrame]],
+        save_pool: ThreadPool = None,
+    ) -> Iterable[Tuple[DataSource, DataFrame]]:
+        """
+        Converts the intermediate results to the output schema one at a time, so they can be passed
+        directly to `combine` without a round trip to disk and freed as soon as they are combined.
+
+        Arguments:
+            intermediate_folder: Folder where the intermediate results are saved.
+            intermediate_results: Output of `DataPipeline.parse()`.
+            save_pool: If provided, intermediate results are also saved to disk asynchronously
+                using this thread pool.
+        Returns:
+            Iterable[Tuple[DataSource, DataFrame]]: Same as `_load_intermediate_results()`.
+        """
+        pending_save = None
+        for data_source, result in intermediate_results:
+            if result is None:
+                data_source_name = data_source.__class__.__name__
+                self.log_error(
+                    "No output while saving intermediate results",
+                    source_name=data_source_name,
+                    source_config=data_source.config,
+                )
+                continue
+
+            result = cast_table(result, self.schema)
+            if save_pool is not None:
+                # Only one result at a time waits to be saved, so they are not all held in memory
+                if pending_save is not None:
+                    pending_save.wait()
+                file_path = intermediate_folder / f"{data_source.uuid(self.table)}.parquet"
+                pending_save = save_pool.apply_async(
+                    self._save_intermediate_result, (file_path, result)
+                )
+            yield data_source, result
+
     def run(
-        self, output_folder: Path, process_count: int = cpu_count(), verify_level: str = "simple"
+        self,
+        output_folder: Path,
+        process_count: int = cpu_count(),
+        verify_level: str = "simple",
+        save_intermediate: bool = True,
+        combine_threshold: int = INTERMEDIATE_COMBINE_THRESHOLD_BYTES,
+        intermediate_results: Iterable[Tuple[DataSource, DataFrame]] = None,
     ) -> DataFrame:
         """
         Main method which executes all the associated [DataSource] objects and combines their
@@ -330,22 +757,41 @@ class DataPipeline(ErrorLogger):
             process_count: Maximum number of processes to run in parallel.
             verify_level: Level of anomaly detection to perform on outputs. Possible values are:
                 None, "simple" and "full".
+            save_intermediate: Save the intermediate results to disk in the background, to allow
+                for reprocessing.
+            combine_threshold: Maximum size in bytes of the intermediate results held in memory
+                before they are folded into the combined table, see `combine()`.
+            intermediate_results: Output of `parse()`, if it has already been computed, for
+                example using `parse_all()`.
         Returns:
             DataFrame: Processed and combined outputs from all the individual data sources into a
                 single table.
         """
-        # TODO: break out fetch & parse steps
-        intermediate_results = self.parse(output_folder, process_count=process_count)
+        if intermediate_results is None:
+            intermediate_results = self.parse(output_folder, process_count=process_count)
 
-        # Save all intermediate results (to allow for reprocessing)
+        # Hand off the intermediate results directly to the combine step
         intermediate_folder = output_folder / "intermediate"
-        self._save_intermediate_results(intermediate_folder, intermediate_results)
-
-        # Re-load all intermediate results
-        intermediate_results = self._load_intermediate_results(intermediate_folder)
+        intermediate_folder.mkdir(parents=True, exist_ok=True)
+        save_pool = ThreadPool(1) if save_intermediate else None
+        intermediate_results = self._handoff_intermediate_results(
+            intermediate_folder, intermediate_results, save_pool
+        )
 
         # Combine all intermediate results into a single dataframe
-        pipeline_output = self.combine(intermediate_results)
+        try:
+            pipeline_output = self.combine(
+                intermediate_results, combine_threshold=combine_threshold
+            )
+        except:
+            if save_pool is not None:
+                save_pool.terminate()
+            raise
+        finally:
+            # Wait until all intermediate results have been saved
+            if save_pool is not None:
+                save_pool.close()
+                save_pool.join()
 
         # Perform anomaly detection on the combined outputs
         pipeline_output = self.verify(
@@ -353,3 +799,29 @@ class DataPipeline(ErrorLogger):
         )
 
         return pipeline_output
+
+    def run_streaming(
+        self,
+        output_folder: Path,
+        output_path: Path,
+        process_count: int = cpu_count(),
+        intermediate_results: Iterable[Tuple[DataSource, DataFrame]] = None,
+    ) -> None:
+        """
+        Same as `run`, but the intermediate results are combined using `combine_streaming` so the
+        combined table never needs to be held in memory. Verification of the outputs is skipped.
+
+        Arguments:
+            output_folder: Root path of the outputs where "snapshot", "intermediate" and "tables"
+                will be created and populated with CSV files.
+            output_path: Path where the combined table will be written to.
+            process_count: Maximum number of processes to run in parallel.
+            intermediate_results: Output of `parse()`, if it has already been computed.
+        """
+        if intermediate_results is None:
+            intermediate_results = self.parse(output_folder, process_count=process_count)
+
+        # Save all intermediate results as CSV, which are then combined directly from disk
+        intermediate_folder = output_folder / "intermediate"
+        self._save_intermediate_results(intermediate_folder, intermediate_results, "csv")
+        self.combine_streaming(intermediate_folder, output_path)
@@ -0,0 +1,201 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import json
+import threading
+from functools import partial
+from itertools import count
+from multiprocessing.pool import Pool
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+# Predicted duration for tasks which have never been run, which makes them run first
+UNKNOWN_DURATION = float("inf")
+
+
+def read_task_stats(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    Reads the stats recorded for previous runs of each task.
+
+    Arguments:
+        path: Location of the stats file.
+    Returns:
+        Dict[str, Dict[str, float]]: Map of <task id, stats>, where the stats include the
+            `duration` in seconds and the `peak_memory` in bytes. Empty if the file does not exist.
+    """
+    if not path.exists():
+        return {}
+    with path.open("r") as fd:
+        return json.load(fd)
+
+
+def write_task_stats(path: Path, task_stats: Dict[str, Dict[str, float]]) -> None:
+    """
+    Updates the stats file with the given stats, keeping the stats of any other tasks.
+
+    Arguments:
+        path: Location of the stats file.
+        task_stats: Map of <task id, stats> to be written.
+    """
+    stats = {**read_task_stats(path), **task_stats}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fd:
+        json.dump(stats, fd, indent=2, sort_keys=True)
+
+
+def _pick_next(
+    pending: List[Tuple], running_memory: Iterable[float], memory_budget: float = None
+) -> Tuple:
+    """ Pops the longest pending task which fits in the memory budget, if any """
+    running_memory = list(running_memory)
+    if memory_budget is None or not running_memory:
+        return heapq.heappop(pending)
+
+    available_memory = memory_budget - sum(running_memory)
+    for task in sorted(pending):
+        if task[2] <= available_memory:
+            pending.remove(task)
+            heapq.heapify(pending)
+            return task
+    return None
+
+
+class TaskScheduler:
+    """
+    Dispatches tasks to a pool of worker processes, keeping at most `worker_count` tasks in flight
+    so that the order of execution can be decided as tasks become available. Pending tasks are run
+    longest first, based on their predicted duration, which minimizes the total wall time when a
+    few tasks take much longer than the rest. If a memory budget is given, a task is only started
+    when its predicted peak memory fits alongside the tasks already running.
+    """
+
+    def __init__(self, pool: Pool, worker_count: int, memory_budget: float = None):
+        self._pool = pool
+        self._worker_count = worker_count
+        self._memory_budget = memory_budget
+        self._condition = threading.Condition()
+        self._counter = count()
+        self._pending: List[Tuple] = []
+        self._running: Dict[Hashable, float] = {}
+        self._results: Dict[Hashable, Any] = {}
+
+    def submit(
+        self,
+        task_id: Hashable,
+        func: Callable,
+        args: Tuple = (),
+        duration: float = UNKNOWN_DURATION,
+        peak_memory: float = 0,
+    ) -> None:
+        """
+        Queues a task to be run in the pool.
+
+        Arguments:
+            task_id: Unique identifier for this task, used to retrieve its result.
+            func: Function to be run in the pool.
+            args: Arguments passed to `func`.
+            duration: Predicted duration of this task.
+            peak_memory: Predicted peak memory of this task.
+        """
+        with self._condition:
+            task = (-duration, next(self._counter), peak_memory, task_id, func, args)
+            heapq.heappush(self._pending, task)
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._pending and len(self._running) < self._worker_count:
+            task = _pick_next(self._pending, self._running.values(), self._memory_budget)
+            if task is None:
+                break
+            _, _, peak_memory, task_id, func, args = task
+            self._running[task_id] = peak_memory
+            callback = partial(self._task_done, task_id)
+            self._results[task_id] = self._pool.apply_async(
+                func, args, callback=callback, error_callback=callback
+            )
+        self._condition.notify_all()
+
+    def _task_done(self, task_id: Hashable, _: Any) -> None:
+        with self._condition:
+            self._running.pop(task_id, None)
+            self._dispatch()
+
+    def result(self, task_id: Hashable) -> Any:
+        """
+        Waits until the task with the given identifier has been submitted and run.
+
+        Arguments:
+            task_id: Identifier of the task.
+        Returns:
+            Any: Output of the task function.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: task_id in self._results)
+            async_result = self._results.pop(task_id)
+        return async_result.get()
+
+
+def predict_schedule(
+    tasks: Dict[Hashable, Dict[str, float]], worker_count: int, memory_budget: float = None
+) -> List[Dict[str, Any]]:
+    """
+    Simulates the order in which `TaskScheduler` would run the given tasks, assuming that all of
+    them are available from the start and take exactly as long as predicted. Tasks with unknown
+    duration are run first, and are assumed to take no time for the purpose of the simulation.
+
+    Arguments:
+        tasks: Map of <task id, stats> with the predicted `duration` and `peak_memory` of each
+            task, either of which may be missing if unknown.
+        worker_count: Number of tasks run in parallel.
+        memory_budget: Maximum predicted memory of the tasks running at the same time.
+    Returns:
+        List[Dict[str, Any]]: Records with the `task`, `worker`, `start` and `end` time of each
+            task in the order they would be started. Tasks with unknown duration have no end.
+    """
+    pending = []
+    for idx, (task_id, stats) in enumerate(tasks.items()):
+        duration = stats.get("duration", UNKNOWN_DURATION)
+        pending.append((-duration, idx, stats.get("peak_memory", 0), task_id))
+    heapq.heapify(pending)
+
+    clock = 0.0
+    schedule = []
+    running: List[Tuple[float, int, float]] = []
+    idle_workers = list(range(worker_count))
+    while pending:
+        task = None
+        if idle_workers:
+            task = _pick_next(pending, [memory for _, _, memory in running], memory_budget)
+
+        # Wait until the next running task finishes if no task can be started
+        if task is None:
+            clock, worker, _ = heapq.heappop(running)
+            idle_workers.append(worker)
+            continue
+
+        duration = -task[0]
+        worker = idle_workers.pop(0)
+        end = clock + (duration if duration != UNKNOWN_DURATION else 0)
+        heapq.heappush(running, (end, worker, task[2]))
+        schedule.append(
+            {
+                "task": task[3],
+                "worker": worker,
+                "start": clock,
+                "end": end if duration != UNKNOWN_DURATION else None,
+            }
+        )
+
+    return schedule
@@ -13,11 +13,20 @@
 # limitations under the License.
 
 import datetime
+import re
 from typing import Iterable
+
+import numpy
+from pandas import Series, factorize, to_datetime
+from pandas.api.types import infer_dtype
+
 from .cast import safe_datetime_parse
 
 ISO_DATE_FORMAT = "%Y-%m-%d"
 
+# Directives of a date format which are parsed by `to_datetime` the same as by `strptime`
+_VECTORIZED_DATE_DIRECTIVES = set("YmdHMSybBf%")
+
 
 def datetime_isoformat(value: str, date_format: str) -> str:
     date = safe_datetime_parse(value, date_format)
@@ -27,6 +36,49 @@ def datetime_isoformat(value: str, date_format: str) -> str:
         return None
 
 
+def datetime_isoformat_series(values: Series, date_format: str) -> Series:
+    """
+    Vectorized equivalent of applying `datetime_isoformat` to every element of `values`, which
+    parses each distinct value only once and most of them all at once using `to_datetime`.
+
+    Arguments:
+        values: Series of dates to convert.
+        date_format: Format of the dates, as used by `datetime.strptime`.
+    Returns:
+        Series: object series with the same index as `values`, with the dates in ISO format
+            YYYY-MM-DD or None for values which could not be parsed.
+    """
+    # Values which are not strings are converted first, since they would be compared by value
+    array = values.to_numpy(dtype=object)
+    if infer_dtype(array, skipna=True) not in ("string", "empty"):
+        array = array.astype(str)
+    codes, uniques = factorize(array)
+    strings = Series(uniques, dtype=object)
+    dates = Series(None, index=strings.index, dtype=object)
+
+    # Strings already in ISO format only need to be validated when that is the expected format
+    if date_format == ISO_DATE_FORMAT:
+        iso_mask = strings.str.fullmatch(r"\d{4}-\d{2}-\d{2}").values
+        parsed = to_datetime(strings[iso_mask], format=date_format, errors="coerce")
+        valid = parsed.index[parsed.notna()]
+        dates[valid] = strings[valid]
+
+    # Other strings are parsed all at once, and the parsed dates are only kept when they format
+    # back into the same string since `to_datetime` accepts some strings which `strptime` does not
+    elif set(re.findall(r"%(.)", date_format)) <= _VECTORIZED_DATE_DIRECTIVES:
+        parsed = to_datetime(strings, format=date_format, errors="coerce")
+        exact = (parsed.notna() & (parsed.dt.strftime(date_format) == strings)).values
+        dates[exact] = parsed[exact].dt.strftime(ISO_DATE_FORMAT)
+
+    # The remaining strings are parsed one by one, which also covers dates out of pandas bounds
+    pending = dates.isna().values
+    dates[pending] = [datetime_isoformat(value, date_format) for value in strings[pending]]
+
+    # Null values have a code of -1, which picks the last item
+    result = numpy.append(dates.values, datetime_isoformat(None, date_format))[codes]
+    return Series(result, index=values.index, name=values.name, dtype=object)
+
+
 def date_offset(value: str, offset: int) -> str:
     assert offset is not None, "Offset none: %r" % offset
     date_value = datetime.date.fromisoformat(value)
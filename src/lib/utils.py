@@ -13,9 +13,10 @@
 # limitations under the License.
 
 from functools import partial, reduce
-from typing import Any, Callable, List, Dict, Tuple, Optional
-from numpy import unique
-from pandas import DataFrame, Series, concat, merge
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy
+from numpy import isin, unique
+from pandas import DataFrame, Series, concat, factorize, isnull, merge
 from pandas.api.types import is_numeric_dtype
 from .cast import isna, safe_int_cast
 from .io import fuzzy_text, pbar, tqdm
@@ -25,24 +26,38 @@ def get_or_default(dict_like: Dict, key: Any, default: Any):
     return dict_like[key] if key in dict_like and not isna(dict_like[key]) else default
 
 
+def _reshape_values(values: numpy.ndarray) -> Series:
+    """ Infers the type of the values of a reshaped table, same as building it from records """
+    values = Series(values)
+    return values.infer_objects() if values.dtype == object else values
+
+
 def pivot_table(data: DataFrame, pivot_name: str = "pivot", value_name: str = "value") -> DataFrame:
     """ Put a table in our preferred format when the regions are columns and date is index """
-    dates = data.index.tolist() * len(data.columns)
-    pivots: List[str] = sum([[name] * len(column) for name, column in data.iteritems()], [])
-    values: List[Any] = sum([column.tolist() for name, column in data.iteritems()], [])
-    records = zip(dates, pivots, values)
-    return DataFrame.from_records(records, columns=[data.index.name, pivot_name, value_name])
+    row_count, column_count = data.shape
+    return DataFrame(
+        {
+            0: numpy.tile(data.index.values, column_count),
+            1: numpy.repeat(data.columns.values, row_count),
+            2: _reshape_values(data.values.ravel(order="F")),
+        }
+    ).set_axis([data.index.name, pivot_name, value_name], axis=1)
 
 
 def pivot_table_date_columns(
     data: DataFrame, pivot_name: str = "date", value_name: str = "value"
 ) -> DataFrame:
     """ Put a table in time series format when the dates are columns and keys are index """
-    records = []
-    for idx, row in data.iterrows():
-        for pivot in data.columns:
-            records.append({"index": idx, pivot_name: pivot, value_name: row[pivot]})
-    return DataFrame.from_records(records).set_index("index")
+    row_count, column_count = data.shape
+    output = DataFrame(
+        {
+            pivot_name: numpy.tile(data.columns.values, row_count),
+            value_name: _reshape_values(data.values.ravel(order="C")),
+        }
+    )
+    output.index = numpy.repeat(data.index.values, column_count)
+    output.index.name = "index"
+    return output
 
 
 def table_rename(
@@ -90,21 +105,26 @@ def agg_last_not_null(series: Series, progress_bar: Optional[tqdm] = None) -> Se
 
 
 def combine_tables(
-    tables: List[DataFrame], keys: List[str], progress_label: str = None
+    tables: Iterable[DataFrame], keys: List[str], progress_label: str = None
 ) -> DataFrame:
-    """ Combine a list of tables, keeping the last non-null value for every column """
+    """
+    Combine a list of tables, keeping the last non-null value for every column. Concatenation and
+    grouping both preserve the order of the rows, so within each group the last non-null value of a
+    column is the one coming from the last table, which `GroupBy.last()` computes vectorized.
+    """
+    tables = list(tables)
     data = concat(tables) if len(tables) > 1 else tables[0]
-    grouped = data.groupby([col for col in keys if col in data.columns])
+    index_columns = [col for col in keys if col in data.columns]
+    grouped = data.groupby(index_columns)
     if not progress_label:
-        return grouped.aggregate(agg_last_not_null).reset_index()
-    else:
-        total_estimate = len(grouped) * len(data.columns)
-        progress_bar = pbar(total=total_estimate, desc=f"Combine {progress_label} outputs")
-        agg_func = partial(agg_last_not_null, progress_bar=progress_bar)
-        combined = grouped.aggregate(agg_func).reset_index()
-        progress_bar.n = total_estimate
-        progress_bar.refresh()
-        return combined
+        return grouped.last().reset_index()
+
+    # Aggregate one column at a time to be able to report progress
+    value_columns = [col for col in data.columns if col not in index_columns]
+    combined = DataFrame(index=grouped.size().index)
+    for column in pbar(value_columns, desc=f"Combine {progress_label} outputs"):
+        combined[column] = grouped[column].last()
+    return combined.reset_index()
 
 
 def drop_na_records(table: DataFrame, keys: List[str], inplace: bool = False) -> DataFrame:
@@ -161,13 +181,248 @@ def grouped_transform(
     return data
 
 
+def _segment_starts(data: DataFrame, keys: List[str]) -> numpy.ndarray:
+    """ Flags the first record of each run of equal `keys` in `data`, which must be sorted """
+    starts = numpy.zeros(len(data), dtype=bool)
+    starts[:1] = True
+    for key in keys:
+        codes, _ = factorize(data[key])
+        starts[1:] |= codes[1:] != codes[:-1]
+    return starts
+
+
+def _segment_bounds(starts: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ Returns the position of the first and the last record of the segment of each record """
+    positions = numpy.arange(len(starts))
+    first = numpy.maximum.accumulate(numpy.where(starts, positions, 0))
+    ends = numpy.append(starts[1:], True)
+    last = numpy.minimum.accumulate(numpy.where(ends, positions, len(starts))[::-1])[::-1]
+    return first, last
+
+
+def _segment_ffill(values: numpy.ndarray, starts: numpy.ndarray) -> numpy.ndarray:
+    """ Same as `x.ffill()` for each segment of the 2D array `values` """
+    # Null values take the position of the last valid value, without crossing segment boundaries
+    positions = numpy.arange(len(values))
+    first, _ = _segment_bounds(starts)
+    fill_positions = numpy.where(isnull(values), first[:, None], positions[:, None])
+    return numpy.take_along_axis(values, numpy.maximum.accumulate(fill_positions), axis=0)
+
+
+def _segment_shift(values: numpy.ndarray, starts: numpy.ndarray, periods: int = 1) -> numpy.ndarray:
+    """ Same as `x.shift(periods)` for each segment of the 2D array `values` """
+    if values.dtype.kind != "f":
+        values = values.astype(float)
+    first, last = _segment_bounds(starts)
+    source = numpy.arange(len(values)) - periods
+    valid = (source >= first) & (source <= last)
+    shifted = numpy.full_like(values, numpy.nan)
+    shifted[valid] = values[source[valid]]
+    return shifted
+
+
+def _segment_diff(values: numpy.ndarray, starts: numpy.ndarray, periods: int = 1) -> numpy.ndarray:
+    """ Same as `x.diff(periods)` for each segment of the 2D array `values` """
+    if values.dtype.kind != "f":
+        values = values.astype(float)
+    return values - _segment_shift(values, starts, periods)
+
+
+def _segment_ffill_diff(values: numpy.ndarray, starts: numpy.ndarray) -> numpy.ndarray:
+    """ Same as `x.ffill().diff()` for each segment of the 2D array `values` """
+    if values.dtype.kind != "f":
+        values = values.astype(float)
+    return _segment_diff(_segment_ffill(values, starts), starts)
+
+
+def _segment_fillna_cumsum(values: numpy.ndarray, starts: numpy.ndarray) -> numpy.ndarray:
+    """
+    Same as `x.fillna(0).cumsum()` for each segment of the 2D array `values`. The sum restarts at
+    each segment and adds the values in the same order, so the rounding is exactly the same as
+    summing each group separately.
+    """
+    if values.dtype.kind == "f":
+        values = numpy.where(numpy.isnan(values), 0, values).astype(values.dtype)
+    cumsum = values.copy()
+    if not len(values):
+        return cumsum
+
+    # Loop over the segments if there are only a few, otherwise over the positions within them
+    bounds = numpy.append(numpy.flatnonzero(starts), len(values))
+    lengths = numpy.diff(bounds)
+    if len(lengths) <= lengths.max():
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            numpy.cumsum(values[lo:hi], axis=0, out=cumsum[lo:hi])
+    else:
+        first, _ = _segment_bounds(starts)
+        offsets = numpy.arange(len(values)) - first
+        rows_by_offset = numpy.argsort(offsets, kind="stable")
+        offset_bounds = numpy.cumsum(numpy.bincount(offsets))
+        for lo, hi in zip(offset_bounds[:-1], offset_bounds[1:]):
+            rows = rows_by_offset[lo:hi]
+            cumsum[rows] = cumsum[rows - 1] + values[rows]
+    return cumsum
+
+
+def _segment_rolling_mean(
+    values: numpy.ndarray, starts: numpy.ndarray, window: int, min_periods: int = None
+) -> numpy.ndarray:
+    """ Same as `x.rolling(window, min_periods).mean()` for each segment of the 2D `values` """
+    values = values.astype(float)
+    min_periods = max(1, window if min_periods is None else min_periods)
+
+    # Window sums are differences of running sums, with windows cut at the start of the segment
+    valid = ~numpy.isnan(values)
+    zeros = numpy.zeros((1, values.shape[1]))
+    sums = numpy.concatenate([zeros, numpy.cumsum(numpy.where(valid, values, 0), axis=0)])
+    counts = numpy.concatenate([zeros, numpy.cumsum(valid, axis=0)])
+    first, _ = _segment_bounds(starts)
+    positions = numpy.arange(len(values))
+    window_start = numpy.maximum(positions - window + 1, first)
+    window_sums = sums[positions + 1] - sums[window_start]
+    window_counts = counts[positions + 1] - counts[window_start]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(window_counts >= min_periods, window_sums / window_counts, numpy.nan)
+
+
+class SegmentedTimeSeries:
+    """
+    Time series data sorted by <keys, date>, where each run of records with the same keys is a
+    segment. Group boundaries are computed only once, and the transforms run as vectorized
+    operations over all the segments and all the columns with the same dtype at once, so they are
+    equivalent to calling `data.groupby(keys)[columns].transform(...)` but with a single NumPy call
+    for each dtype instead of a Python call for each group. Records with a null key don't belong to
+    any segment and their transformed values are null.
+    """
+
+    data: DataFrame
+    """ The data sorted by <keys, date> """
+
+    def __init__(self, data: DataFrame, keys: List[str]):
+        assert keys[-1] == "date", '"date" key should be last'
+        self.keys = keys
+        self.data = data.sort_values(keys)
+        self._grouped_mask = self.data[keys[:-1]].notna().all(axis=1).values
+        self._starts = _segment_starts(self.data.loc[self._grouped_mask, keys[:-1]], keys[:-1])
+
+    def _value_columns(self, columns: Optional[List[str]]) -> List[str]:
+        return (
+            [col for col in self.data.columns if col not in self.keys]
+            if columns is None
+            else columns
+        )
+
+    def transform(self, columns: List[str], kernel: Callable, **kwargs) -> Dict[str, Series]:
+        """
+        Transforms the given columns with `kernel`, which is given a 2D array of values and a mask
+        of the first record of each segment. Columns with the same dtype are transformed together.
+
+        Arguments:
+            columns: Names of the columns to transform.
+            kernel: Function which transforms all the segments of a 2D array of values at once.
+            kwargs: Additional arguments passed to `kernel`.
+        Returns:
+            Dict[str, Series]: Map of <column, transformed values>, aligned with `data`.
+        """
+        transformed: Dict[str, Series] = {}
+        columns_by_dtype: Dict[Any, List[str]] = {}
+        for column in columns:
+            columns_by_dtype.setdefault(self.data[column].dtype, []).append(column)
+        for columns in columns_by_dtype.values():
+            output = kernel(
+                self.data.loc[self._grouped_mask, columns].values, self._starts, **kwargs
+            )
+            if not self._grouped_mask.all():
+                values = output
+                dtype = values.dtype if values.dtype.kind in "fO" else float
+                output = numpy.full((len(self.data), len(columns)), numpy.nan, dtype=dtype)
+                output[self._grouped_mask] = values
+            for idx, column in enumerate(columns):
+                transformed[column] = Series(output[:, idx], index=self.data.index)
+        return transformed
+
+    def _transform_frame(self, columns: List[str], kernel: Callable, **kwargs) -> DataFrame:
+        columns = self._value_columns(columns)
+        transformed = self.transform(columns, kernel, **kwargs)
+        return DataFrame({col: transformed[col] for col in columns}, index=self.data.index)
+
+    def ffill(self, columns: List[str] = None) -> DataFrame:
+        """ Fills null values with the last valid value of the same segment """
+        return self._transform_frame(columns, _segment_ffill)
+
+    def shift(self, columns: List[str] = None, periods: int = 1) -> DataFrame:
+        """ Lags the values by the given number of records within each segment """
+        return self._transform_frame(columns, _segment_shift, periods=periods)
+
+    def diff(self, columns: List[str] = None, periods: int = 1) -> DataFrame:
+        """ Difference with the value the given number of records before within each segment """
+        return self._transform_frame(columns, _segment_diff, periods=periods)
+
+    def cumsum(self, columns: List[str] = None) -> DataFrame:
+        """ Cumulative sum within each segment, where null values count as zero """
+        return self._transform_frame(columns, _segment_fillna_cumsum)
+
+    def rolling_mean(
+        self, columns: List[str] = None, window: int = 7, min_periods: int = None
+    ) -> DataFrame:
+        """ Mean of the valid values of a window of records ending in each record of a segment """
+        return self._transform_frame(
+            columns, _segment_rolling_mean, window=window, min_periods=min_periods
+        )
+
+
+def _grouped_segment_transform(
+    data: DataFrame,
+    keys: List[str],
+    kernel: Callable[[numpy.ndarray, numpy.ndarray], numpy.ndarray],
+    transform: Callable,
+    skip: List[str] = None,
+    prefix: Tuple[str, str] = None,
+) -> DataFrame:
+    """
+    Same as `grouped_transform`, but numeric columns are transformed all at once by `kernel`
+    using `SegmentedTimeSeries`, so the records are sorted only once and there is no Python call
+    for each group. Other columns are transformed by calling `transform` for each group as in
+    `grouped_transform`.
+    """
+    series = SegmentedTimeSeries(data, keys)
+    data = series.data
+    skip = [] if skip is None else skip
+    prefix = ("", "") if prefix is None else prefix
+    value_columns = [column for column in data.columns if column not in keys + skip]
+    data_kept = data.dropna(subset=value_columns, how="all").copy()
+    value_columns = [column for column in value_columns if not data_kept[column].isnull().all()]
+
+    numeric_columns = [
+        col
+        for col in value_columns
+        if isinstance(data[col].dtype, numpy.dtype) and data[col].dtype.kind in "fiu"
+    ]
+    transformed = series.transform(numeric_columns, kernel)
+    for column in value_columns:
+        if column not in transformed:
+            transformed[column] = data.groupby(keys[:-1])[column].apply(transform)
+
+    for column in value_columns:
+        data_kept[prefix[0] + column.replace(prefix[1], "")] = transformed[column]
+
+    # Restore the columns that were not transformed
+    for column in skip:
+        if column in data:
+            data_kept[column] = data[column]
+
+    return data_kept
+
+
 def grouped_diff(
     data: DataFrame,
     keys: List[str],
     skip: List[str] = None,
     prefix: Tuple[str, str] = ("new_", "total_"),
 ) -> DataFrame:
-    return grouped_transform(data, keys, lambda x: x.ffill().diff(), skip=skip, prefix=prefix)
+    return _grouped_segment_transform(
+        data, keys, _segment_ffill_diff, lambda x: x.ffill().diff(), skip=skip, prefix=prefix
+    )
 
 
 def grouped_cumsum(
@@ -176,7 +431,14 @@ def grouped_cumsum(
     skip: List[str] = None,
     prefix: Tuple[str, str] = ("total_", "new_"),
 ) -> DataFrame:
-    return grouped_transform(data, keys, lambda x: x.fillna(0).cumsum(), skip=skip, prefix=prefix)
+    return _grouped_segment_transform(
+        data,
+        keys,
+        _segment_fillna_cumsum,
+        lambda x: x.fillna(0).cumsum(),
+        skip=skip,
+        prefix=prefix,
+    )
 
 
 def stack_table(
@@ -207,21 +469,38 @@ def stack_table(
     # Stash columns which are not part of the columns being indexed, aggregated or stacked
     used_columns = index_columns + value_columns + stack_columns
     stash_columns = [col for col in data.columns if col not in used_columns]
-    stash_output = data[stash_columns].copy()
-    data = data.drop(columns=stash_columns)
+    stash_output = data[stash_columns]
 
-    # Aggregate (stack) columns with respect to the value columns
+    # Label each record once for each stack column with the code of its value, offset so that codes
+    # from different stack columns don't overlap, leaving out null values
+    positions, labels, label_ranges = [], [], []
+    label_offset = 0
     for col_stack in stack_columns:
-        col_stack_values = data[col_stack].dropna().unique()
-        for col_variable in value_columns:
-            df = data[index_columns + [col_variable, col_stack]].copy()
-            df = df.pivot_table(
-                values=col_variable, index=index_columns, columns=[col_stack], aggfunc="sum"
-            )
-            column_mapping = {suffix: f"{col_variable}_{suffix}" for suffix in col_stack_values}
-            df = df.rename(columns=column_mapping)
-            transfer_columns = list(column_mapping.values())
-            output[transfer_columns] = df[transfer_columns]
+        codes, suffixes = factorize(data[col_stack])
+        positions.append(numpy.flatnonzero(codes >= 0))
+        labels.append(codes[codes >= 0] + label_offset)
+        label_ranges.append(list(enumerate(suffixes, start=label_offset)))
+        label_offset += len(suffixes)
+
+    # Aggregate (stack) columns with respect to the value columns in a single long-to-wide reshape
+    if value_columns and any(label_ranges):
+        stacked = data[index_columns + value_columns].take(numpy.concatenate(positions))
+        stacked["_stack"] = numpy.concatenate(labels)
+        stacked = stacked.groupby(index_columns + ["_stack"]).sum()
+        dtypes = stacked.dtypes
+        stacked = stacked.unstack("_stack").reindex(output.index)
+
+        # Integer sums are kept as such for each stack column which has all values present, and
+        # later stack columns take precedence over earlier ones if they produce the same column name
+        transfer_columns: Dict[str, Series] = {}
+        for label_range in label_ranges:
+            for col_variable in value_columns:
+                block = stacked.reindex(columns=[(col_variable, label) for label, _ in label_range])
+                if dtypes[col_variable].kind in "iu" and block.notna().values.all():
+                    block = block.astype(dtypes[col_variable])
+                for (label, suffix), column in zip(label_range, block.columns):
+                    transfer_columns[f"{col_variable}_{suffix}"] = block[column]
+        output[list(transfer_columns.keys())] = DataFrame(transfer_columns, index=output.index)
 
     # Restore the stashed columns, reset index and return
     output[stash_columns] = stash_output
@@ -316,10 +595,11 @@ def stratify_age_sex_ethnicity(data: DataFrame) -> DataFrame:
     has_age = "age" in data.columns
     if has_age:
 
-        # If a data source reports too many age buckets, compress all those > 90
-        data.loc[
-            data["age"].apply(lambda x: (safe_int_cast(str(x).split("-")[-1]) or 0) > 90), "age"
-        ] = "90-"
+        # If a data source reports too many age buckets, compress all those > 90. There are only a
+        # handful of distinct buckets, so each of them is checked only once.
+        age_codes, age_buckets = factorize(data["age"])
+        age_over_cutoff = [(safe_int_cast(str(x).split("-")[-1]) or 0) > 90 for x in age_buckets]
+        data.loc[numpy.array(age_over_cutoff + [False])[age_codes], "age"] = "90-"
 
         # Stratified age uses a prefix since it's less obvious from the value names
         data["age"] = age_prefix + data["age"]
@@ -378,8 +658,15 @@ def derive_localities(localities: DataFrame, data: DataFrame) -> DataFrame:
     agg_func.update({col: "sum" for col in numeric_columns})
     agg_func.update({col: "first" for col in non_numeric_columns})
 
-    # Remove localities that are already part of the data
-    localities = localities[~localities["locality"].isin(data["key"])]
+    # Remove localities that are already part of the data, comparing only the distinct keys
+    key_codes, data_keys = factorize(data["key"])
+    localities = localities[~localities["locality"].isin(data_keys)]
+
+    # Only the records with a key that rolls up into a locality need to be merged, which often
+    # are none at all. Records with a null key have a code of -1, which looks up the last element.
+    rollup_mask = numpy.append(isin(data_keys, localities["key"].values), False)[key_codes]
+    if not rollup_mask.all():
+        data = data[rollup_mask]
 
     # Merge and aggregate
     locs = data.merge(localities, on="key", how="inner")
@@ -403,13 +690,18 @@ def backfill_cumulative_fields_inplace(data: DataFrame, columns: Optional[List]
         # Early return, nothing to do here.
         return data
 
-    groups = data.groupby(["key"])
-    for group in groups:
-        name, group_data = group
-        group_data = group_data.sort_values(by="date", ascending=False)
-        for column in columns:
-            # Need to fill the last item with 0 if it's null for bfill purposes.
-            if isna(group_data.loc[group_data.last_valid_index(), column]):
-                group_data.loc[group_data.last_valid_index(), column] = 0
-
-            data.loc[data["key"] == name, column] = group_data[column].bfill()
+    # Sort each key by date so the earliest record comes first, which is seeded with zero if null
+    keyed_mask = data["key"].notna().values
+    sorted_data = data.loc[keyed_mask, ["key", "date"] + columns].reset_index(drop=True)
+    sorted_data = sorted_data.sort_values(["key", "date"])
+    first_mask = ~sorted_data["key"].duplicated().values
+    sorted_values = sorted_data[columns].copy()
+    sorted_values.loc[first_mask] = sorted_values.loc[first_mask].fillna(0)
+
+    # A single forward fill per key is the same as a backfill in reverse date order
+    filled = sorted_values.groupby(sorted_data["key"].values, sort=False).ffill()
+    positions = numpy.flatnonzero(keyed_mask)[sorted_data.index.values]
+    for column in columns:
+        values = data[column].values.copy()
+        values[positions] = filled[column].values
+        data[column] = values
@@ -21,7 +21,7 @@ from pandas import DataFrame, concat, isna
 from lib.case_line import convert_cases_to_time_series
 from lib.cast import safe_int_cast, numeric_code_as_string
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 _IBGE_STATES = {
@@ -221,7 +221,7 @@ class BrazilStratifiedDataSource(DataSource):
         data = convert_cases_to_time_series(cases, index_columns=["key"])
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%dT%H:%M:%S.%fZ"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%dT%H:%M:%S.%fZ")
 
         # Aggregate for the whole state
         state = data.drop(columns=["key"]).groupby(["date", "age", "sex"]).sum().reset_index()
@@ -17,7 +17,7 @@ from pandas import DataFrame, concat, isna
 from lib.case_line import convert_cases_to_time_series
 from lib.cast import safe_int_cast
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -70,7 +70,7 @@ class CearaDataSource(DataSource):
         data = convert_cases_to_time_series(cases, index_columns=["subregion2_code"])
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%d %H:%M:%S")
 
         # Aggregate state-level data by adding all municipalities
         state = data.drop(columns=["subregion2_code"]).groupby(["date", "age", "sex"]).sum()
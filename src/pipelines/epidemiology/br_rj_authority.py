@@ -16,7 +16,7 @@ from typing import Dict
 from pandas import DataFrame
 from lib.case_line import convert_cases_to_time_series
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -69,7 +69,7 @@ class RioStratifiedDataSource(DataSource):
         data["subregion1_code"] = "RJ"
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d/%m/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d/%m/%Y")
 
         # The sum of all districts is the metropolitan area of Rio
         metro = data.groupby(["date", "age", "sex", "ethnicity"]).sum().reset_index()
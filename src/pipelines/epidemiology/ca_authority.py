@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class CanadaDataSource(DataSource):
@@ -40,7 +40,7 @@ class CanadaDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d-%m-%Y")
 
         # Make sure all records have the country code and match subregion1 only
         data["country_code"] = "CA"
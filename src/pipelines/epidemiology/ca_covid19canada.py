@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame, concat
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_merge, table_rename
 
 _column_adapter = {
@@ -63,7 +63,7 @@ class Covid19CanadaDataSource(DataSource):
         data.drop(columns=["subregion1_name"], inplace=True)
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d-%m-%Y")
 
         # Aggregate subregion1 level
         l1_index = ["date", "subregion1_code"]
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class CongoDRCHumdataDataSource(DataSource):
@@ -42,7 +42,7 @@ class CongoDRCHumdataDataSource(DataSource):
         # Data source sometimes uses different hypenation from src/data/iso_3166_2_codes.csv
         data["match_string"].replace({"Haut  Katanga": "Haut-Katanga"}, inplace=True)
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d")
 
         data["total_confirmed"] = (
             data["total_confirmed"].fillna(0).astype({"total_confirmed": "int64"})
@@ -17,7 +17,7 @@ from pandas import DataFrame, concat, isna
 from lib.case_line import convert_cases_to_time_series
 
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -111,10 +111,11 @@ class CzechRepublicAgeSexDataSource(DataSource):
         data = data[data["key"] != "CZ_99_99Y"]
 
         # Convert all dates to ISO format
-        data["date"] = (
-            data["date"]
-            .astype(str)
-            .apply(lambda x: datetime_isoformat(x, "%d.%m.%Y" if "." in x else "%Y-%m-%d"))
-        )
+        dates = data["date"].astype(str)
+        dotted_mask = dates.str.contains(".", regex=False).values
+        data["date"] = datetime_isoformat_series(dates, "%Y-%m-%d")
+        data.loc[dotted_mask, "date"] = datetime_isoformat_series(
+            dates[dotted_mask], "%d.%m.%Y"
+        ).values
 
         return data
@@ -19,7 +19,7 @@ from pandas import DataFrame, concat
 from lib.data_source import DataSource
 from lib.utils import table_rename
 from lib.cast import safe_int_cast, numeric_code_as_string
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class MadridDataSource(DataSource):
@@ -52,7 +52,7 @@ class MadridDataSource(DataSource):
         data["key"] = "ES_MD_" + data["subregion2_code"]
         data = data.drop(columns=["subregion2_code"])
 
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x[:10], "%Y/%m/%d"))
+        data["date"] = datetime_isoformat_series(data["date"].str[:10], "%Y/%m/%d")
         data["total_confirmed"] = data["total_confirmed"].apply(safe_int_cast)
 
         # Aggregate the entire autonomous community
@@ -20,7 +20,7 @@ from lib.data_source import DataSource
 from lib.io import read_file
 from lib.constants import SRC
 from lib.concurrent import thread_map
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -70,5 +70,5 @@ class FranceDataSource(DataSource):
         departments = concat(list(thread_map(_get_department, deps_iter, total=len(fr_codes))))
 
         data = concat([regions, departments])
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%d %H:%M:%S")
         return data
@@ -17,7 +17,7 @@ from typing import Any, Dict, List
 from pandas import DataFrame, concat
 from lib.pipeline import DataSource
 from lib.utils import table_rename
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.cast import safe_int_cast
 import requests
 from uk_covid19 import Cov19API
@@ -124,7 +124,7 @@ class Covid19UkRegionsDataSource(DataSource):
             drop=True,
         )
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d")
         _fix_bad_total_deceased(data)
 
         # Make sure all records have country code and no subregion code
@@ -166,7 +166,7 @@ class Covid19UkL2DataSource(DataSource):
             drop=True,
         )
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d")
         _fix_bad_total_deceased(data)
 
         # Make sure all records have country code and no subregion code
@@ -207,7 +207,7 @@ class Covid19UkL1DataSource(DataSource):
             drop=True,
         )
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d")
         _fix_bad_total_deceased(data)
 
         # Make sure all records have country code and no subregion code
@@ -256,6 +256,6 @@ class Covid19UkL3DataSource(DataSource):
             drop=True,
         )
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d")
 
         return data
@@ -14,7 +14,7 @@
 
 from typing import Dict
 from pandas import DataFrame
-from lib.cast import safe_int_cast
+from lib.cast import safe_int_cast_series
 from lib.data_source import DataSource
 
 
@@ -55,7 +55,7 @@ class Covid19UkDataL3DataSource(DataSource):
         # Now that we have the key, we don't need any other non-value columns
         data = data[["date", "key", "total_confirmed"]]
 
-        data["total_confirmed"] = data["total_confirmed"].apply(safe_int_cast).astype("Int64")
+        data["total_confirmed"] = safe_int_cast_series(data["total_confirmed"])
         return data
 
 
@@ -87,7 +87,7 @@ class Covid19UkDataL2DataSource(DataSource):
         )
 
         for col in ("total_confirmed", "total_deceased", "total_tested"):
-            data[col] = data[col].apply(safe_int_cast).astype("Int64")
+            data[col] = safe_int_cast_series(data[col])
 
         data.loc[data["subregion1_name"] == "UK", "subregion1_name"] = None
         data["subregion2_code"] = None
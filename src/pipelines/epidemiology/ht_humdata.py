@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame, concat
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -54,7 +54,7 @@ class HaitiHumdataDataSource(DataSource):
         # Concatenate the two Series and drop the first row which is a column description.
         data = concat([dataframe["data_asofMay5"], dataframe["data_fromMay6"]]).drop(0)
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d %H:%M:%S")
 
         # Make sure all records have the country code
         data["country_code"] = "HT"
@@ -15,7 +15,7 @@
 import datetime
 from typing import Dict
 from pandas import DataFrame
-from lib.cast import safe_int_cast
+from lib.cast import safe_int_cast_series
 from lib.data_source import DataSource
 from lib.time import datetime_isoformat
 from lib.utils import pivot_table
@@ -40,7 +40,7 @@ class CatchmeupDataSource(DataSource):
         df["date"] = df["date"].apply(_parse_date)
         df = df.dropna(subset=["date"])
         df = df.rename(columns={"value": "total_confirmed"})
-        df["total_confirmed"] = df["total_confirmed"].apply(safe_int_cast).astype("Int64")
+        df["total_confirmed"] = safe_int_cast_series(df["total_confirmed"])
 
         df = df[["date", "match_string", "total_confirmed"]]
         df = df[df["match_string"] != "Total"]
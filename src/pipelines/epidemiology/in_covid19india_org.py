@@ -16,7 +16,7 @@ from typing import Dict
 import math
 from pandas import DataFrame, melt
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 import datetime
 
@@ -48,7 +48,7 @@ class Covid19IndiaOrgL2DataSource(DataSource):
         )
         # No data is recorded against IN_DD, it is now a district of IN_DN
         data = data[data.subregion1_code != "DD"]
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%d-%b-%y"))
+        data.date = datetime_isoformat_series(data.date, "%d-%b-%y")
         data["key"] = "IN_" + data["subregion1_code"]
 
         return data
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame, concat
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import pivot_table, table_merge
 
 
@@ -25,7 +25,7 @@ def _parse_pivot(data: DataFrame, name: str):
     data = data.iloc[:, :-4]
 
     # Convert date to ISO format
-    data["date"] = data["date"].apply(lambda x: datetime_isoformat(str(x), "%Y%m%d"))
+    data["date"] = datetime_isoformat_series(data["date"], "%Y%m%d")
     data = pivot_table(data.set_index("date")).rename(
         columns={"value": name, "pivot": "match_string"}
     )
@@ -66,7 +66,7 @@ class Jp2019NcovJapanByRegion(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y%m%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y%m%d")
 
         # Add the country code to all records
         data["country_code"] = "JP"
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -40,7 +40,7 @@ class LuxembourgDataSource(DataSource):
         )
 
         # Get date in ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d/%m/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d/%m/%Y")
 
         # Only country-level data is provided
         data["key"] = "LU"
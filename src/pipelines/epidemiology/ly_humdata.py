@@ -16,7 +16,7 @@ from typing import Dict
 import math
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 import datetime
 from lib.cast import safe_int_cast
 
@@ -42,7 +42,7 @@ class LibyaHumdataDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%m/%d/%Y")
 
         # The first row is metadata info about column names - discard it
         data = data[data.match_string != "#loc+name"]
@@ -17,8 +17,8 @@ from pandas import DataFrame, concat
 from lib.cast import safe_int_cast, safe_str_cast
 from lib.data_source import DataSource
 from lib.case_line import convert_cases_to_time_series
-from lib.io import fuzzy_text
-from lib.time import datetime_isoformat
+from lib.io import fuzzy_text_series
+from lib.time import datetime_isoformat_series
 from lib.utils import table_merge, table_rename
 
 _column_adapter = {
@@ -76,7 +76,7 @@ class PeruDataSource(DataSource):
         data["country_code"] = "PE"
         data["date"] = data["date"].apply(safe_int_cast)
         data["date"] = data["date"].apply(safe_str_cast)
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y%m%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y%m%d")
 
         # Properly capitalize department to allow for exact matching
         data["subregion1_name"] = data["subregion1_name"].apply(
@@ -105,8 +105,8 @@ class PeruDataSource(DataSource):
         data["subregion2_name"] = ""
 
         # Convert other text fields to lowercase for consistent processing
-        data["match_string"] = data["match_string"].apply(fuzzy_text)
-        data["province_name"] = data["province_name"].apply(fuzzy_text)
+        data["match_string"] = fuzzy_text_series(data["match_string"])
+        data["province_name"] = fuzzy_text_series(data["province_name"])
 
         # Drop bogus records
         data = data[~data["match_string"].isna()]
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import pivot_table
 
 
@@ -37,7 +37,7 @@ class PtCovid19L1DataSource(DataSource):
             "icu": "current_intensive_care",
         }
         data = data.rename(columns=rename_columns)[list(rename_columns.values())]
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data.date = datetime_isoformat_series(data.date, "%d-%m-%Y")
         data["key"] = "PT"
         return data
 
@@ -53,7 +53,7 @@ class PtCovid19L2DataSource(DataSource):
         data = data.drop(
             columns=["cases_confirmed_new", "cases_unconfirmed_new", "deaths_new", "recovered_new"]
         )
-        data["date"] = dataframes[0].date.apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data["date"] = datetime_isoformat_series(dataframes[0].date, "%d-%m-%Y")
 
         subsets = []
         for token in column_tokens:
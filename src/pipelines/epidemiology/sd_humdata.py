@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class SudanHumdataDataSource(DataSource):
@@ -52,7 +52,7 @@ class SudanHumdataDataSource(DataSource):
         # Data source uses different spelling from src/data/iso_3166_2_codes.csv
         data["match_string"].replace({"Gedaref": "Al Qadarif"}, inplace=True)
 
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+        data.date = datetime_isoformat_series(data.date, "%m/%d/%Y")
 
         # Sudan data includes empty cells where there are no confirmed cases.
         # These get read in as NaN.  Replace them with zeroes so that the
@@ -16,7 +16,7 @@ from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
 from lib.cast import safe_int_cast
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class SloveniaDataSource(DataSource):
@@ -56,7 +56,7 @@ class SloveniaDataSource(DataSource):
         data["key"] = "SI"
 
         # Make sure that the date column is a string
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(str(x)[:10], "%Y-%m-%d"))
+        data["date"] = datetime_isoformat_series(data["date"].astype(str).str[:10], "%Y-%m-%d")
 
         # Remove non-numeric markers from data fields
         value_columns = [
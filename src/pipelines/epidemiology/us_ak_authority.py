@@ -16,7 +16,7 @@ from typing import Dict
 from pandas import DataFrame
 from lib.io import read_file
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 _column_adapter = {
@@ -53,7 +53,7 @@ class AlaskaDataSource(DataSource):
         data.columns = data.iloc[1]
         data = table_rename(data.iloc[2:], _column_adapter, drop=True)
         data["date"] = data["date"].astype(str).apply(lambda x: x[:10])
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%d")
         data = data.dropna(subset=["date"])
 
         if parse_opts.get("key"):
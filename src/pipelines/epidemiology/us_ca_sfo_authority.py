@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename, table_merge
 
 # specimen_collection_date,tests,pos,pct,neg,indeterminate,Last Updated At
@@ -35,6 +35,6 @@ class SanFranciscoDataSource(DataSource):
         tables = [table_rename(table, _column_adapter, drop=True) for table in dataframes.values()]
         data = table_merge(tables, on="date", how="outer")
 
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y/%m/%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y/%m/%d")
         data["key"] = "US_CA_SFO"
         return data
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class CovidTrackingDataSource(DataSource):
@@ -42,7 +42,7 @@ class CovidTrackingDataSource(DataSource):
         data = dataframes[0].rename(columns=column_map)
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y%m%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y%m%d")
 
         # Keep only columns we can process
         data["key"] = "US_" + data["subregion1_code"]
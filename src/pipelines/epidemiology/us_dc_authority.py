@@ -17,11 +17,11 @@ from pathlib import Path
 from typing import Any, Dict, List
 from bs4 import BeautifulSoup
 from pandas import DataFrame
-from lib.cast import safe_float_cast
+from lib.cast import safe_float_cast_series
 from lib.io import read_file
 from lib.net import download_snapshot, download
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import pivot_table_date_columns, table_rename
 
 
@@ -54,7 +54,7 @@ def _parse_summary(data: DataFrame) -> DataFrame:
 
     data = pivot_table_date_columns(data.set_index("statistic"), value_name="statistic")
     data = data.reset_index().dropna(subset=["date"])
-    data.statistic = data.statistic.apply(safe_float_cast).astype(float)
+    data.statistic = safe_float_cast_series(data.statistic)
 
     data = data.pivot_table(index="date", columns=["index"], values="statistic")
     data = data.reset_index()
@@ -107,7 +107,7 @@ class DistrictColumbiaDataSource(DataSource):
         data = _sheet_processors[parse_opts.get("sheet_name")](data)
 
         # Fix up the date format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%d %H:%M:%S")
 
         # Add a key to all the records (state-level only)
         data["key"] = "US_DC"
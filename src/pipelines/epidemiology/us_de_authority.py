@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -31,7 +31,7 @@ class DelawareDataSource(DataSource):
         )
 
         # Ensure all dates have the appropriate format, drop the rest
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y-%m-%d")
         data = data.dropna(subset=["date"])
 
         # Ignore all columns which have fancy units
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame, concat
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -36,7 +36,7 @@ class IndianaDataSource(DataSource):
         )
 
         data.sex = data.sex.apply(lambda x: x.replace("M", "male").replace("F", "female"))
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+        data.date = datetime_isoformat_series(data.date, "%Y-%m-%d %H:%M:%S")
         data.age = data.age.apply(lambda x: None if x == "Unknown" else x.replace("+", "-"))
 
         return data
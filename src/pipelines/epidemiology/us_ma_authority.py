@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -34,7 +34,7 @@ class MassachusettsCountiesDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].astype(str).apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"].astype(str), "%m/%d/%Y")
 
         # Drop bogus values
         data = data[data["match_string"] != "Unknown"]
@@ -62,7 +62,7 @@ class MassachusettsBySexDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].astype(str).apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"].astype(str), "%m/%d/%Y")
 
         data["key"] = "US_MA"
         return data
@@ -87,7 +87,7 @@ class MassachusettsByAgeDataSource(DataSource):
         data["age"] = data["age"].apply(lambda x: None if x == "Unknown" else x.replace("+", "-"))
 
         # Convert date to ISO format
-        data["date"] = data["date"].astype(str).apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"].astype(str), "%m/%d/%Y")
 
         data["key"] = "US_MA"
         return data
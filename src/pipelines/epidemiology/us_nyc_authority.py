@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame, concat
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -30,7 +30,7 @@ def _parse_boro(data: DataFrame, column_prefix: str, fips: str) -> DataFrame:
         },
         drop=True,
     )
-    data.date = data.date.apply(lambda x: datetime_isoformat(x, "%m/%d/%Y"))
+    data.date = datetime_isoformat_series(data.date, "%m/%d/%Y")
     data["key"] = f"US_NY_{fips}"
     return data
 
@@ -15,10 +15,10 @@
 from typing import Dict
 import numpy
 from pandas import DataFrame
-from lib.cast import safe_float_cast, safe_str_cast
+from lib.cast import safe_float_cast_series, safe_str_cast
 from lib.io import read_file
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_merge, table_rename
 
 
@@ -81,14 +81,14 @@ class TexasDataSource(DataSource):
         for sheet_name, sheet_processor in sheet_processors.items():
             df = sheet_processor(read_file(sources[0], sheet_name=sheet_name))
             df["date"] = df["date"].apply(safe_str_cast)
-            df["date"] = df["date"].apply(lambda x: datetime_isoformat(x, "%Y-%m-%d %H:%M:%S"))
+            df["date"] = datetime_isoformat_series(df["date"], "%Y-%m-%d %H:%M:%S")
             df = df.dropna(subset=["date"])
             sheets.append(df)
 
         data = table_merge(sheets, how="outer")
         for col in data.columns:
             if col != "date":
-                data[col] = data[col].apply(safe_float_cast).astype(float)
+                data[col] = safe_float_cast_series(data[col])
 
         data["key"] = "US_TX"
         return data
@@ -16,7 +16,7 @@ from typing import Dict, List
 from pandas import DataFrame
 from lib.cast import safe_int_cast
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat, date_offset
+from lib.time import date_offset, datetime_isoformat_series
 from lib.utils import get_or_default
 
 
@@ -50,7 +50,7 @@ class ECDCDataSource(DataSource):
         data["dateRep"] = data["dateRep"].astype(str)
 
         # Convert date to ISO format
-        data["date"] = data["dateRep"].apply(lambda x: datetime_isoformat(x, "%d/%m/%Y"))
+        data["date"] = datetime_isoformat_series(data["dateRep"], "%d/%m/%Y")
 
         # Workaround for https://github.com/open-covid-19/data/issues/8
         # ECDC mistakenly labels Greece country code as EL instead of GR
@@ -19,7 +19,7 @@ from pandas import DataFrame, isna, isnull
 
 from lib.cast import safe_int_cast, safe_datetime_parse
 from lib.data_source import DataSource
-from lib.io import count_html_tables, read_html, wiki_html_cell_parser, fuzzy_text
+from lib.io import count_html_tables, read_html, wiki_html_cell_parser, fuzzy_text_series
 from lib.utils import pivot_table
 
 
@@ -168,7 +168,7 @@ class WikipediaDataSource(DataSource):
         data[null_column] = None
 
         # Remove known values that are just noise
-        data["_match_string"] = data["match_string"].apply(fuzzy_text)
+        data["_match_string"] = fuzzy_text_series(data["match_string"])
         data = data[
             ~data["_match_string"].isin(
                 [
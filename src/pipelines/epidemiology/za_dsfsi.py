@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat, datetime_isoformat_series
 from lib.utils import table_rename, pivot_table, table_merge
 
 
@@ -40,7 +40,7 @@ class Covid19ZaCumulativeDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d-%m-%Y")
 
         # Country-level records should have "total" region name
         country_mask = data["subregion1_code"] == "total"
@@ -71,7 +71,7 @@ class Covid19ZaTimelineTestingDataSource(DataSource):
         )
 
         # Convert date to ISO format
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%d-%m-%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d-%m-%Y")
 
         data["key"] = "ZA"
         return data
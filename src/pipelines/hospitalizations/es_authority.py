@@ -16,7 +16,7 @@ from typing import Dict
 from pandas import DataFrame
 from lib.io import read_file
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class ISCIIIHospitalizedDataSource(DataSource):
@@ -46,7 +46,7 @@ class ISCIIIHospitalizedDataSource(DataSource):
         )
 
         # Convert dates to ISO format
-        data["date"] = data["date"].apply(lambda date: datetime_isoformat(date, "%d/%m/%Y"))
+        data["date"] = datetime_isoformat_series(data["date"], "%d/%m/%Y")
 
         # Keep only the columns we can process
         data = data[
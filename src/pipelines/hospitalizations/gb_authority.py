@@ -14,7 +14,7 @@
 
 from typing import Dict
 from pandas import DataFrame
-from lib.cast import safe_float_cast
+from lib.cast import safe_float_cast_series
 from lib.io import read_file
 from lib.data_source import DataSource
 from lib.utils import pivot_table
@@ -33,7 +33,7 @@ class ScotlandDataSource(DataSource):
 
         data = pivot_table(data.set_index("date"), pivot_name="match_string")
         data = data.rename(columns={"value": value_name})
-        data[value_name] = data[value_name].replace("*", None).apply(safe_float_cast).astype(float)
+        data[value_name] = safe_float_cast_series(data[value_name].replace("*", None))
 
         # Get date in ISO format
         data.date = data.date.apply(lambda x: x.date().isoformat())
@@ -16,7 +16,7 @@ from typing import Dict
 from pandas import DataFrame
 from lib.io import read_file
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class SwedenDataSource(DataSource):
@@ -29,5 +29,5 @@ class SwedenDataSource(DataSource):
         # Get date in ISO format
         data["key"] = "SE"
         # The source is actually %m/%d/%Y but pandas silently converts it to date object
-        data["date"] = data["date"].astype(str).apply(lambda x: datetime_isoformat(x, "%Y-%m-%d"))
+        data["date"] = datetime_isoformat_series(data["date"].astype(str), "%Y-%m-%d")
         return data
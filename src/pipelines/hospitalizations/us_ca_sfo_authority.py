@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.pipeline import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -37,6 +37,6 @@ class SanFranciscoDataSource(DataSource):
         )
 
         data = icu.merge(hosp, on="date")
-        data["date"] = data["date"].apply(lambda x: datetime_isoformat(x, "%Y/%m/%d"))
+        data["date"] = datetime_isoformat_series(data["date"], "%Y/%m/%d")
         data["key"] = "US_CA_SFO"
         return data
@@ -15,7 +15,7 @@
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 from lib.utils import table_rename
 
 
@@ -48,6 +48,6 @@ class OpenCovidDataSource(DataSource):
         data["key"] = parse_opts.get("key")
         data["date"] = data[parse_opts.get("date_column", "date")].astype(str)
         date_format = parse_opts.get("date_format", "%Y-%m-%d")
-        data.date = data.date.apply(lambda x: datetime_isoformat(x, date_format))
+        data.date = datetime_isoformat_series(data.date, date_format)
 
         return data
@@ -16,7 +16,7 @@ import re
 from typing import Dict
 from pandas import DataFrame
 from lib.data_source import DataSource
-from lib.time import datetime_isoformat
+from lib.time import datetime_isoformat_series
 
 
 class OxfordGovernmentResponseDataSource(DataSource):
@@ -27,7 +27,7 @@ class OxfordGovernmentResponseDataSource(DataSource):
         data = data.drop(columns=["CountryName", "ConfirmedCases", "ConfirmedDeaths"])
         data = data.drop(columns=[col for col in data.columns if col.endswith("_Notes")])
         data = data.drop(columns=[col for col in data.columns if col.endswith("_IsGeneral")])
-        data["date"] = data["Date"].apply(lambda x: datetime_isoformat(x, "%Y%m%d"))
+        data["date"] = datetime_isoformat_series(data["Date"], "%Y%m%d")
 
         # Drop redundant flag columns
         data = data.drop(columns=[col for col in data.columns if "_Flag" in col])
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A script to benchmark the table utilities from `lib` against their reference
+# implementations using synthetic data. Each benchmark verifies that both implementations produce
+# the same output before reporting the timings.
+#
+# Example usage: `python src/scripts/benchmark_utils.py combine --rows 2000000`
+
+import math
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy
+from pandas import DataFrame, concat
+from pandas.testing import assert_frame_equal
+
+# Add our library utils to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.cast import column_converters, isna
+from lib.io import export_csv, read_file, read_table
+from lib.utils import (
+    agg_last_not_null,
+    combine_tables,
+    grouped_cumsum,
+    grouped_diff,
+    grouped_transform,
+    pivot_table,
+    pivot_table_date_columns,
+)
+
+
+def _timeit(func: Callable, *args, **kwargs) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _make_keys_and_dates(rows: int, seed: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ Creates random <key, date> pairs for the given number of rows """
+    rng = numpy.random.default_rng(seed)
+    dates = numpy.array([f"2020-{1 + idx // 28:02d}-{1 + idx % 28:02d}" for idx in range(300)])
+    keys = numpy.array([f"K{idx:05d}" for idx in range(max(1, rows // len(dates)))])
+    return keys[rng.integers(len(keys), size=rows)], dates[rng.integers(len(dates), size=rows)]
+
+
+def _make_table(rows: int, columns: int, seed: int, null_ratio: float = 0.3) -> DataFrame:
+    """ Creates a table indexed by <key, date> with random values and a fraction of nulls """
+    rng = numpy.random.default_rng(seed)
+    keys, dates = _make_keys_and_dates(rows, seed)
+    data = DataFrame({"date": dates, "key": keys})
+    for idx in range(columns):
+        values = rng.integers(1000, size=rows).astype(float)
+        values[rng.random(rows) < null_ratio] = numpy.nan
+        data[f"total_value_{idx}"] = values
+    return data
+
+
+def _reference_combine_tables(tables: List[DataFrame], keys: List[str]) -> DataFrame:
+    data = concat(tables)
+    grouped = data.groupby([col for col in keys if col in data.columns])
+    return grouped.aggregate(agg_last_not_null).reset_index()
+
+
+def benchmark_combine(rows: int, seed: int) -> Dict[str, float]:
+    source_count = 10
+    tables = [_make_table(rows // source_count, 8, seed + idx) for idx in range(source_count)]
+    keys = ["date", "key"]
+
+    time_reference, expected = _timeit(_reference_combine_tables, tables, keys)
+    time_vectorized, result = _timeit(combine_tables, tables, keys)
+    assert_frame_equal(expected, result, check_dtype=False)
+
+    return {"reference": time_reference, "vectorized": time_vectorized}
+
+
+def _reference_export_csv(data: DataFrame, schema: Dict[str, Any]) -> str:
+    formatters = {
+        "str": lambda val: str(val),
+        "float": lambda val: round(val, 6),
+        "int": lambda val: "%d" % val,
+    }
+    data_fmt = DataFrame(columns=list(schema.keys()), index=data.index)
+    for column, converter in column_converters(schema).items():
+        format_func = formatters[schema[column]]
+        values = data[column].fillna(numpy.nan).apply(converter, skip_pandas_nan=True)
+        data_fmt[column] = values.apply(
+            lambda val: "" if isna(val, skip_pandas_nan=True) else format_func(val)
+        )
+    return data_fmt.to_csv(index=False)
+
+
+def benchmark_export(rows: int, seed: int) -> Dict[str, float]:
+    data = _make_table(rows, 8, seed)
+    rng = numpy.random.default_rng(seed)
+    for idx in range(4):
+        data[f"ratio_{idx}"] = rng.random(rows)
+    schema = {
+        "date": "str",
+        "key": "str",
+        **{col: "int" for col in data.columns if col.startswith("total_")},
+        **{col: "float" for col in data.columns if col.startswith("ratio_")},
+    }
+
+    time_reference, expected = _timeit(_reference_export_csv, data.copy(), schema)
+    time_vectorized, result = _timeit(export_csv, data.copy(), schema=schema)
+    assert expected == result, "CSV output differs from reference implementation"
+
+    return {"reference": time_reference, "vectorized": time_vectorized}
+
+
+def _reference_grouped_diff_and_cumsum(data: DataFrame) -> Tuple[DataFrame, DataFrame]:
+    keys = ["key", "date"]
+    diff = grouped_transform(data, keys, lambda x: x.ffill().diff(), prefix=("new_", "total_"))
+    cumsum = grouped_transform(
+        data, keys, lambda x: x.fillna(0).cumsum(), prefix=("total_", "new_")
+    )
+    return diff, cumsum
+
+
+def _grouped_diff_and_cumsum(data: DataFrame) -> Tuple[DataFrame, DataFrame]:
+    keys = ["key", "date"]
+    return grouped_diff(data, keys), grouped_cumsum(data, keys)
+
+
+def benchmark_grouped(rows: int, seed: int) -> Dict[str, float]:
+    data = _make_table(rows, 8, seed)
+
+    # Values which are not whole numbers make any difference in the order of the sums visible
+    data["total_value_0"] = data["total_value_0"] / 7 * 1e9
+
+    time_reference, expected = _timeit(_reference_grouped_diff_and_cumsum, data)
+    time_vectorized, result = _timeit(_grouped_diff_and_cumsum, data)
+    for expected_table, result_table in zip(expected, result):
+        assert_frame_equal(expected_table, result_table, check_exact=True)
+
+    return {"reference": time_reference, "vectorized": time_vectorized}
+
+
+def _reference_pivot_table(data: DataFrame) -> DataFrame:
+    dates = data.index.tolist() * len(data.columns)
+    pivots = sum([[name] * len(column) for name, column in data.iteritems()], [])
+    values = sum([column.tolist() for name, column in data.iteritems()], [])
+    records = zip(dates, pivots, values)
+    return DataFrame.from_records(records, columns=[data.index.name, "pivot", "value"])
+
+
+def _reference_pivot_table_date_columns(data: DataFrame) -> DataFrame:
+    records = []
+    for idx, row in data.iterrows():
+        for pivot in data.columns:
+            records.append({"index": idx, "date": pivot, "value": row[pivot]})
+    return DataFrame.from_records(records).set_index("index")
+
+
+def benchmark_pivot(rows: int, seed: int) -> Dict[str, float]:
+    # The number of rows is the number of cells of a square table, e.g. 1000x1000 for 1000000
+    side = max(1, math.isqrt(rows))
+    rng = numpy.random.default_rng(seed)
+    keys = [f"K{idx:05d}" for idx in range(side)]
+    dates = [
+        f"{2020 + idx // 336}-{1 + idx // 28 % 12:02d}-{1 + idx % 28:02d}" for idx in range(side)
+    ]
+    values = rng.integers(1000, size=(side, side)).astype(float)
+    values[rng.random((side, side)) < 0.3] = numpy.nan
+
+    # Regions are columns for `pivot_table`, and dates are columns for `pivot_table_date_columns`
+    data_regions = DataFrame(values, index=dates, columns=keys).rename_axis("date")
+    data_dates = DataFrame(values, index=keys, columns=dates)
+
+    time_reference, expected = _timeit(
+        lambda: (
+            _reference_pivot_table(data_regions),
+            _reference_pivot_table_date_columns(data_dates),
+        )
+    )
+    time_vectorized, result = _timeit(
+        lambda: (pivot_table(data_regions), pivot_table_date_columns(data_dates))
+    )
+    for expected_table, result_table in zip(expected, result):
+        assert_frame_equal(expected_table, result_table)
+
+    return {"reference": time_reference, "vectorized": time_vectorized}
+
+
+def benchmark_read(rows: int, seed: int) -> Dict[str, float]:
+    data = _make_table(rows, 8, seed)
+    rng = numpy.random.default_rng(seed)
+    for idx in range(4):
+        data[f"ratio_{idx}"] = rng.random(rows)
+    schema = {
+        "date": "str",
+        "key": "str",
+        **{col: "int" for col in data.columns if col.startswith("total_")},
+        **{col: "float" for col in data.columns if col.startswith("ratio_")},
+    }
+
+    with TemporaryDirectory() as workdir:
+        path = Path(workdir) / "data.csv"
+        export_csv(data, path, schema=schema)
+        converters = column_converters(schema)
+        time_reference, expected = _timeit(read_file, path, converters=converters)
+        time_vectorized, result = _timeit(read_table, path, schema=schema)
+    assert_frame_equal(expected, result)
+
+    return {"reference": time_reference, "vectorized": time_vectorized}
+
+
+BENCHMARKS = {
+    "combine": benchmark_combine,
+    "export": benchmark_export,
+    "grouped": benchmark_grouped,
+    "pivot": benchmark_pivot,
+    "read": benchmark_read,
+}
+
+
+if __name__ == "__main__":
+
+    # Process command-line arguments
+    argparser = ArgumentParser()
+    argparser.add_argument("benchmark", type=str, choices=list(BENCHMARKS.keys()))
+    argparser.add_argument("--rows", type=int, default=2_000_000)
+    argparser.add_argument("--seed", type=int, default=0)
+    args = argparser.parse_args()
+
+    timings = BENCHMARKS[args.benchmark](args.rows, args.seed)
+    for name, seconds in timings.items():
+        print(f"{args.benchmark} [{name}]: {seconds:.2f}s")
+    print(f"{args.benchmark} speedup: {timings['reference'] / timings['vectorized']:.1f}x")
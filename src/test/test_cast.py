@@ -17,7 +17,14 @@ from unittest import main
 
 import numpy
 import pandas
-from lib.cast import safe_int_cast
+from lib.cast import (
+    safe_float_cast,
+    safe_float_cast_series,
+    safe_int_cast,
+    safe_int_cast_series,
+    safe_str_cast,
+    safe_str_cast_series,
+)
 
 from .profiled_test_case import ProfiledTestCase
 
@@ -52,6 +59,51 @@ class TestCastFunctions(ProfiledTestCase):
             result = safe_int_cast(value)
             self.assertEqual(result, expected, f"[{value}] Expected: {expected}. Found: {result}")
 
+    def test_cast_series_same_as_scalar(self):
+        test_data = [
+            *TEST_DATA_NULL.keys(),
+            *["1", "1.5", "-1.0", "1,000", "−1", "1e3", "inf", "nan", " 2 ", "1_0"],
+            *[1, 1.5, -2.7, True, numpy.float64(3.5), float("inf"), 2 ** 70],
+        ]
+        series = pandas.Series(test_data, dtype=object)
+
+        casts = [
+            (safe_float_cast, safe_float_cast_series),
+            (safe_int_cast, safe_int_cast_series),
+            (safe_str_cast, safe_str_cast_series),
+        ]
+        for scalar_func, series_func in casts:
+            result = series_func(series)
+            for value, cast_value in zip(test_data, result):
+                expected = scalar_func(value)
+                if expected is None or expected != expected:
+                    self.assertTrue(pandas.isna(cast_value), f"[{value}] Found: {cast_value}")
+                else:
+                    self.assertEqual(cast_value, expected, f"[{value}] Found: {cast_value}")
+
+    def test_cast_series_same_as_scalar_random(self):
+        rng = numpy.random.default_rng(0)
+        tokens = ["", " ", ",", "−", "-", "+", ".", "e", "1", "2", "0", "9", "a", "_", "inf", "nan"]
+        others = [None, numpy.nan, 0, -7, 1.25, float("inf"), 2 ** 63, numpy.float64(-0.5)]
+        test_data = ["".join(rng.choice(tokens, size=rng.integers(1, 6))) for _ in range(2000)]
+        test_data += [others[idx] for idx in rng.integers(len(others), size=200)]
+
+        casts = [
+            (safe_float_cast, safe_float_cast_series),
+            (safe_int_cast, safe_int_cast_series),
+            (safe_str_cast, safe_str_cast_series),
+        ]
+        for chunk in numpy.array_split(rng.permutation(numpy.array(test_data, dtype=object)), 20):
+            series = pandas.Series(chunk, dtype=object)
+            for scalar_func, series_func in casts:
+                result = series_func(series)
+                for value, cast_value in zip(chunk, result):
+                    expected = scalar_func(value)
+                    if expected is None or expected != expected:
+                        self.assertTrue(pandas.isna(cast_value), f"[{value}] Found: {cast_value}")
+                    else:
+                        self.assertEqual(cast_value, expected, f"[{value}] Found: {cast_value}")
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -12,17 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import re
 import sys
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import main
 
 import numpy
-from pandas import DataFrame
-from lib.io import export_csv, read_file
+from pandas import DataFrame, Int64Dtype, Series
+from pandas.testing import assert_frame_equal
+from unidecode import unidecode
+from lib.cast import column_converters
+from lib.constants import SRC
+from lib.io import export_csv, export_parquet, fuzzy_text, fuzzy_text_series, read_file, read_lines
+from lib.io import read_table
 
 from .profiled_test_case import ProfiledTestCase
 
 
+def _reference_fuzzy_text(text: str, remove_regex: str = r"[^a-z\s]", remove_spaces: bool = True):
+    text = unidecode(str(text)).lower()
+    for token in ("y", "and", "of"):
+        text = re.sub(f" {token} ", " ", text)
+    if remove_regex:
+        text = re.sub(remove_regex, "", text)
+    for word in ("county", "region", "borough", "province", "department", "district"):
+        text = re.sub(f"^{word} ", "", text)
+        text = re.sub(f" {word}$", "", text)
+    text = re.sub(r"\s+", "" if remove_spaces else " ", text)
+    return text.strip()
+
+
 class TestIOFunctions(ProfiledTestCase):
     def _test_reimport_csv_helper(self, data: numpy.ndarray, test_case: str):
         tmpfile = Path(f"{__file__}.csv")
@@ -57,6 +77,110 @@ class TestIOFunctions(ProfiledTestCase):
         large_value_matrix = numpy.copy(random_matrix) * 1e10
         self._test_reimport_csv_helper(large_value_matrix, "large values")
 
+    def test_reimport_parquet(self):
+        schema = {"key": "str", "total_value": Int64Dtype(), "ratio": "float"}
+        data1 = DataFrame.from_records(
+            [
+                {"key": "A", "total_value": "1,000", "ratio": 0.5},
+                {"key": "", "total_value": 1e10, "ratio": None},
+                {"key": None, "total_value": None, "ratio": "x"},
+            ]
+        )
+
+        tmpfile = Path(f"{__file__}.parquet")
+        export_parquet(data1, tmpfile, schema=schema)
+        data2 = read_table(tmpfile, schema=schema)
+        tmpfile.unlink()
+
+        # Types are embedded in the file, and the values are cast prior to export
+        self.assertEqual(Int64Dtype(), data2["total_value"].dtype)
+        self.assertEqual(["A", "", ""], data2["key"].tolist())
+        self.assertEqual([1000, 10000000000], data2["total_value"].dropna().tolist())
+        self.assertEqual([0.5], data2["ratio"].dropna().tolist())
+
+        # The CSV output is the same as exporting the original data
+        self.assertEqual(
+            export_csv(data1.copy(), schema=schema), export_csv(data2.copy(), schema=schema)
+        )
+
+    def test_read_table_same_as_converters(self):
+        rng = numpy.random.default_rng(0)
+        tokens = ["", "1", "-2", "1,000", "−3", "1.5", "N/A", "NA", "nan", "x", " 4 ", "1e3", "inf"]
+        tokens += [str(2 ** 70), "-0.0", "TRUE"]
+        with TemporaryDirectory() as workdir:
+            tmpfile = Path(workdir) / "data.csv"
+            for _ in range(100):
+                schema = {col: rng.choice(["str", "int", "float"]) for col in ("a", "b", "c", "d")}
+                schema = {col: dtype for col, dtype in schema.items() if rng.random() < 0.8}
+                values = rng.choice(tokens, size=(rng.integers(6), 4))
+                lines = ["a,b,c,d"] + [",".join(f'"{value}"' for value in row) for row in values]
+                tmpfile.write_text("\n".join(lines) + "\n")
+
+                expected = read_file(tmpfile, converters=column_converters(schema))
+                result = read_table(tmpfile, schema=schema)
+                assert_frame_equal(expected, result)
+
+    def test_export_csv_format(self):
+        schema = {"key": "str", "total_value": "int", "ratio": "float"}
+        records = [
+            {"key": "A", "total_value": "1,000", "ratio": 0.2761545},
+            {"key": 1.5, "total_value": 2 ** 70, "ratio": 1 / 3},
+            {"key": None, "total_value": "−1.9", "ratio": "1e20"},
+            {"key": "", "total_value": True, "ratio": numpy.nan},
+        ]
+
+        # Values are formatted the same as `str(round(val, 6))` and `"%d" % val` would
+        expected_lines = [
+            "key,total_value,ratio",
+            "A,1000,0.276155",
+            f"1.5,{2 ** 70},0.333333",
+            ",-1,1e+20",
+            ",1,",
+        ]
+        result = export_csv(DataFrame.from_records(records), schema=schema)
+        self.assertEqual(expected_lines, result.splitlines())
+
+    def test_export_csv_special_strings(self):
+        values = ["a,b", 'say "hi"', "line\nbreak", "crlf\r\n", "ñandú", "东京", " ", ""]
+        data = DataFrame({"key": values, "value": range(len(values))})
+
+        # Strings are quoted the same as `to_csv()`, and read back as they were
+        result = export_csv(data.copy(), schema={"key": "str", "value": "int"})
+        self.assertEqual(data.to_csv(index=False), result)
+        with TemporaryDirectory() as workdir:
+            tmpfile = Path(workdir) / "data.csv"
+            export_csv(data.copy(), tmpfile, schema={"key": "str", "value": "int"})
+            self.assertListEqual(values, read_table(tmpfile, schema={"key": "str"})["key"].tolist())
+
+    def test_fuzzy_text(self):
+        # All the strings found in the metadata table, plus some which exercise the token order
+        strings = set(
+            cell
+            for line in read_lines(SRC / "data" / "metadata.csv", skip_empty=True)
+            for cell in line.strip().split(",")
+        )
+        strings |= {
+            "a y y b",
+            "x and y z",
+            "county region x",
+            "region county",
+            "The District of Columbia",
+            "Provincia de Lima",
+            "Región Metropolitana",
+            "  Lower   Saxony county\n",
+        }
+
+        options = [{}, {"remove_regex": r"[^0-9a-z\s_]", "remove_spaces": False}]
+        for opts in options:
+            for text in strings:
+                self.assertEqual(_reference_fuzzy_text(text, **opts), fuzzy_text(text, **opts))
+
+            # Repeated calls go through the memoized path, and must return the same output
+            values = Series(list(strings) * 2 + [None, numpy.nan, 1, 1.0])
+            expected = [_reference_fuzzy_text(value, **opts) for value in values]
+            self.assertListEqual(expected, fuzzy_text_series(values, **opts).tolist())
+            self.assertListEqual(expected[:-2], fuzzy_text_series(values[:-2], **opts).tolist())
+
 
 if __name__ == "__main__":
     sys.exit(main())
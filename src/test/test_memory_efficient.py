@@ -27,6 +27,7 @@ from lib.io import read_lines, read_table, export_csv
 from lib.memory_efficient import (
     get_table_columns,
     table_breakout,
+    table_combine,
     table_cross_product,
     table_join,
     table_group_tail,
@@ -37,7 +38,7 @@ from lib.memory_efficient import (
 )
 from lib.memory_efficient import table_merge as table_merge_mem
 from lib.pipeline_tools import get_schema
-from lib.utils import agg_last_not_null, pbar
+from lib.utils import agg_last_not_null, combine_tables, drop_na_records, pbar
 from lib.utils import table_merge as table_merge_pandas
 from .profiled_test_case import ProfiledTestCase
 
@@ -415,6 +416,91 @@ class TestMemoryEfficient(ProfiledTestCase):
                 for line1, line2 in zip(read_lines(output_file_1), read_lines(output_file_2)):
                     self.assertEqual(line1.strip(), line2.strip())
 
+    def test_table_combine(self):
+        test_data = [
+            DataFrame.from_records(
+                [
+                    {"date": "2020-01-02", "key": "A", "col1": 1, "col2": None},
+                    {"date": "2020-01-01", "key": "A", "col1": 2, "col2": None},
+                    {"date": "2020-01-01", "key": "B", "col1": None, "col2": None},
+                    {"date": None, "key": "C", "col1": 3, "col2": 3},
+                ]
+            ),
+            DataFrame.from_records(
+                [
+                    {"date": "2020-01-01", "key": "A", "col2": 4},
+                    {"date": "2020-01-02", "key": "A", "col2": None},
+                    {"date": "2020-01-01", "key": "A", "col2": 5},
+                ]
+            ),
+            DataFrame.from_records(
+                [
+                    {"date": "2020-01-03", "key": "B", "col1": 6, "col2": 6},
+                    {"date": "2020-01-02", "key": "A", "col1": 7, "col2": None},
+                ]
+            ),
+        ]
+        schema = {"date": "str", "key": "str", "col1": "int", "col2": "int"}
+
+        with TemporaryDirectory() as workdir:
+            workdir = Path(workdir)
+            tables = []
+            for idx, table in enumerate(test_data):
+                input_file = workdir / f"in.{idx}.csv"
+                export_csv(table.copy(), input_file, schema=schema)
+                table_sort(input_file, input_file, ["date", "key"])
+                tables.append(input_file)
+
+            output_file_1 = workdir / "out.csv"
+            table_combine(tables, output_file_1, ["date", "key"], list(schema.keys()), schema)
+
+            output_file_2 = workdir / "pandas.csv"
+            test_data = [read_table(table, schema=schema) for table in tables]
+            expected = combine_tables(test_data, ["date", "key"])
+            expected = drop_na_records(expected, ["date", "key"]).sort_values(["date", "key"])
+            export_csv(expected, output_file_2, schema=schema)
+
+            self.assertEqual(list(read_lines(output_file_1)), list(read_lines(output_file_2)))
+
+    def test_table_combine_empty_strings(self):
+        test_data = [
+            DataFrame.from_records(
+                [
+                    {"date": "2020-01-01", "key": "A", "name": "x", "value": 1},
+                    {"date": "2020-01-01", "key": "B", "name": "y", "value": 2},
+                    {"date": "2020-01-01", "key": "C", "name": None, "value": None},
+                ]
+            ),
+            DataFrame.from_records(
+                [
+                    {"date": "2020-01-01", "key": "A", "name": "", "value": None},
+                    {"date": "2020-01-01", "key": "B", "name": None, "value": 3},
+                ]
+            ),
+            DataFrame.from_records([{"date": "2020-01-01", "key": "C", "value": 4}]),
+        ]
+        schema = {"date": "str", "key": "str", "name": "str", "value": "int"}
+
+        with TemporaryDirectory() as workdir:
+            workdir = Path(workdir)
+            tables = []
+            for idx, table in enumerate(test_data):
+                input_file = workdir / f"in.{idx}.csv"
+                export_csv(table, input_file, schema=schema)
+                tables.append(input_file)
+
+            output_file = workdir / "out.csv"
+            table_combine(tables, output_file, ["date", "key"], list(schema.keys()), schema)
+            expected = combine_tables(
+                [read_table(table, schema=schema) for table in tables], ["date", "key"]
+            )
+
+            # Empty and null strings override previous values, unless the column is missing
+            result = read_table(output_file, schema=schema)
+            self.assertListEqual(["", "", ""], result["name"].tolist())
+            self.assertListEqual([1, 3, 4], result["value"].tolist())
+            self.assertEqual(export_csv(expected, schema=schema), export_csv(result, schema=schema))
+
 
 if __name__ == "__main__":
     sys.exit(main())
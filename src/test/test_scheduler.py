@@ -0,0 +1,77 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import main
+
+from lib.scheduler import TaskScheduler, predict_schedule, read_task_stats, write_task_stats
+
+from .profiled_test_case import ProfiledTestCase
+
+
+class TestScheduler(ProfiledTestCase):
+    def test_task_stats(self):
+        with TemporaryDirectory() as workdir:
+            stats_path = Path(workdir) / "stats.json"
+            self.assertDictEqual({}, read_task_stats(stats_path))
+
+            write_task_stats(stats_path, {"a": {"duration": 1}, "b": {"duration": 2}})
+            write_task_stats(stats_path, {"b": {"duration": 3}})
+            expected = {"a": {"duration": 1}, "b": {"duration": 3}}
+            self.assertDictEqual(expected, read_task_stats(stats_path))
+
+    def test_task_scheduler_longest_first(self):
+        order = []
+        tasks = {"a": 1, "b": 3, "c": 2, "d": 5}
+        with ThreadPool(1) as pool:
+            scheduler = TaskScheduler(pool, 1)
+
+            # Keep the only worker busy until all the tasks have been submitted
+            worker_busy = Event()
+            scheduler.submit("wait", worker_busy.wait)
+            for task_id, duration in tasks.items():
+                scheduler.submit(task_id, order.append, (task_id,), duration=duration)
+            worker_busy.set()
+
+            for task_id in tasks:
+                scheduler.result(task_id)
+
+        self.assertListEqual(["d", "b", "c", "a"], order)
+
+    def test_predict_schedule(self):
+        tasks = {"a": {"duration": 1}, "b": {"duration": 4}, "c": {"duration": 2}, "d": {}}
+        schedule = predict_schedule(tasks, 2)
+        self.assertListEqual(["d", "b", "c", "a"], [record["task"] for record in schedule])
+        self.assertEqual(None, schedule[0]["end"])
+        self.assertEqual(4, max(record["end"] or 0 for record in schedule))
+
+    def test_predict_schedule_memory_budget(self):
+        tasks = {
+            "a": {"duration": 3, "peak_memory": 8},
+            "b": {"duration": 2, "peak_memory": 8},
+            "c": {"duration": 1, "peak_memory": 1},
+        }
+
+        # Only one of the large tasks fits in the memory budget at a time
+        schedule = predict_schedule(tasks, 2, memory_budget=10)
+        self.assertListEqual(["a", "c", "b"], [record["task"] for record in schedule])
+        self.assertListEqual([0, 0, 3], [record["start"] for record in schedule])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
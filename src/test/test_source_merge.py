@@ -12,11 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gc
+import sqlite3
 import sys
+from contextlib import closing
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import main
 
+import numpy
 from pandas import DataFrame
+from lib.concurrent import process_pool
 from lib.data_source import DataSource
+from lib.key_cache import MergeKeyCache, merge_signatures
+from lib.metadata_index import _INDEX_CACHE, MetadataIndex
 from .profiled_test_case import ProfiledTestCase
 
 # Synthetic data used for testing
@@ -165,6 +174,34 @@ TEST_AUX_DATA = DataFrame.from_records(
 TEST_METADATA_KEYS = set(TEST_AUX_DATA["key"].values)
 
 
+class _TestGroupedMergeDataSource(DataSource):
+    def parse(self, sources, aux, **parse_opts):
+        records = [
+            {"country_code": "AB", "subregion1_code": "1"},
+            {"country_code": "AD", "subregion1_code": None},
+            {"country_code": "AE", "subregion1_code": "1", "subregion2_code": "5"},
+            {"country_code": "AE", "subregion1_code": "1", "subregion2_code": None},
+            {"country_code": "XX", "subregion1_code": "1"},
+        ]
+        data = DataFrame.from_records(records * 3)
+        data["date"] = "2020-01-01"
+        data["total_confirmed"] = range(len(data))
+        return data
+
+
+class _TestParallelMergeDataSource(_TestGroupedMergeDataSource):
+    parallel_records = 0
+
+    def merge_parallel(self, data, aux, **kwargs):
+        self.parallel_records += len(data)
+        return super().merge_parallel(data, aux, **kwargs)
+
+
+def _run_parse_in_worker(data_source, aux):
+    data = data_source.run_parse({}, aux)
+    return data, data_source.parallel_records
+
+
 class TestSourceMerge(ProfiledTestCase):
     def test_merge_no_match(self):
         aux = TEST_AUX_DATA.copy()
@@ -237,6 +274,171 @@ class TestSourceMerge(ProfiledTestCase):
         key = data_source.merge(record, {"metadata": aux}, keys=TEST_METADATA_KEYS)
         self.assertEqual(key, "AD_1_1")
 
+    def test_metadata_index(self):
+        aux = TEST_AUX_DATA.copy()
+        index = MetadataIndex.for_table(aux)
+        self.assertIs(index, MetadataIndex.for_table(aux))
+        self.assertIsNot(index, MetadataIndex.for_table(aux.copy()))
+
+        keys = lambda rows: sorted(index.key(row) for row in rows)
+        self.assertListEqual(["AD_1_1", "AE_1_1"], keys(index.rows("subregion2_code", "1")))
+        self.assertListEqual([], keys(index.rows("subregion2_code", None)))
+        self.assertListEqual(["AD", "AD_1", "AD_1_1"], keys(index.filter({"country_code": "AD"})))
+        self.assertListEqual(
+            ["AD"], keys(index.filter({"country_code": "AD", "subregion1_code": None}))
+        )
+        self.assertListEqual(
+            ["AE_1_2"], keys(index.filter({"country_code": "AE", "subregion2_code": "2"}))
+        )
+
+    def test_metadata_index_eviction(self):
+        aux = TEST_AUX_DATA.copy()
+        table_id = id(aux)
+        index = MetadataIndex.for_table(aux)
+        self.assertIn(table_id, _INDEX_CACHE)
+
+        # The cache entry is removed once the table is gone, even if the index is still in use
+        del aux
+        gc.collect()
+        self.assertNotIn(table_id, _INDEX_CACHE)
+        self.assertIsNone(index.metadata)
+
+    def test_metadata_index_regex(self):
+        aux = TEST_AUX_DATA.copy()
+        aux.loc[aux["key"] == "AC_1", "match_string"] = "North( region)?"
+        aux.loc[aux["key"] == "AC_2", "match_string"] = "South"
+        aux.loc[aux["key"] == "AE_1", "match_string"] = "north"
+        index = MetadataIndex.for_table(aux)
+
+        keys = lambda rows: sorted(index.key(row) for row in rows)
+        all_rows = index.filter({})
+        self.assertListEqual(["AC_1", "AE_1"], keys(index.regex_rows("NORTH region", all_rows)))
+        self.assertListEqual(
+            ["AC_1"], keys(index.regex_rows("north", index.filter({"country_code": "AC"})))
+        )
+        self.assertListEqual([], keys(index.regex_rows("West", all_rows)))
+        self.assertListEqual([], keys(index.regex_rows("The South", all_rows)))
+
+    def test_merge_table(self):
+        aux = TEST_AUX_DATA.copy()
+        data_source = DataSource()
+        data = DataFrame.from_records(
+            [
+                {"country_code": "AA", "subregion1_code": None},
+                {"country_code": "AB", "subregion1_code": None},
+                {"country_code": "AB", "subregion1_code": "1"},
+                {"country_code": "AD", "subregion1_code": "1"},
+                {"country_code": "AD", "subregion1_code": "", "subregion2_code": "1"},
+                {"country_code": "AE", "subregion1_code": "1", "subregion2_code": "5"},
+                {"country_code": "AE", "subregion1_code": "2"},
+                {"key": "AC_3"},
+                {"key": "AC_9"},
+                {"country_code": "__"},
+            ]
+        )
+        expected = [
+            data_source.merge(record, {"metadata": aux}, keys=TEST_METADATA_KEYS)
+            for _, record in data.iterrows()
+        ]
+        self.assertListEqual(["AA", "AB", "AB_1"], expected[:3])
+        self.assertListEqual(expected, data_source.merge_table(data, {"metadata": aux}).tolist())
+
+        # Dates already converted to ISO format are not parsed again, and give the same keys
+        data["date"] = "2020-01-01"
+        keys = data_source.merge_table(data, {"metadata": aux}, iso_dates=True)
+        self.assertListEqual(expected, keys.tolist())
+
+    def test_merge_table_key_cache(self):
+        aux = TEST_AUX_DATA.copy()
+        data_source = DataSource()
+        data = DataFrame.from_records(
+            [
+                {"country_code": "AB", "subregion1_code": "1"},
+                {"country_code": "AD", "subregion1_code": "1"},
+                {"country_code": "AE", "subregion1_code": "1", "subregion2_code": "5"},
+            ]
+        )
+        expected = ["AB_1", "AD_1", "AE_1_5"]
+
+        with TemporaryDirectory() as workdir:
+            cache_path = Path(workdir) / "cache.sqlite"
+            key_cache = MergeKeyCache(cache_path)
+            self.assertFalse(cache_path.exists())
+            for hits, misses in ((0, 3), (3, 0)):
+                key_cache.hits = key_cache.misses = 0
+                keys = data_source.merge_table(data, {"metadata": aux}, key_cache=key_cache)
+                self.assertListEqual(expected, keys.tolist())
+                self.assertEqual((hits, misses), (key_cache.hits, key_cache.misses))
+
+            # Changes to the metadata table invalidate the cache
+            aux = aux[aux["key"] != "AB_1"]
+            key_cache.hits = key_cache.misses = 0
+            keys = data_source.merge_table(data, {"metadata": aux}, key_cache=key_cache)
+            self.assertListEqual([None, "AD_1", "AE_1_5"], keys.tolist())
+            self.assertEqual((0, 3), (key_cache.hits, key_cache.misses))
+
+            # Only the keys resolved using the current metadata table are kept
+            with closing(sqlite3.connect(str(cache_path))) as conn:
+                hashes = conn.execute("SELECT DISTINCT metadata_hash FROM merge_keys").fetchall()
+            self.assertListEqual([(MetadataIndex.for_table(aux).content_hash,)], hashes)
+
+    def test_merge_parallel(self):
+        aux = {"metadata": TEST_AUX_DATA.copy()}
+        data_source = DataSource()
+        records = [
+            {"country_code": "AB", "subregion1_code": "1"},
+            {"country_code": "AD", "subregion1_code": "1"},
+            {"country_code": "AE", "subregion1_code": "1", "subregion2_code": "5"},
+            {"country_code": "XX"},
+        ]
+        data = DataFrame.from_records(records * 8)
+        index = MetadataIndex.for_table(aux["metadata"])
+        expected = data.apply(lambda x: data_source.merge(x, aux, index.keys), axis=1)
+
+        keys = data_source.merge_parallel(data, aux, process_count=2, chunk_size=5)
+        self.assertListEqual(expected.tolist(), keys)
+
+    def test_merge_parallel_in_worker(self):
+        aux = {
+            "metadata": TEST_AUX_DATA.copy(),
+            "localities": DataFrame({"key": ["AA"], "locality": ["AA_L"]}),
+        }
+        expected = _TestParallelMergeDataSource({"merge": {"serial": True}}).run_parse({}, aux)
+
+        # Records which are not resolved by the metadata index are merged in parallel chunks, using
+        # threads when the data source is run inside one of the workers of a pool
+        config = {"merge": {"serial": True, "parallel_threshold": 2}}
+        data_source = _TestParallelMergeDataSource(config)
+        with process_pool(1) as pool:
+            data, parallel_records = pool.apply(_run_parse_in_worker, (data_source, aux))
+        self.assertEqual(3, parallel_records)
+        self.assertListEqual(
+            expected.sort_values("total_confirmed")["key"].tolist(),
+            data.sort_values("total_confirmed")["key"].tolist(),
+        )
+
+    def test_merge_grouped(self):
+        aux = {
+            "metadata": TEST_AUX_DATA.copy(),
+            "localities": DataFrame({"key": ["AA"], "locality": ["AA_L"]}),
+        }
+        data_source = _TestGroupedMergeDataSource({"merge": {"serial": True}})
+        expected = data_source.run_parse({}, aux)
+        data_source = _TestGroupedMergeDataSource()
+        data = data_source.run_parse({}, aux)
+        self.assertEqual(12, len(data))
+        self.assertListEqual(
+            expected.sort_values("total_confirmed")["key"].tolist(),
+            data.sort_values("total_confirmed")["key"].tolist(),
+        )
+
+    def test_merge_signatures(self):
+        data = DataFrame({"match_string": ["1", None, "None", numpy.nan], "date": "2020-01-01"})
+        signatures = merge_signatures(data)
+        self.assertEqual(4, len(signatures.unique()))
+        self.assertEqual(signatures.iloc[0], merge_signatures(data.iloc[:1]).iloc[0])
+        self.assertIsNone(merge_signatures(DataFrame({"match_string": ["1", 1]})))
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -14,13 +14,15 @@
 
 import sys
 import traceback
+import tracemalloc
 from unittest import main
 from pathlib import Path
 from functools import partial
 from tempfile import TemporaryDirectory
 
 import requests
-from lib.concurrent import process_map, thread_map
+from pandas import DataFrame
+from lib.concurrent import get_shared_object, process_map, shared_objects, thread_map
 from lib.constants import CACHE_URL
 from lib.data_source import DataSource
 from lib.pipeline import DataPipeline
@@ -105,7 +107,84 @@ def _test_data_pipeline(pipeline_name: str, random_seed: int = 0):
     list(_)
 
 
+def _test_shared_object(name: str, idx: int):
+    return get_shared_object(name)[idx]
+
+
+class _TestStagesDataSource(DataSource):
+    def _read(self, file_paths, **read_opts):
+        return {name: DataFrame({"key": ["AA", "AB", "ZZ"]}) for name in file_paths}
+
+    def parse_dataframes(self, dataframes, aux, **parse_opts):
+        data = dataframes[0]
+        data["date"] = "2020-01-01"
+        data["total_confirmed"] = [1, 2, 3]
+        return data
+
+
+class _TestDatesDataSource(DataSource):
+    def parse_dataframes(self, dataframes, aux, **parse_opts):
+        data = DataFrame({"date": ["2020-01-01", "2020-1-2", "bad", None, "2020-02-30"]})
+        data["key"] = "AA"
+        data["total_confirmed"] = range(len(data))
+        return data
+
+
 class TestSourceRun(ProfiledTestCase):
+    def test_shared_objects(self):
+        values = list(range(16))
+        map_func = partial(_test_shared_object, "values")
+        with shared_objects(values=values):
+            self.assertEqual(values, list(process_map(map_func, values, max_workers=2)))
+
+    def test_stage_metrics(self):
+        data_source = _TestStagesDataSource()
+        data_source.log_error = _log_nothing
+        aux = {
+            "metadata": DataFrame({"key": ["AA", "AB"]}),
+            "localities": DataFrame({"key": ["AA"], "locality": ["AA_L"]}),
+        }
+
+        tracemalloc.start()
+        try:
+            data = data_source.run_parse({0: "data.csv"}, aux)
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(3, len(data))
+
+        stages = {record["stage"]: record for record in data_source.stage_metrics}
+        self.assertListEqual(
+            ["read", "parse_dataframes", "parse", "merge", "derive_localities"],
+            list(stages.keys())[:5],
+        )
+        self.assertEqual(3, stages["read"]["rows_out"])
+        self.assertEqual(3, stages["merge"]["rows_in"])
+        self.assertEqual(2, stages["merge"]["rows_out"])
+        self.assertEqual(3, stages["derive_localities"]["rows_out"])
+        for record in stages.values():
+            self.assertGreaterEqual(record["wall_time"], 0)
+            self.assertGreaterEqual(record["cpu_time"], 0)
+            self.assertGreater(record["peak_memory"], 0)
+
+        # The outer stage includes the peak memory of the nested stages
+        self.assertGreaterEqual(stages["parse"]["peak_memory"], stages["read"]["peak_memory"])
+
+    def test_normalize_dates(self):
+        errors = []
+        data_source = _TestDatesDataSource()
+        data_source.log_error = lambda msg, **kwargs: errors.append((msg, kwargs))
+        aux = {
+            "metadata": DataFrame({"key": ["AA"]}),
+            "localities": DataFrame({"key": ["AA"], "locality": ["AA_L"]}),
+        }
+
+        # Dates are converted to ISO format, and invalid dates are logged once for all records
+        data = data_source.run_parse({}, aux)
+        data = data[data["key"] == "AA"]
+        self.assertListEqual(["2020-01-01", "2020-01-02"], sorted(data["date"].tolist()))
+        self.assertEqual(1, len(errors))
+        self.assertEqual(3, errors[0][1]["invalid_records"])
+
     def test_dry_run_pipeline(self):
         """
         This test loads the real configuration for all sources in a pipeline, and runs them against
@@ -14,17 +14,26 @@
 
 import sys
 from io import StringIO
+from typing import List
 from unittest import main
 
 import numpy
-from pandas import DataFrame, isnull
+from pandas import DataFrame, Index, concat, isnull
+from pandas.testing import assert_frame_equal
 from lib.cast import age_group
 from lib.constants import SRC
 from lib.io import read_file
 from lib.utils import (
+    agg_last_not_null,
     combine_tables,
     derive_localities,
+    grouped_cumsum,
+    grouped_diff,
+    grouped_transform,
     infer_new_and_total,
+    pivot_table,
+    pivot_table_date_columns,
+    SegmentedTimeSeries,
     stack_table,
     backfill_cumulative_fields_inplace,
 )
@@ -136,6 +145,40 @@ BACKFILL_TEST_DATA = DataFrame.from_records(
 )
 
 
+def _reference_backfill_cumulative_fields_inplace(data: DataFrame, columns: List[str]) -> None:
+    """ Backfill of each key and column one at a time, used as reference for the vectorized one """
+    for name, group_data in data.groupby("key"):
+        group_data = group_data.sort_values(by="date", ascending=False)
+        for column in columns:
+            if isnull(group_data.loc[group_data.last_valid_index(), column]):
+                group_data.loc[group_data.last_valid_index(), column] = 0
+            data.loc[data["key"] == name, column] = group_data[column].bfill()
+
+
+def _reference_stack_table(
+    data: DataFrame, index_columns: List[str], value_columns: List[str], stack_columns: List[str]
+) -> DataFrame:
+    """ Pivot of each stack and value column one at a time, used as reference for `stack_table` """
+    output = data.drop(columns=stack_columns).groupby(index_columns).sum()
+    used_columns = index_columns + value_columns + stack_columns
+    stash_columns = [col for col in data.columns if col not in used_columns]
+    stash_output = data[stash_columns].copy()
+    data = data.drop(columns=stash_columns)
+    for col_stack in stack_columns:
+        col_stack_values = data[col_stack].dropna().unique()
+        for col_variable in value_columns:
+            df = data[index_columns + [col_variable, col_stack]].copy()
+            df = df.pivot_table(
+                values=col_variable, index=index_columns, columns=[col_stack], aggfunc="sum"
+            )
+            column_mapping = {suffix: f"{col_variable}_{suffix}" for suffix in col_stack_values}
+            df = df.rename(columns=column_mapping)
+            transfer_columns = list(column_mapping.values())
+            output[transfer_columns] = df[transfer_columns]
+    output[stash_columns] = stash_output
+    return output.reset_index()
+
+
 class TestTableUtils(ProfiledTestCase):
     def test_combine_all_none(self):
         data1 = COMBINE_TEST_DATA_1.copy()
@@ -193,6 +236,18 @@ class TestTableUtils(ProfiledTestCase):
         self.assertEqual(2, result.loc[0, "value_column_1"])
         self.assertEqual(1, result.loc[0, "value_column_2"])
 
+    def test_combine_same_as_last_not_null(self):
+        data1 = COMBINE_TEST_DATA_1.copy()
+        data2 = COMBINE_TEST_DATA_2.copy()
+        data2["key"] = ["A", "B", "A", "B"]
+        data2["value_column_3"] = [None, "x", None, "y"]
+        data2["value_column_4"] = ["", numpy.nan, "z", None]
+        grouped = concat([data1, data2]).groupby(["key"])
+        expected = grouped.aggregate(agg_last_not_null).reset_index()
+        for progress_label in (None, "test"):
+            result = combine_tables([data1, data2], ["key"], progress_label=progress_label)
+            self.assertEqual(expected.to_csv(index=False), result.to_csv(index=False))
+
     def test_stack_data(self):
         expected = DataFrame.from_records(
             [
@@ -211,6 +266,62 @@ class TestTableUtils(ProfiledTestCase):
 
         self.assertEqual(buffer1.getvalue(), buffer2.getvalue())
 
+    def test_stack_table_same_as_reference(self):
+        rng = numpy.random.default_rng(0)
+        buckets = {
+            "age": ["0-9", "10-19", "90-", None],
+            "sex": ["male", "female", "other", None],
+            "ethnicity": ["a", "b", None, None],
+        }
+        for index_columns in (["key"], ["date", "key"]):
+            for _ in range(5):
+                size = 300
+                data = DataFrame(
+                    {
+                        "key": numpy.array(["A", "B", "C"])[rng.integers(3, size=size)],
+                        "date": numpy.array(["2020-01-01", "2020-01-02"])[
+                            rng.integers(2, size=size)
+                        ],
+                        "new_confirmed": rng.integers(10, size=size),
+                        "new_deceased": rng.random(size),
+                        **{
+                            col: numpy.array(values, dtype=object)[rng.integers(4, size=size)]
+                            for col, values in buckets.items()
+                        },
+                    }
+                )
+                data.loc[rng.random(size) < 0.2, "new_deceased"] = numpy.nan
+                if index_columns == ["key"]:
+                    data = data.drop(columns=["date"])
+
+                value_columns = ["new_confirmed", "new_deceased"]
+                stack_columns = list(buckets.keys())
+                expected = _reference_stack_table(data, index_columns, value_columns, stack_columns)
+                result = stack_table(data, index_columns, value_columns, stack_columns)
+                assert_frame_equal(expected, result)
+
+    def test_pivot_table(self):
+        data = DataFrame(
+            {"A": [1, 2], "B": [3.5, None]}, index=Index(["2020-01-01", "2020-01-02"], name="date")
+        )
+        expected = DataFrame.from_records(
+            [
+                {"date": "2020-01-01", "key": "A", "value": 1.0},
+                {"date": "2020-01-02", "key": "A", "value": 2.0},
+                {"date": "2020-01-01", "key": "B", "value": 3.5},
+                {"date": "2020-01-02", "key": "B", "value": numpy.nan},
+            ]
+        )
+        assert_frame_equal(expected, pivot_table(data, pivot_name="key"))
+
+    def test_pivot_table_date_columns(self):
+        data = DataFrame({"2020-01-01": ["a", "c"], "2020-01-02": ["b", None]}, index=["X", "Y"])
+        expected = DataFrame(
+            {"date": ["2020-01-01", "2020-01-02"] * 2, "value": ["a", "b", "c", None]},
+            index=Index(["X", "X", "Y", "Y"], name="index"),
+        )
+        assert_frame_equal(expected, pivot_table_date_columns(data))
+
     def test_age_group(self):
         self.assertEqual("0-9", age_group(0, bin_count=10, age_cutoff=90))
         self.assertEqual("0-9", age_group(0.0, bin_count=10, age_cutoff=90))
@@ -303,6 +414,84 @@ class TestTableUtils(ProfiledTestCase):
             inferred_new_values.dropna().to_list(), expected_new_values.dropna().to_list()
         )
 
+    def test_grouped_diff_and_cumsum(self):
+        data = DataFrame(
+            {
+                "key": ["A", "B", "A", None, "B", "A"],
+                "date": [
+                    "2020-01-02",
+                    "2020-01-01",
+                    "2020-01-01",
+                    "2020-01-01",
+                    "2020-01-03",
+                    "2020-01-03",
+                ],
+                "total_float": [2.5, numpy.nan, 1.0, 7.0, 4.0, numpy.nan],
+                "total_int": [3, 1, 1, 2, 5, 9],
+                "total_null": numpy.nan,
+                "total_object": [2.5, numpy.nan, 1.0, 7.0, 4.0, numpy.nan],
+            }
+        )
+        data["total_object"] = data["total_object"].astype(object)
+        keys = ["key", "date"]
+
+        # The vectorized transforms are the same as applying the transform to each group
+        for func, transform, prefix in (
+            (grouped_diff, lambda x: x.ffill().diff(), ("new_", "total_")),
+            (grouped_cumsum, lambda x: x.fillna(0).cumsum(), ("total_", "new_")),
+        ):
+            expected = grouped_transform(data, keys, transform, prefix=prefix)
+            assert_frame_equal(expected, func(data, keys))
+
+        self.assertListEqual([1.5, 0.0], grouped_diff(data, keys)["new_float"].tolist()[1:3])
+
+    def test_segmented_time_series(self):
+        rng = numpy.random.default_rng(0)
+        data = DataFrame(
+            {
+                "key": numpy.array(["A", "B", "C", None], dtype=object)[rng.integers(4, size=200)],
+                "date": [f"2020-01-{idx % 28 + 1:02d}" for idx in range(200)],
+                "value_float": rng.random(200),
+                "value_int": rng.integers(100, size=200),
+            }
+        )
+        data.loc[rng.random(200) < 0.3, "value_float"] = numpy.nan
+        keys = ["key", "date"]
+        columns = ["value_float", "value_int"]
+        series = SegmentedTimeSeries(data, keys)
+
+        # Each transform is the same as transforming each group separately
+        keyed = series.data["key"].notna()
+        grouped = series.data.groupby("key")[columns]
+        for result, expected in (
+            (series.ffill(), grouped.ffill()),
+            (series.shift(periods=2), grouped.shift(2)),
+            (series.shift(periods=-1), grouped.shift(-1)),
+            (series.diff(), grouped.diff()),
+            (series.cumsum(), grouped.transform(lambda x: x.fillna(0).cumsum())),
+            (series.rolling_mean(window=3), grouped.transform(lambda x: x.rolling(3).mean())),
+            (
+                series.rolling_mean(window=5, min_periods=1),
+                grouped.transform(lambda x: x.rolling(5, min_periods=1).mean()),
+            ),
+        ):
+            assert_frame_equal(expected.loc[keyed], result.loc[keyed], check_dtype=False)
+            self.assertTrue(result.loc[~keyed].isnull().values.all())
+
+        # Sums restart at each segment, so they are exact even after segments with large totals
+        data["value_float"] = numpy.where(
+            data["key"] == "A", rng.random(len(data)) * 1e12, data["value_float"] / 3
+        )
+        data["value_int"] = numpy.where(data["key"] == "A", 10 ** 12, data["value_int"])
+        series = SegmentedTimeSeries(data, keys)
+        keyed = series.data["key"].notna()
+        expected = series.data.groupby("key")[columns].transform(lambda x: x.fillna(0).cumsum())
+        result = series.cumsum(columns)
+        for column in columns:
+            self.assertListEqual(
+                expected.loc[keyed, column].tolist(), result.loc[keyed, column].tolist()
+            )
+
     def test_derive_localities(self):
         localities = read_file(SRC / "data" / "localities.csv")
         test_data = LOCALITY_TEST_DATA.copy()
@@ -396,6 +585,30 @@ class TestTableUtils(ProfiledTestCase):
 
         self.assertTrue(test_data.equals(expected))
 
+    def test_backfill_cumulative_fields_inplace_same_as_reference(self):
+        rng = numpy.random.default_rng(0)
+        for _ in range(10):
+            size = 200
+            data = DataFrame(
+                {
+                    "key": numpy.array(["A", "B", "C", None], dtype=object)[
+                        rng.integers(4, size=size)
+                    ],
+                    "date": [f"2020-{idx // 28 + 1:02d}-{idx % 28 + 1:02d}" for idx in range(size)],
+                    "total_float": rng.random(size),
+                    "total_int": rng.integers(100, size=size),
+                    "total_null": numpy.nan,
+                }
+            )
+            data.loc[rng.random(size) < 0.5, "total_float"] = numpy.nan
+            data.index = rng.permutation(size) + 100
+            columns = ["total_float", "total_int", "total_null"]
+
+            expected = data.copy()
+            _reference_backfill_cumulative_fields_inplace(expected, columns)
+            backfill_cumulative_fields_inplace(data, columns)
+            assert_frame_equal(expected, data)
+
     # TODO: Add test for complex infer example (e.g. missing values)
     # TODO: Add test for stratify_age_sex_ethnicity
 
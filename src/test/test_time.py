@@ -15,7 +15,9 @@
 import sys
 from unittest import main
 
-from lib.time import date_range
+import numpy
+from pandas import Series
+from lib.time import date_range, datetime_isoformat, datetime_isoformat_series
 
 from .profiled_test_case import ProfiledTestCase
 
@@ -48,6 +50,25 @@ class TestTimeFunctions(ProfiledTestCase):
         # Test start == end
         self.assertListEqual(list(date_range(start, start)), [expected[0]])
 
+    def test_datetime_isoformat_series(self):
+        test_data = [
+            *["2020-01-01", "2020-1-2", "2020-02-30", "0001-01-01", " 2020-01-01", ""],
+            *["20200101", "20201301", "01/02/2020", "1/2/2020", "02-Jan-20", "2020-01-01 10:00:00"],
+            *[20200101, 20200101.0, True, None, numpy.nan],
+        ]
+        date_formats = [
+            "%Y-%m-%d",
+            "%Y%m%d",
+            "%d/%m/%Y",
+            "%m/%d/%Y",
+            "%d-%b-%y",
+            "%Y-%m-%d %H:%M:%S",
+        ]
+        for date_format in date_formats:
+            expected = [datetime_isoformat(value, date_format) for value in test_data]
+            result = datetime_isoformat_series(Series(test_data, dtype=object), date_format)
+            self.assertListEqual(expected, result.tolist(), date_format)
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -13,10 +13,23 @@
 # limitations under the License.
 
 import sys
+import tracemalloc
 from pathlib import Path
 from unittest import main
 from tempfile import TemporaryDirectory
 
+import numpy
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+from lib.constants import (
+    DATA_SOURCE_STATS_FILE_NAME,
+    MERGE_KEY_CACHE_FILE_NAME,
+    STAGE_REPORT_COLUMNS,
+)
+from lib.data_source import DataSource
+from lib.io import export_csv, read_file, read_lines
+from lib.pipeline import DataPipeline
+from lib.scheduler import read_task_stats
 from update import main as update_data
 from .profiled_test_case import ProfiledTestCase
 
@@ -29,8 +42,130 @@ class TestUpdate(ProfiledTestCase):
             update_data(output_folder, only=[quick_pipeline_name])
             self.assertSetEqual(
                 set(subfolder.name for subfolder in output_folder.iterdir()),
-                {"intermediate", "tables", "snapshot"},
+                {
+                    "intermediate",
+                    "tables",
+                    "snapshot",
+                    "reports",
+                    DATA_SOURCE_STATS_FILE_NAME,
+                    MERGE_KEY_CACHE_FILE_NAME,
+                },
             )
+            report = read_file(output_folder / "reports" / f"{quick_pipeline_name}.csv")
+            self.assertListEqual(list(STAGE_REPORT_COLUMNS), list(report.columns))
+            self.assertIn("merge", report["stage"].values)
+
+    def test_update_dry_run(self):
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            quick_pipeline_name = "index"  # Pick a pipeline that is quick to run
+            update_data(output_folder, only=[quick_pipeline_name], dry_run=True)
+            self.assertListEqual([], list((output_folder / "tables").iterdir()))
+            self.assertFalse((output_folder / DATA_SOURCE_STATS_FILE_NAME).exists())
+
+    def test_update_only_pipeline_streaming(self):
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            quick_pipeline_name = "index"  # Pick a pipeline that is quick to run
+            update_data(output_folder, only=[quick_pipeline_name])
+            expected = list(read_lines(output_folder / "tables" / f"{quick_pipeline_name}.csv"))
+            update_data(output_folder, only=[quick_pipeline_name], streaming=True)
+            result = list(read_lines(output_folder / "tables" / f"{quick_pipeline_name}.csv"))
+            self.assertListEqual(expected, result)
+
+    def test_update_only_pipeline_combine_threshold(self):
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            quick_pipeline_name = "index"  # Pick a pipeline that is quick to run
+            update_data(output_folder, only=[quick_pipeline_name], save_intermediate=False)
+            self.assertListEqual([], list((output_folder / "intermediate").iterdir()))
+            expected = list(read_lines(output_folder / "tables" / f"{quick_pipeline_name}.csv"))
+
+            # Spill each intermediate result to disk as soon as it is available
+            update_data(output_folder, only=[quick_pipeline_name], combine_threshold=0)
+            self.assertNotEqual([], list((output_folder / "intermediate").iterdir()))
+            result = list(read_lines(output_folder / "tables" / f"{quick_pipeline_name}.csv"))
+            self.assertListEqual(expected, result)
+
+    def test_combine_memory_bound(self):
+        schema = {"date": "str", "key": "str", **{f"total_{idx}": "float" for idx in range(4)}}
+        data_pipeline = DataPipeline("test", schema, {}, [])
+        dates = numpy.array([f"2020-01-{1 + idx % 28:02d}" for idx in range(10_000)], dtype=object)
+        keys = numpy.array([f"K{idx // 28:04d}" for idx in range(10_000)], dtype=object)
+        result_count = 50
+
+        # Results are created one at a time, the same as when they are read from the parse step
+        def intermediate_results():
+            rng = numpy.random.default_rng(0)
+            for _ in range(result_count):
+                values = {col: rng.random(len(keys)) for col in schema if col.startswith("total_")}
+                yield DataSource(), DataFrame({"date": dates, "key": keys, **values})
+
+        result_size = next(intermediate_results())[1].memory_usage().sum()
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            run_opts = {"verify_level": None, "save_intermediate": False}
+            expected = data_pipeline.run(
+                output_folder, intermediate_results=intermediate_results(), **run_opts
+            )
+
+            tracemalloc.start()
+            try:
+                result = data_pipeline.run(
+                    output_folder,
+                    combine_threshold=result_size,
+                    intermediate_results=intermediate_results(),
+                    **run_opts,
+                )
+                _, peak_memory = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        # Only a few results are held in memory at any given time
+        assert_frame_equal(expected, result)
+        self.assertLess(peak_memory, result_size * result_count / 2)
+
+    def test_update_multiple_pipelines(self):
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            quick_pipeline_name = "index"  # Pick a pipeline that is quick to run
+            update_data(output_folder, only=[quick_pipeline_name])
+            expected = list(read_lines(output_folder / "tables" / f"{quick_pipeline_name}.csv"))
+
+            # Run the same pipeline a few times in this process, and sharing the same pool of
+            # worker processes with fewer pipelines in flight than pipelines
+            for process_count in (1, 2):
+                data_pipelines = [DataPipeline.load(quick_pipeline_name) for _ in range(3)]
+                pipeline_results = DataPipeline.parse_all(
+                    data_pipelines,
+                    output_folder,
+                    process_count=process_count,
+                    pipelines_in_flight=2,
+                )
+                for data_pipeline, intermediate_results in pipeline_results:
+                    pipeline_output = data_pipeline.run(
+                        output_folder, intermediate_results=intermediate_results
+                    )
+                    result = export_csv(pipeline_output, schema=data_pipeline.schema)
+                    self.assertListEqual(expected, result.splitlines(keepends=True))
+
+    def test_update_trace_memory(self):
+        with TemporaryDirectory() as output_folder:
+            output_folder = Path(output_folder)
+            quick_pipeline_name = "index"  # Pick a pipeline that is quick to run
+            stats_path = output_folder / DATA_SOURCE_STATS_FILE_NAME
+
+            # Memory is not traced by default
+            update_data(output_folder, only=[quick_pipeline_name])
+            for stats in read_task_stats(stats_path).values():
+                self.assertGreaterEqual(stats["duration"], 0)
+                self.assertNotIn("peak_memory", stats)
+
+            # The peak memory is kept by later runs which do not trace memory
+            update_data(output_folder, only=[quick_pipeline_name], trace_memory=True)
+            update_data(output_folder, only=[quick_pipeline_name])
+            for stats in read_task_stats(stats_path).values():
+                self.assertGreater(stats["peak_memory"], 0)
 
     def test_update_bad_pipeline_name(self):
         with TemporaryDirectory() as output_folder:
@@ -20,7 +20,7 @@ from argparse import ArgumentParser
 from multiprocessing import cpu_count
 from typing import List
 
-from lib.constants import SRC
+from lib.constants import SRC, INTERMEDIATE_COMBINE_THRESHOLD_BYTES
 from lib.io import export_csv, display_progress
 from lib.pipeline import DataPipeline
 
@@ -32,6 +32,12 @@ def main(
     exclude: List[str] = None,
     process_count: int = cpu_count(),
     show_progress: bool = False,
+    streaming: bool = False,
+    save_intermediate: bool = True,
+    combine_threshold: int = INTERMEDIATE_COMBINE_THRESHOLD_BYTES,
+    memory_budget: int = None,
+    trace_memory: bool = False,
+    dry_run: bool = False,
 ) -> None:
     """
     Executes the data pipelines and places all outputs into `output_folder`. This is typically
@@ -48,6 +54,18 @@ def main(
         process_count: Maximum number of processes to use during the data pipeline execution.
         show_progress: Display progress for the execution of individual DataSources within this
             pipeline.
+        streaming: Combine the intermediate results of each pipeline from disk using a k-way merge
+            instead of in memory. Verification is skipped when this option is used.
+        save_intermediate: Save the intermediate results of each pipeline to disk, in the
+            background while they are combined. Ignored when `streaming` is set.
+        combine_threshold: Maximum size in bytes of the intermediate results of a pipeline held in
+            memory before they are combined and spilled to disk. Ignored when `streaming` is set.
+        memory_budget: Maximum memory in bytes used by the data sources running at the same time,
+            based on the stats recorded in previous runs.
+        trace_memory: Measure the peak memory of each data source, which slows down the data
+            sources. Used by `memory_budget` in subsequent runs.
+        dry_run: Print the order in which the data sources are predicted to run, without running
+            any of the pipelines.
     """
 
     assert not (
@@ -75,6 +93,7 @@ def main(
 
         # Run all the pipelines and place their outputs into the output folder. The output name for
         # each pipeline chain will be the name of the directory that the chain is in.
+        data_pipelines = []
         for pipeline_name in all_pipeline_names:
             table_name = pipeline_name.replace("_", "-")
             # Skip if `exclude` was provided and this table is in it
@@ -83,15 +102,53 @@ def main(
             # Skip is `only` was provided and this table is not in it
             if only is not None and not table_name in only:
                 continue
-            data_pipeline = DataPipeline.load(pipeline_name)
-            pipeline_output = data_pipeline.run(
-                output_folder, process_count=process_count, verify_level=verify
-            )
-            export_csv(
-                pipeline_output,
-                output_folder / "tables" / f"{table_name}.csv",
-                schema=data_pipeline.schema,
+            data_pipelines.append(DataPipeline.load(pipeline_name))
+
+        if dry_run:
+            schedule = DataPipeline.predict_schedule(
+                data_pipelines,
+                output_folder,
+                process_count=process_count,
+                memory_budget=memory_budget,
             )
+            for record in schedule:
+                end = "unknown" if record["end"] is None else f"{record['end']:.1f}s"
+                print(
+                    f"[worker {record['worker']}] {record['start']:.1f}s - {end}: "
+                    f"{record['pipeline']} {record['data_source']} "
+                    f"(peak memory: {record['peak_memory'] or 'unknown'})"
+                )
+            return
+
+        # The data sources from all pipelines share the same pool of worker processes, and each
+        # pipeline is combined as soon as all of its data sources are done. With a single process,
+        # the data sources run in this process instead so they can be profiled and debugged
+        pipeline_results = DataPipeline.parse_all(
+            data_pipelines,
+            output_folder,
+            process_count=process_count,
+            memory_budget=memory_budget,
+            trace_memory=trace_memory,
+        )
+        for data_pipeline, intermediate_results in pipeline_results:
+            output_path = output_folder / "tables" / f"{data_pipeline.table}.csv"
+            if streaming:
+                data_pipeline.run_streaming(
+                    output_folder,
+                    output_path,
+                    process_count=process_count,
+                    intermediate_results=intermediate_results,
+                )
+            else:
+                pipeline_output = data_pipeline.run(
+                    output_folder,
+                    process_count=process_count,
+                    verify_level=verify,
+                    save_intermediate=save_intermediate,
+                    combine_threshold=combine_threshold,
+                    intermediate_results=intermediate_results,
+                )
+                export_csv(pipeline_output, output_path, schema=data_pipeline.schema)
 
 
 if __name__ == "__main__":
@@ -103,6 +160,13 @@ if __name__ == "__main__":
     argparser.add_argument("--verify", type=str, default=None)
     argparser.add_argument("--profile", action="store_true")
     argparser.add_argument("--no-progress", action="store_true")
+    argparser.add_argument("--streaming", action="store_true")
+    argparser.add_argument("--no-intermediate", action="store_true")
+    argparser.add_argument(
+        "--combine-threshold", type=int, default=INTERMEDIATE_COMBINE_THRESHOLD_BYTES
+    )
+    argparser.add_argument("--memory-budget", type=int, default=None)
+    argparser.add_argument("--dry-run", action="store_true")
     argparser.add_argument("--process-count", type=int, default=cpu_count())
     argparser.add_argument("--output-folder", type=str, default=str(SRC / ".." / "output"))
     args = argparser.parse_args()
@@ -121,6 +185,12 @@ if __name__ == "__main__":
         exclude=exclude,
         process_count=args.process_count,
         show_progress=not args.no_progress,
+        streaming=args.streaming,
+        save_intermediate=not args.no_intermediate,
+        combine_threshold=args.combine_threshold,
+        memory_budget=args.memory_budget,
+        trace_memory=args.profile,
+        dry_run=args.dry_run,
     )
 
     if args.profile: